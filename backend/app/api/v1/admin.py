@@ -1,4 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.models.user import User
+from app.middleware.auth import require_permission, require_super_admin
+from app.services.permissions import permission_matrix
+from app.services.profiling import ProfilerBusy, profile_cpu, profile_memory
 
 router = APIRouter()
 
@@ -12,6 +19,85 @@ async def admin_info():
             "/users",
             "/analytics",
             "/templates",
-            "/system"
+            "/system",
+            "/permissions",
+            "/profiling/cpu",
+            "/profiling/memory"
         ]
     }
+
+@router.get("/permissions")
+async def permission_grants(
+    current_user: User = Depends(require_permission("users", "read"))
+):
+    """The whole role permission matrix in one response, so admin pages don't check grants one by one"""
+    matrix = permission_matrix.matrix
+    return {
+        "success": True,
+        "data": {
+            "version": matrix.version,
+            "roles": {role: matrix.grants_for(role) for role in matrix.roles()},
+            "current_user": {
+                "role": current_user.role,
+                "grants": matrix.grants_for(current_user.role),
+                "overrides": sorted(current_user.permission_overrides)
+            }
+        },
+        "message": f"Permission matrix v{matrix.version}"
+    }
+
+@router.post("/profiling/cpu")
+async def profile_cpu_usage(
+    duration: float = Query(10.0, gt=0, le=settings.PROFILING_MAX_SECONDS),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    include_idle: bool = Query(False),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    current_user: User = Depends(require_super_admin)
+):
+    """Sample every thread's stack for a while; collapsed output feeds flame graph tools"""
+    try:
+        profile = await profile_cpu(duration, interval_ms / 1000, include_idle)
+        
+        if format == "collapsed":
+            return PlainTextResponse(profile.collapsed())
+        
+        return {
+            "success": True,
+            "data": {
+                "duration": profile.duration,
+                "interval_ms": interval_ms,
+                "ticks": profile.ticks,
+                "samples": profile.samples,
+                "top_functions": profile.top_functions(),
+                "collapsed": profile.collapsed()
+            },
+            "message": f"Collected {profile.samples} stack samples"
+        }
+        
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profiling run is already in progress")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to profile CPU: {str(e)}")
+
+@router.post("/profiling/memory")
+async def profile_memory_growth(
+    duration: float = Query(30.0, gt=0, le=settings.PROFILING_MAX_SECONDS),
+    frames: int = Query(10, ge=1, le=50),
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    current_user: User = Depends(require_super_admin)
+):
+    """Trace allocations for a while and report the call sites whose memory grew"""
+    try:
+        report = await profile_memory(duration, frames, limit, group_by)
+        
+        return {
+            "success": True,
+            "data": report,
+            "message": f"Memory grew by {report['total_growth_bytes']} bytes over {duration}s"
+        }
+        
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profiling run is already in progress")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to profile memory: {str(e)}")
@@ -1,17 +1,218 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import logging
+import uuid
+
+from app.config import settings
+from app.database import get_db
+from app.metrics import AUTH_FAILURES
+from app.middleware.auth import create_access_token, security, verify_token
+from app.models.user import User
+from app.schemas.auth import AuthResponse, LoginRequest, RefreshRequest, SignupRequest
+from app.services.passwords import PasswordHasherBusy, password_hasher
+from app.services.sessions import create_session, rotate_session, session_revocations
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Sign-in is busy, please retry shortly",
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)}
+    )
+
+# What access-token entitlement claims are built from, so sign-in never loads the whole row
+ENTITLEMENT_COLUMNS = (
+    User.role,
+    User.subscription_tier,
+    User.subscription_expires_at,
+    User.max_personas,
+    User.is_active,
+    User.entitlements_updated_at
+)
+
+def _tokens(user, session_id: str, refresh_token: str) -> dict:
+    return {
+        "access_token": create_access_token({"sub": user.id, "sid": session_id}, user=user),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
 @router.get("/")
 async def auth_info():
     """Authentication information endpoint"""
     return {
         "success": True,
-        "message": "Auth endpoints coming soon",
+        "message": "Authentication endpoints",
         "endpoints": [
             "/login",
-            "/signup", 
+            "/signup",
             "/refresh",
             "/logout"
         ]
     }
+
+@router.post("/signup", response_model=AuthResponse, status_code=201)
+async def signup(
+    signup_data: SignupRequest,
+    db: Session = Depends(get_db)
+):
+    """Create an account and sign it in"""
+    try:
+        if db.query(User.id).filter(User.email == signup_data.email).first():
+            raise HTTPException(status_code=409, detail="An account with this email already exists")
+        # Don't hold a pooled connection while bcrypt runs
+        db.rollback()
+
+        hashed_password = await password_hasher.hash(signup_data.password)
+
+        user = User(
+            id=str(uuid.uuid4()),
+            email=signup_data.email,
+            hashed_password=hashed_password,
+            salt=hashed_password[:29],  # bcrypt keeps its salt in the hash; recorded for the schema
+            first_name=signup_data.first_name,
+            last_name=signup_data.last_name,
+            last_login_at=func.now()
+        )
+        db.add(user)
+        session_id, refresh_token = create_session(db, user.id)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent signup for the same email
+            db.rollback()
+            raise HTTPException(status_code=409, detail="An account with this email already exists")
+        db.refresh(user)
+
+        return AuthResponse(
+            success=True,
+            data={**_tokens(user, session_id, refresh_token), "user": user.to_dict()},
+            message="Account created successfully"
+        )
+
+    except PasswordHasherBusy:
+        raise _busy()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating account: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to create account: {str(e)}")
+
+@router.post("/login", response_model=AuthResponse)
+async def login(
+    login_data: LoginRequest,
+    db: Session = Depends(get_db)
+):
+    """Exchange email and password for tokens"""
+    try:
+        row = db.query(User.id, User.hashed_password, *ENTITLEMENT_COLUMNS).filter(
+            User.email == login_data.email
+        ).first()
+        # Don't hold a pooled connection while bcrypt runs
+        db.rollback()
+
+        # Unknown emails are checked against a dummy hash so they take as long as real ones
+        matches, needs_rehash = await password_hasher.verify(login_data.password, row.hashed_password if row else None)
+        if not matches:
+            AUTH_FAILURES.labels(reason="bad_credentials").inc()
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        if not row.is_active:
+            AUTH_FAILURES.labels(reason="inactive_user").inc()
+            raise HTTPException(status_code=401, detail="User account is deactivated")
+
+        values = {"last_login_at": func.now()}
+        if needs_rehash:
+            # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the password
+            hashed_password = await password_hasher.hash(login_data.password)
+            values.update(hashed_password=hashed_password, salt=hashed_password[:29])
+        db.execute(update(User).where(User.id == row.id).values(**values))
+        session_id, refresh_token = create_session(db, row.id)
+        db.commit()
+
+        return AuthResponse(
+            success=True,
+            data=_tokens(row, session_id, refresh_token),
+            message="Signed in successfully"
+        )
+
+    except PasswordHasherBusy:
+        raise _busy()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error signing in: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to sign in: {str(e)}")
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh(
+    refresh_data: RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """Exchange a refresh token for a new access and refresh token
+
+    Each refresh token works once. Reusing one signs the session out.
+    """
+    try:
+        rotated = rotate_session(db, refresh_data.refresh_token)
+        if rotated is None:
+            AUTH_FAILURES.labels(reason="invalid_refresh_token").inc()
+            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+        session_id, user_id, refresh_token = rotated
+
+        # Claims are rebuilt from the current row, which is how a changed subscription reaches the token
+        user = db.query(User.id, *ENTITLEMENT_COLUMNS).filter(User.id == user_id).first()
+        if user is None or not user.is_active:
+            AUTH_FAILURES.labels(reason="unknown_user" if user is None else "inactive_user").inc()
+            session_revocations.revoke(db, session_id)
+            raise HTTPException(status_code=401, detail="User not found or deactivated")
+
+        return AuthResponse(
+            success=True,
+            data=_tokens(user, session_id, refresh_token),
+            message="Token refreshed successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error refreshing token: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to refresh token: {str(e)}")
+
+@router.post("/logout", response_model=AuthResponse)
+async def logout(
+    everywhere: bool = Query(False, description="Sign out every session of this account"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Sign out; the session's access and refresh tokens stop working at once"""
+    try:
+        payload = verify_token(credentials.credentials)
+        user_id, session_id = payload.get("sub"), payload.get("sid")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token payload")
+
+        if everywhere:
+            revoked = session_revocations.revoke_user(db, user_id)
+        elif session_id:
+            revoked = int(session_revocations.revoke(db, session_id))
+        else:
+            raise HTTPException(status_code=400, detail="Token is not tied to a session")
+
+        return AuthResponse(
+            success=True,
+            data={"sessions_revoked": revoked},
+            message="Signed out successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error signing out: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to sign out: {str(e)}")
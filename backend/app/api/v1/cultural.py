@@ -1,16 +1,92 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.responses import Response
+from typing import Callable, Optional
+
+from app.config import settings
+from app.services.cultural_catalog import CatalogSnapshot, cultural_catalog
+from app.services.media_files import etag_matches
 
 router = APIRouter()
 
+# Shared caches may keep catalog responses for a while, then revalidate with the ETag
+CATALOG_CACHE_CONTROL = f"public, max-age={settings.CULTURAL_CATALOG_MAX_AGE}"
+
+def _summary(tradition: dict) -> dict:
+    return {
+        "id": tradition["id"],
+        "name": tradition["name"],
+        "religious_background": tradition["religious_background"],
+        "requirement_keys": tradition["requirement_keys"]
+    }
+
+def _catalog_response(
+    request: Request,
+    snapshot: CatalogSnapshot,
+    key: str,
+    build: Callable[[CatalogSnapshot], dict]
+) -> Response:
+    """Serve from the in-memory snapshot: 304 on a matching ETag, else the memoized JSON body"""
+    etag = snapshot.etag(key)
+    headers = {"etag": etag, "cache-control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = snapshot.response_body(key, lambda: {"success": True, "version": snapshot.version, **build(snapshot)})
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/")
 async def cultural_info():
     """Cultural templates and preferences endpoint"""
     return {
         "success": True,
-        "message": "Cultural endpoints coming soon",
+        "message": "Cultural endpoints",
         "endpoints": [
             "/templates",
-            "/preferences",
-            "/traditions"
+            "/traditions",
+            "/traditions/{id_or_name}",
+            "/religious-backgrounds"
         ]
     }
+
+@router.get("/traditions")
+async def get_traditions(
+    request: Request,
+    religious_background: Optional[str] = Query(None, max_length=100),
+    requirement: Optional[str] = Query(None, max_length=100, description="Only traditions with this requirement key")
+):
+    """Active cultural traditions, optionally filtered by religious background and requirement"""
+    def build(snapshot: CatalogSnapshot) -> dict:
+        traditions = snapshot.find(religious_background, requirement)
+        return {"data": list(traditions), "total": len(traditions)}
+    
+    key = f"traditions?religious_background={religious_background or ''}&requirement={requirement or ''}".lower()
+    return _catalog_response(request, await cultural_catalog.current(), key, build)
+
+@router.get("/traditions/{id_or_name}")
+async def get_tradition(request: Request, id_or_name: str):
+    """A single tradition by id or (case-insensitive) name"""
+    snapshot = await cultural_catalog.current()
+    tradition = snapshot.lookup(id_or_name)
+    if tradition is None:
+        raise HTTPException(status_code=404, detail="Cultural tradition not found")
+    return _catalog_response(request, snapshot, f"tradition:{tradition['id']}", lambda _: {"data": tradition})
+
+@router.get("/templates")
+async def get_templates(request: Request):
+    """Compact listing of every tradition for selectors: names, backgrounds and requirement keys"""
+    return _catalog_response(
+        request, await cultural_catalog.current(), "templates",
+        lambda snapshot: {"data": [_summary(t) for t in snapshot.traditions], "total": len(snapshot.traditions)}
+    )
+
+@router.get("/religious-backgrounds")
+async def get_religious_backgrounds(request: Request):
+    """Religious backgrounds in the catalog, with how many traditions each has"""
+    def build(snapshot: CatalogSnapshot) -> dict:
+        backgrounds = {
+            background: len(traditions)
+            for background, traditions in sorted(snapshot.by_religious_background.items())
+            if background
+        }
+        return {"data": backgrounds, "total": len(backgrounds)}
+    
+    return _catalog_response(request, await cultural_catalog.current(), "religious-backgrounds", build)
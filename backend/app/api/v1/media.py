@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+import mimetypes
+
+from app.config import settings
+from app.models.media import Media
+from app.models.persona import Persona
+from app.models.user import User
+from app.middleware.auth import get_current_user
+from app.replicas import get_read_db
+from app.services.blob_store import blob_store
+from app.services.media_files import media_file_response
+from app.services.uploads import avatar_path
+
+router = APIRouter()
+
+def _avatar_file(db: Session, persona_id: str, name: str):
+    return avatar_path(persona_id, name)
+
+def _blob_file(db: Session, persona_id: str, name: str):
+    # Blobs are shared across users, so the persona must reference this content
+    content_hash = name.split(".", 1)[0]
+    referenced = db.query(Media.id).filter(
+        Media.persona_id == persona_id,
+        Media.content_hash == content_hash
+    ).first()
+    return blob_store.path_for(content_hash) if referenced else None
+
+# Storage lookup for each kind of persona file, keyed by the URL segment
+MEDIA_KINDS = {
+    "avatars": _avatar_file,
+    "blobs": _blob_file,
+}
+
+@router.get("/duplicates")
+async def get_possible_duplicates(
+    max_distance: int = Query(settings.PHASH_DUPLICATE_THRESHOLD, ge=0, le=10),
+    hash: str = Query("phash", pattern="^(phash|dhash)$"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Find groups of visually identical or near-identical photos across the user's personas"""
+    from app.services.phash import group_pairs, load_user_index
+    
+    try:
+        index = load_user_index(db, current_user.id, hash)
+        pairs = index.duplicate_pairs(max_distance)
+        groups = group_pairs(pairs)
+        
+        grouped_ids = {media_id for group in groups for media_id in group}
+        media_by_id = {
+            media.id: media.to_dict()
+            for media in db.query(Media).filter(Media.id.in_(grouped_ids)).all()
+        } if grouped_ids else {}
+        
+        return {
+            "success": True,
+            "data": {
+                "groups": [[media_by_id[media_id] for media_id in group] for group in groups],
+                "pairs": [
+                    {"media_id": pair.media_id, "other_media_id": pair.other_media_id, "distance": pair.distance}
+                    for pair in pairs
+                ],
+                "photos_indexed": len(index)
+            },
+            "message": f"Found {len(groups)} groups of possible duplicates"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find duplicates: {str(e)}")
+
+@router.get("/{persona_id}/{kind}/{name}")
+async def get_media_file(
+    persona_id: str,
+    kind: str,
+    name: str,
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a stored persona file"""
+    try:
+        resolve_path = MEDIA_KINDS.get(kind)
+        if resolve_path is None or name.startswith(".") or "/" in name:
+            raise HTTPException(status_code=404, detail="Media not found")
+
+        owns_persona = db.query(Persona.id).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        path = resolve_path(db, persona_id, name) if owns_persona else None
+
+        # Don't hold a pooled connection for the length of a download
+        db.close()
+
+        if not owns_persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        if path is None:
+            raise HTTPException(status_code=404, detail="Media not found")
+
+        # Stored names are "<sha256><ext>", so the stem is a strong validator
+        etag = name.split(".", 1)[0]
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        return await media_file_response(request, path, media_type, etag)
+
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to serve media: {str(e)}")
@@ -1,29 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
+import logging
 import uuid
 from datetime import datetime
 
+from app.config import settings
 from app.database import get_db
+from app.models.media import Media, MediaBlob, MediaType
 from app.models.persona import Persona, PersonaAccessStatus
 from app.models.user import User
-from app.middleware.auth import get_current_user, require_subscription
+from app.middleware.auth import get_current_user, require_subscription_claims
+from app.replicas import get_read_db
 from app.schemas.persona import (
     PersonaCreate,
     PersonaUpdate,
     PersonaResponse,
     PersonaListResponse,
-    PersonaAccessUpdate
+    PersonaAccessUpdate,
+    AvatarResponse
 )
+from app.schemas.media import MediaHashReference, MediaListResponse, MediaResponse
+from app.services.blob_store import blob_store
+from app.services.entitlements import TokenClaims
+from app.services.images import VARIANT_FORMATS, VARIANT_SIZES, image_service
+from app.services.media_files import media_file_response
+from app.services.uploads import (
+    MIME_EXTENSIONS,
+    MULTIPART_FILE_OPENAPI,
+    avatar_path,
+    media_url,
+    parse_media_url,
+    receive_upload
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+BYTES_PER_MB = 1024 * 1024
+
+def _storage_mb(size_bytes: int) -> int:
+    """Storage charged for a file, rounded up to whole megabytes"""
+    return -(-size_bytes // BYTES_PER_MB)
+
+def _media_type_for(mime_type: str) -> MediaType:
+    if mime_type.startswith("image/"):
+        return MediaType.PHOTO
+    if mime_type.startswith("audio/"):
+        return MediaType.VOICE
+    return MediaType.DOCUMENT
+
+def _attach_media(
+    db: Session,
+    persona: Persona,
+    user: User,
+    blob: MediaBlob,
+    file_name: Optional[str],
+    description: Optional[str]
+) -> Media:
+    """Create a media row for a blob and charge it to the persona's storage"""
+    stored_name = f"{blob.sha256}{MIME_EXTENSIONS.get(blob.mime_type, '')}"
+    media = Media(
+        id=str(uuid.uuid4()),
+        persona_id=persona.id,
+        media_type=_media_type_for(blob.mime_type),
+        file_url=media_url(persona.id, "blobs", stored_name),
+        file_name=file_name,
+        file_size_bytes=blob.size_bytes,
+        mime_type=blob.mime_type,
+        content_hash=blob.sha256,
+        description=description,
+        created_by=user.id
+    )
+    db.add(media)
+    
+    # Quotas are charged per persona even when the bytes are shared
+    size_mb = _storage_mb(blob.size_bytes)
+    persona.update_storage_usage(size_mb)
+    user.current_storage_mb += size_mb
+    return media
+
+async def _photo_hashes(db: Session, upload) -> dict:
+    """Perceptual hashes for an uploaded photo, reused when the content is already hashed"""
+    existing = db.query(Media.media_metadata).filter(
+        Media.content_hash == upload.sha256,
+        Media.media_metadata["phash"].as_string().isnot(None)
+    ).first()
+    if existing:
+        return {key: existing[0][key] for key in ("dhash", "phash")}
+    
+    # numpy is only needed once a photo is uploaded, so keep it off the startup path
+    from app.services.phash import compute_perceptual_hashes
+    return await compute_perceptual_hashes(upload.path)
+
+def _link_near_duplicate(db: Session, user: User, media: Media, hashes: dict):
+    """Point a photo at a near-identical one so its AI processing can be reused"""
+    from app.services.phash import load_candidate_index
+    
+    value, max_distance = int(hashes["phash"], 16), settings.PHASH_DUPLICATE_THRESHOLD
+    # Autoflush writes the new photo before the query; it mustn't match itself
+    index = load_candidate_index(db, user.id, value, max_distance, exclude_id=media.id)
+    matches = index.query(value, max_distance)
+    if not matches:
+        return
+    
+    original = db.query(Media).filter(Media.id == matches[0].media_id).first()
+    media.media_metadata = {**media.media_metadata, "near_duplicate_of": original.id}
+    if original.ai_generated_description and not media.ai_generated_description:
+        media.ai_generated_description = original.ai_generated_description
+        media.embedding_vector = original.embedding_vector
+        media.embedding_model = original.embedding_model
+
 @router.get("/", response_model=PersonaListResponse)
 async def get_personas(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[PersonaAccessStatus] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all personas for the current user"""
@@ -37,12 +133,12 @@ async def get_personas(
         # Get total count
         total = query.count()
         
-        # Apply pagination
-        personas = query.offset(skip).limit(limit).all()
+        # Apply pagination; id breaks priority ties so pages don't overlap
+        personas = query.order_by(Persona.priority_order, Persona.id).offset(skip).limit(limit).all()
         
         return PersonaListResponse(
             success=True,
-            data=personas,
+            data=[persona.to_dict() for persona in personas],
             total=total,
             skip=skip,
             limit=limit
@@ -54,7 +150,7 @@ async def get_personas(
 @router.get("/{persona_id}", response_model=PersonaResponse)
 async def get_persona(
     persona_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific persona by ID"""
@@ -69,7 +165,7 @@ async def get_persona(
         
         return PersonaResponse(
             success=True,
-            data=persona
+            data=persona.to_dict()
         )
         
     except HTTPException:
@@ -81,46 +177,25 @@ async def get_persona(
 async def create_persona(
     persona_data: PersonaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_subscription("free"))
+    current_user: TokenClaims = Depends(require_subscription_claims("free"))
 ):
     """Create a new persona"""
     try:
-        # Check if user can create more personas
-        if not current_user.can_create_persona:
+        # The persona limit comes from the token; only the active count needs the database
+        active_personas = db.query(func.count(Persona.id)).filter(
+            Persona.user_id == current_user.id,
+            Persona.access_status == PersonaAccessStatus.ACTIVE
+        ).scalar()
+        if active_personas >= current_user.max_personas:
             raise HTTPException(
                 status_code=403,
                 detail="Persona limit reached. Please upgrade your subscription."
             )
         
         # Create new persona
-        persona = Persona(
-            id=str(uuid.uuid4()),
-            user_id=current_user.id,
-            name=persona_data.name,
-            relationship_type=persona_data.relationship_type,
-            date_of_birth=persona_data.date_of_birth,
-            date_of_passing=persona_data.date_of_passing,
-            age_at_passing=persona_data.age_at_passing,
-            hometown=persona_data.hometown,
-            occupation=persona_data.occupation,
-            education=persona_data.education,
-            military_service=persona_data.military_service,
-            cultural_background=persona_data.cultural_background,
-            religious_affiliation=persona_data.religious_affiliation,
-            cultural_traditions=persona_data.cultural_traditions,
-            personality_traits=persona_data.personality_traits,
-            life_story=persona_data.life_story,
-            memorable_quotes=persona_data.memorable_quotes,
-            hobbies_interests=persona_data.hobbies_interests,
-            family_members=persona_data.family_members,
-            close_friends=persona_data.close_friends,
-            pets=persona_data.pets,
-            memorial_type=persona_data.memorial_type,
-            venue_preferences=persona_data.venue_preferences,
-            music_preferences=persona_data.music_preferences,
-            flower_preferences=persona_data.flower_preferences,
-            priority_order=persona_data.priority_order or 0
-        )
+        persona = Persona(id=str(uuid.uuid4()), user_id=current_user.id)
+        persona.set_fields(persona_data.dict())
+        persona.priority_order = persona_data.priority_order or 0
         
         db.add(persona)
         db.commit()
@@ -128,7 +203,7 @@ async def create_persona(
         
         return PersonaResponse(
             success=True,
-            data=persona,
+            data=persona.to_dict(),
             message="Persona created successfully"
         )
         
@@ -163,10 +238,7 @@ async def update_persona(
             )
         
         # Update fields
-        update_data = persona_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            if hasattr(persona, field):
-                setattr(persona, field, value)
+        persona.set_fields(persona_data.dict(exclude_unset=True))
         
         persona.updated_at = datetime.utcnow()
         
@@ -175,7 +247,7 @@ async def update_persona(
         
         return PersonaResponse(
             success=True,
-            data=persona,
+            data=persona.to_dict(),
             message="Persona updated successfully"
         )
         
@@ -188,6 +260,7 @@ async def update_persona(
 @router.delete("/{persona_id}")
 async def delete_persona(
     persona_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -208,10 +281,25 @@ async def delete_persona(
                 detail="Cannot delete locked or archived persona"
             )
         
+        # Release each attachment's blob and refund its storage; the rows go with the persona.
+        # Hash order keeps concurrent deletes sharing blobs from deadlocking on their row locks.
+        unreferenced = []
+        attachments = db.query(Media).filter(Media.persona_id == persona_id).order_by(Media.content_hash).all()
+        for media in attachments:
+            if media.content_hash and blob_store.release(db, media.content_hash):
+                unreferenced.append(media.content_hash)
+            size_mb = _storage_mb(media.file_size_bytes or 0)
+            persona.storage_used_mb = max(persona.storage_used_mb - size_mb, 0)
+            current_user.current_storage_mb = max(current_user.current_storage_mb - size_mb, 0)
+        
         # Delete persona
         db.delete(persona)
         db.commit()
         
+        # Remove files once nothing references them any more
+        for content_hash in unreferenced:
+            background_tasks.add_task(blob_store.collect, content_hash)
+        
         return {
             "success": True,
             "message": "Persona deleted successfully"
@@ -259,7 +347,7 @@ async def update_persona_access(
         
         return PersonaResponse(
             success=True,
-            data=persona,
+            data=persona.to_dict(),
             message="Persona access updated successfully"
         )
         
@@ -272,7 +360,7 @@ async def update_persona_access(
 @router.get("/{persona_id}/memories")
 async def get_persona_memories(
     persona_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get memories for a specific persona"""
@@ -298,13 +386,16 @@ async def get_persona_memories(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch memories: {str(e)}")
 
-@router.post("/{persona_id}/avatar")
+@router.post("/{persona_id}/avatar", response_model=AvatarResponse, openapi_extra=MULTIPART_FILE_OPENAPI)
 async def upload_persona_avatar(
     persona_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Upload avatar for a persona"""
+    upload = None
     try:
         persona = db.query(Persona).filter(
             Persona.id == persona_id,
@@ -314,14 +405,319 @@ async def upload_persona_avatar(
         if not persona:
             raise HTTPException(status_code=404, detail="Persona not found")
         
-        # TODO: Implement avatar upload
-        # For now, return placeholder
+        if not persona.can_be_accessed:
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot modify locked or archived persona"
+            )
+        
+        # Release the pooled connection while the request body streams in
+        db.commit()
+        
+        # Stream the file to disk, hashing and sniffing it on the way
+        upload = await receive_upload(request)
+        
+        # Avatars are content-addressed so URLs can be cached forever
+        file_name = f"{upload.sha256}{upload.extension}"
+        source = await run_in_threadpool(upload.move_to, avatar_path(persona_id, file_name))
+        
+        persona.avatar_url = media_url(persona_id, "avatars", file_name)
+        persona.avatar_updated_at = datetime.utcnow()
+        
+        db.commit()
+        
+        # Render the thumbnail sizes before the first page view asks for them
+        background_tasks.add_task(image_service.warm_variants, source, upload.sha256)
+        
+        return AvatarResponse(
+            success=True,
+            avatar_url=persona.avatar_url,
+            message="Avatar uploaded successfully"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to upload avatar: {str(e)}")
+    finally:
+        if upload:
+            upload.discard()
+
+@router.get("/{persona_id}/avatar/{size}")
+async def get_persona_avatar_variant(
+    persona_id: str,
+    size: str,
+    request: Request,
+    format: str = Query("webp"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a resized avatar variant for a persona"""
+    try:
+        if size not in VARIANT_SIZES:
+            raise HTTPException(status_code=400, detail=f"Unknown avatar size: {size}")
+        if format not in VARIANT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown avatar format: {format}")
+        
+        persona = db.query(Persona).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        
+        avatar = parse_media_url(persona.avatar_url)
+        
+        # Nothing below needs the database
+        db.close()
+        
+        if not avatar or avatar[0] != persona_id or avatar[1] != "avatars":
+            raise HTTPException(status_code=404, detail="Persona has no uploaded avatar")
+        
+        file_name = avatar[2]
+        source_hash = file_name.split(".", 1)[0]
+        variant = await image_service.get_variant(
+            avatar_path(persona_id, file_name), source_hash, size, format
+        )
+        
+        # The variant file name encodes source hash and transform
+        return await media_file_response(
+            request,
+            variant,
+            VARIANT_FORMATS[format][1],
+            etag=variant.stem,
+            cache_control="private, max-age=300"
+        )
+        
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Avatar file not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render avatar: {str(e)}")
+
+@router.get("/{persona_id}/media", response_model=MediaListResponse)
+async def get_persona_media(
+    persona_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get media files for a specific persona"""
+    try:
+        persona = db.query(Persona).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        
+        media = db.query(Media).filter(
+            Media.persona_id == persona_id
+        ).order_by(Media.created_at.desc()).all()
+        
+        return MediaListResponse(
+            success=True,
+            data=[item.to_dict() for item in media],
+            total=len(media)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch media: {str(e)}")
+
+@router.post("/{persona_id}/media", response_model=MediaResponse, openapi_extra=MULTIPART_FILE_OPENAPI)
+async def upload_persona_media(
+    persona_id: str,
+    request: Request,
+    description: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload a photo, voice recording or document for a persona"""
+    upload = None
+    try:
+        persona = db.query(Persona).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        
+        if not persona.can_be_accessed:
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot modify locked or archived persona"
+            )
+        
+        remaining_bytes = (current_user.max_storage_mb - current_user.current_storage_mb) * BYTES_PER_MB
+        if remaining_bytes <= 0:
+            raise HTTPException(
+                status_code=403,
+                detail="Storage limit reached. Please upgrade your subscription."
+            )
+        
+        # Release the pooled connection while the request body streams in
+        db.commit()
+        
+        upload = await receive_upload(
+            request,
+            allowed_types=settings.ALLOWED_MEDIA_TYPES,
+            max_size=min(settings.MAX_MEDIA_FILE_SIZE, remaining_bytes)
+        )
+        
+        hashes = None
+        if _media_type_for(upload.mime_type) == MediaType.PHOTO:
+            try:
+                hashes = await _photo_hashes(db, upload)
+            except Exception as e:
+                logger.warning(f"Failed to hash photo {upload.sha256}: {e}")
+        
+        # Identical content already on disk is referenced instead of stored again
+        blob = blob_store.add(db, upload)
+        media = _attach_media(db, persona, current_user, blob, upload.filename, description)
+        if hashes:
+            media.media_metadata = dict(hashes)
+            _link_near_duplicate(db, current_user, media, hashes)
+        
+        db.commit()
+        
+        return MediaResponse(
+            success=True,
+            data=media.to_dict(),
+            message="Media uploaded successfully"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to upload media: {str(e)}")
+    finally:
+        if upload:
+            upload.discard()
+
+@router.post("/{persona_id}/media/by-hash", response_model=MediaResponse)
+async def attach_persona_media_by_hash(
+    persona_id: str,
+    reference: MediaHashReference,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Attach content the user already uploaded elsewhere without re-uploading it"""
+    try:
+        persona = db.query(Persona).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        
+        if not persona.can_be_accessed:
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot modify locked or archived persona"
+            )
+        
+        # Only content the user already owns can be referenced by hash
+        user_persona_ids = db.query(Persona.id).filter(Persona.user_id == current_user.id)
+        existing = blob_store.find_owned(db, user_persona_ids, reference.sha256)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Content not found, upload the file instead")
+        
+        size_mb = _storage_mb(existing.file_size_bytes or 0)
+        if current_user.current_storage_mb + size_mb > current_user.max_storage_mb:
+            raise HTTPException(
+                status_code=403,
+                detail="Storage limit reached. Please upgrade your subscription."
+            )
+        
+        blob = blob_store.acquire(db, reference.sha256)
+        if not blob:
+            raise HTTPException(status_code=404, detail="Content not found, upload the file instead")
+        
+        media = _attach_media(
+            db,
+            persona,
+            current_user,
+            blob,
+            reference.file_name or existing.file_name,
+            reference.description
+        )
+        
+        db.commit()
+        
+        return MediaResponse(
+            success=True,
+            data=media.to_dict(),
+            message="Media attached successfully"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to attach media: {str(e)}")
+
+@router.delete("/{persona_id}/media/{media_id}")
+async def delete_persona_media(
+    persona_id: str,
+    media_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a media file from a persona"""
+    try:
+        persona = db.query(Persona).filter(
+            Persona.id == persona_id,
+            Persona.user_id == current_user.id
+        ).first()
+        
+        if not persona:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        
+        if not persona.can_be_accessed:
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot modify locked or archived persona"
+            )
+        
+        media = db.query(Media).filter(
+            Media.id == media_id,
+            Media.persona_id == persona_id
+        ).first()
+        
+        if not media:
+            raise HTTPException(status_code=404, detail="Media not found")
+        
+        content_hash = media.content_hash
+        unreferenced = bool(content_hash) and blob_store.release(db, content_hash)
+        
+        # Refund the storage charged when the media was attached
+        size_mb = _storage_mb(media.file_size_bytes or 0)
+        persona.storage_used_mb = max(persona.storage_used_mb - size_mb, 0)
+        current_user.current_storage_mb = max(current_user.current_storage_mb - size_mb, 0)
+        
+        db.delete(media)
+        db.commit()
+        
+        # Remove the file once nothing references it any more
+        if unreferenced:
+            background_tasks.add_task(blob_store.collect, content_hash)
+        
         return {
             "success": True,
-            "message": "Avatar upload feature coming soon"
+            "message": "Media deleted successfully"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to upload avatar: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to delete media: {str(e)}")
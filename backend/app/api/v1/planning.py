@@ -1,17 +1,312 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional
+import logging
+import uuid
+
+from app.database import get_db
+from app.middleware.auth import get_token_claims
+from app.models.persona import Persona
+from app.models.planning import PlanningSession, PlanningStatus, PlanningStep
+from app.replicas import get_read_db
+from app.schemas.planning import (
+    PlanningListResponse,
+    PlanningResponse,
+    PlanningSessionCreate,
+    PlanningSessionUpdate,
+    PlanningStepCreate,
+    PlanningStepUpdate
+)
+from app.services.entitlements import TokenClaims
+from app.services.planning import PatchTooDeep, owned_session_id, update_step
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _check_persona(db: Session, persona_id: Optional[str], user_id: str):
+    if persona_id and not db.query(Persona.id).filter(Persona.id == persona_id, Persona.user_id == user_id).first():
+        raise HTTPException(status_code=404, detail="Persona not found")
+
 @router.get("/")
 async def planning_info():
     """Planning and event management endpoint"""
     return {
         "success": True,
-        "message": "Planning endpoints coming soon",
+        "message": "Planning endpoints",
         "endpoints": [
             "/sessions",
-            "/events",
-            "/checklists",
-            "/vendors"
+            "/sessions/{session_id}",
+            "/sessions/{session_id}/steps",
+            "/sessions/{session_id}/steps/{step_id}"
         ]
     }
+
+@router.get("/sessions", response_model=PlanningListResponse)
+async def get_planning_sessions(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[PlanningStatus] = None,
+    db: Session = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """List the current user's planning sessions, most recently updated first, without their steps"""
+    try:
+        query = db.query(PlanningSession).filter(PlanningSession.user_id == current_user.id)
+        if status:
+            query = query.filter(PlanningSession.status == status)
+
+        total = query.count()
+        sessions = query.order_by(PlanningSession.updated_at.desc(), PlanningSession.id).offset(skip).limit(limit).all()
+
+        return PlanningListResponse(
+            success=True,
+            data=[session.to_dict() for session in sessions],
+            total=total,
+            skip=skip,
+            limit=limit
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch planning sessions: {str(e)}")
+
+@router.post("/sessions", response_model=PlanningResponse, status_code=201)
+async def create_planning_session(
+    session_data: PlanningSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Start a planning session, optionally with its steps"""
+    try:
+        _check_persona(db, session_data.persona_id, current_user.id)
+
+        session = PlanningSession(
+            id=str(uuid.uuid4()),
+            user_id=current_user.id,
+            **session_data.model_dump(exclude={"steps"})
+        )
+        for position, step_data in enumerate(session_data.steps, start=1):
+            step = PlanningStep(id=str(uuid.uuid4()), **step_data.model_dump(exclude={"step_number"}))
+            step.step_number = step_data.step_number or position
+            session.steps.append(step)
+
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        return PlanningResponse(
+            success=True,
+            data=session.to_dict(include_steps=True),
+            message="Planning session created successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create planning session: {str(e)}")
+
+@router.get("/sessions/{session_id}", response_model=PlanningResponse)
+async def get_planning_session(
+    session_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Get a planning session with its steps in order"""
+    try:
+        # One query: the steps are joined to the session in step_number order
+        session = db.query(PlanningSession).options(joinedload(PlanningSession.steps)).filter(
+            PlanningSession.id == session_id,
+            PlanningSession.user_id == current_user.id
+        ).first()
+
+        if not session:
+            raise HTTPException(status_code=404, detail="Planning session not found")
+
+        return PlanningResponse(
+            success=True,
+            data=session.to_dict(include_steps=True)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch planning session: {str(e)}")
+
+@router.patch("/sessions/{session_id}", response_model=PlanningResponse)
+async def update_planning_session(
+    session_id: str,
+    session_data: PlanningSessionUpdate,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Update a planning session's details"""
+    try:
+        changes = session_data.model_dump(exclude_unset=True)
+        _check_persona(db, changes.get("persona_id"), current_user.id)
+
+        row = db.execute(
+            update(PlanningSession)
+            .where(PlanningSession.id == session_id, PlanningSession.user_id == current_user.id)
+            .values(**changes, updated_at=func.now())
+            .returning(*PlanningSession.__table__.columns)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Planning session not found")
+        db.commit()
+
+        return PlanningResponse(
+            success=True,
+            data=dict(row._mapping),
+            message="Planning session updated successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to update planning session: {str(e)}")
+
+@router.delete("/sessions/{session_id}")
+async def delete_planning_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Delete a planning session and its steps"""
+    try:
+        deleted = db.execute(
+            delete(PlanningSession)
+            .where(PlanningSession.id == session_id, PlanningSession.user_id == current_user.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not deleted:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Planning session not found")
+        # ON DELETE CASCADE covers PostgreSQL, but SQLite connections don't enforce foreign keys
+        db.execute(
+            delete(PlanningStep)
+            .where(PlanningStep.session_id == session_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        return {
+            "success": True,
+            "message": "Planning session deleted successfully"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to delete planning session: {str(e)}")
+
+@router.post("/sessions/{session_id}/steps", response_model=PlanningResponse, status_code=201)
+async def add_planning_step(
+    session_id: str,
+    step_data: PlanningStepCreate,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Add a step to a planning session; appended after the last step unless step_number is given"""
+    try:
+        # Ownership and the next position in one query; no steps gives (id, None)
+        owned = db.query(PlanningSession.id, func.max(PlanningStep.step_number)).outerjoin(
+            PlanningStep, PlanningStep.session_id == PlanningSession.id
+        ).filter(
+            PlanningSession.id == session_id,
+            PlanningSession.user_id == current_user.id
+        ).group_by(PlanningSession.id).first()
+        if owned is None:
+            raise HTTPException(status_code=404, detail="Planning session not found")
+
+        step = PlanningStep(
+            id=str(uuid.uuid4()),
+            session_id=session_id,
+            **step_data.model_dump(exclude={"step_number"})
+        )
+        step.step_number = step_data.step_number or (owned[1] or 0) + 1
+
+        db.add(step)
+        db.commit()
+        db.refresh(step)
+
+        return PlanningResponse(
+            success=True,
+            data=step.to_dict(),
+            message="Planning step added successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to add planning step: {str(e)}")
+
+@router.patch("/sessions/{session_id}/steps/{step_id}", response_model=PlanningResponse)
+async def update_planning_step(
+    session_id: str,
+    step_id: str,
+    step_data: PlanningStepUpdate,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Update a step; JSON fields take merge patches, so an autosave sends only what changed"""
+    try:
+        step = update_step(db, current_user.id, session_id, step_id, step_data.model_dump(exclude_unset=True))
+        if step is None:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Planning step not found")
+        db.commit()
+
+        return PlanningResponse(
+            success=True,
+            data=step,
+            message="Planning step updated successfully"
+        )
+
+    except PatchTooDeep as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to update planning step: {str(e)}")
+
+@router.delete("/sessions/{session_id}/steps/{step_id}")
+async def delete_planning_step(
+    session_id: str,
+    step_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenClaims = Depends(get_token_claims)
+):
+    """Remove a step from a planning session"""
+    try:
+        deleted = db.execute(
+            delete(PlanningStep)
+            .where(
+                PlanningStep.id == step_id,
+                PlanningStep.session_id == owned_session_id(session_id, current_user.id)
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not deleted:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Planning step not found")
+        db.commit()
+
+        return {
+            "success": True,
+            "message": "Planning step deleted successfully"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to delete planning step: {str(e)}")
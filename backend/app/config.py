@@ -13,12 +13,34 @@ class Settings(BaseSettings):
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    SERVER_LAUNCHER: str = "auto"  # gunicorn, uvicorn, or auto (gunicorn outside development)
+    WEB_CONCURRENCY: Optional[int] = None  # fixed worker count; derived from CPU quota when unset
+    SERVER_WORKERS_PER_CORE: float = 1.0
+    SERVER_MAX_WORKERS: Optional[int] = None
+    SERVER_MAX_REQUESTS: int = 10000  # recycle a worker after this many requests
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_TIMEOUT: int = 60
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_KEEPALIVE: int = 5
+    SERVER_DRAIN_TIMEOUT: float = 25.0  # wait for in-flight requests on shutdown; keep under SERVER_GRACEFUL_TIMEOUT
     
     # Security
     JWT_SECRET: str = "your-super-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 30
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    SESSION_REVOCATION_SYNC_SECONDS: float = 5.0  # how soon other workers see a sign-out
+    SESSION_REVOCATION_BLOOM_CAPACITY: int = 100000  # revocations per access-token lifetime
+    SESSION_REVOCATION_BLOOM_FP_RATE: float = 0.001
+    ENTITLEMENT_SYNC_SECONDS: float = 5.0  # how soon other workers reject tokens with outdated tier or role
+    PERMISSION_MATRIX_SYNC_SECONDS: float = 30.0  # how soon role_permissions edits reach every worker
+    
+    # Password hashing (per worker)
+    BCRYPT_ROUNDS: int = 12  # stored hashes with other costs are rehashed on next login
+    PASSWORD_HASH_WORKERS: int = 2  # concurrent bcrypt operations
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_QUEUE_TIMEOUT_MS: int = 2000  # beyond this, sign-in gets a 503
     
     # CORS
     ALLOWED_ORIGINS: Union[str, List[str]] = "http://localhost:3000,http://localhost:3001"
@@ -33,6 +55,21 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "afterlight"
     DATABASE_USER: str = "postgres"
     DATABASE_PASSWORD: str = ""
+    DATABASE_REPLICA_URLS: Union[str, List[str]] = ""  # comma-separated read replicas
+    REPLICA_STICKY_SECONDS: float = 5.0  # reads go to the primary this long after a client writes
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 10.0
+    DB_POOL_SIZE: int = 5  # per worker (and per replica)
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARM_CONNECTIONS: int = 5  # opened per worker at startup, capped at the pool size
+    DB_POOL_PRIME_STATEMENTS: bool = True  # touch each table on warm connections
+    DB_POOL_WARM_TIMEOUT: float = 10.0
+    MIGRATION_LOCK_TIMEOUT_MS: int = 3000  # DDL gives up (and retries) rather than queue behind traffic
+    MIGRATION_LOCK_RETRIES: int = 5
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 1000
+    MIGRATION_BACKFILL_PAUSE_MS: int = 100  # between backfill batches
     
     # Redis (for rate limiting and caching)
     REDIS_URL: Optional[str] = None
@@ -49,14 +86,56 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     UPLOAD_DIR: str = "uploads"
     ALLOWED_FILE_TYPES: List[str] = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+    MEDIA_URL_PREFIX: str = "/api/v1/media"
+    MAX_MEDIA_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    ALLOWED_MEDIA_TYPES: List[str] = [
+        "image/jpeg", "image/png", "image/gif", "image/webp",
+        "audio/mpeg", "audio/mp4", "audio/wav", "video/mp4", "application/pdf"
+    ]
+    MEDIA_BLOB_GC_GRACE_MINUTES: int = 60
+    MEDIA_BLOB_GC_INTERVAL_MINUTES: int = 30  # per-worker sweep for missed collections and orphaned files; 0 disables
+    MEDIA_CACHE_MAX_AGE: int = 31536000  # 1 year, media URLs are content-addressed
+    MEDIA_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. /protected-media for nginx offload
+    
+    # Image derivatives
+    IMAGE_WORKERS: int = 2
+    IMAGE_QUALITY: int = 82
+    IMAGE_VARIANT_CACHE_MB: int = 512
+    PHASH_DUPLICATE_THRESHOLD: int = 6  # max differing bits out of 64 for a near-duplicate
+    
+    # Cultural traditions catalog
+    CULTURAL_CATALOG_SYNC_SECONDS: float = 60.0  # version check interval; edits reach every worker within this
+    CULTURAL_CATALOG_MAX_AGE: int = 300  # Cache-Control max-age; clients revalidate with the ETag after
     
     # Rate limiting
     RATE_LIMIT_WINDOW: int = 60  # seconds
     RATE_LIMIT_MAX_REQUESTS: int = 100  # requests per window
     
+    # Admission control (per worker)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 64
+    ADMISSION_PRIORITY_MAX_CONCURRENT: int = 16  # separate quota for health checks, metrics and auth
+    ADMISSION_MAX_QUEUE: int = 128  # requests waiting for a slot beyond this are shed at once
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 500  # shed requests that wait longer than this
+    ADMISSION_RETRY_AFTER: int = 1  # seconds, sent in Retry-After
+    
+    # Health checks
+    HEALTH_CHECK_CACHE_SECONDS: float = 5.0  # readiness results are reused for this long
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+    HEALTH_CHECK_REDIS: bool = False  # nothing depends on Redis yet
+    
+    # Metrics
+    METRICS_ENABLED: bool = True
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None  # set when running several workers
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    N_PLUS_ONE_THRESHOLD: int = 10  # repeats of one statement shape in a request
+    PROFILING_MAX_SECONDS: int = 120  # longest admin CPU/memory profiling run
+    
     # Logging
     LOG_LEVEL: str = "INFO"
-    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"  # used when LOG_JSON is off
+    LOG_JSON: bool = True
+    LOG_HEALTH_CHECK_SAMPLE_EVERY: int = 100  # log 1 in N successful health checks
     
     # External services
     SUPABASE_URL: Optional[str] = None
@@ -72,7 +151,7 @@ class Settings(BaseSettings):
     PRINTFUL_API_KEY: Optional[str] = None
     LOB_API_KEY: Optional[str] = None
     
-    @field_validator('ALLOWED_ORIGINS', 'ALLOWED_HOSTS')
+    @field_validator('ALLOWED_ORIGINS', 'ALLOWED_HOSTS', 'DATABASE_REPLICA_URLS')
     @classmethod
     def parse_comma_separated_list(cls, v: Union[str, List[str]]) -> List[str]:
         if isinstance(v, str):
@@ -1,36 +1,78 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from app.config import settings
+from app.metrics import InstrumentedQueuePool, instrument_engine
+from app.query_stats import instrument_queries
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
 # Database URL
 DATABASE_URL = settings.DATABASE_URL
 
-# Create engine
-if settings.ENVIRONMENT == "test":
-    # Use in-memory SQLite for testing
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-else:
-    # Use PostgreSQL for development and production
+_engine = None
+_engine_lock = threading.Lock()
+
+def create_pooled_engine(url: str):
+    """Engine with the configured connection pool and query instrumentation"""
     engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
         echo=settings.DEBUG
     )
+    instrument_engine(engine)
+    instrument_queries(engine)
+    return engine
+
+def _create_engine():
+    if settings.ENVIRONMENT == "test":
+        # Use in-memory SQLite for testing
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        instrument_engine(engine)
+        instrument_queries(engine)
+        return engine
+    
+    # Use PostgreSQL for development and production
+    return create_pooled_engine(DATABASE_URL)
+
+def get_engine():
+    """The application engine, created on first use (normally during lifespan startup)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+def __getattr__(name):
+    # Keeps `from app.database import engine` working without creating it at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class EngineSession(Session):
+    """Session that binds to the application engine when first used"""
+    
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=EngineSession, autocommit=False, autoflush=False)
 
 # Create base class for models
 Base = declarative_base()
@@ -53,7 +95,7 @@ def init_db():
         from app.models import user, persona, memory, media, cultural, planning
         
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         logger.info("✅ Database tables created successfully")
         
     except Exception as e:
@@ -63,8 +105,8 @@ def init_db():
 def check_db_connection():
     """Check database connection"""
     try:
-        with engine.connect() as connection:
-            result = connection.execute("SELECT 1")
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
             logger.info("✅ Database connection successful")
             return True
     except Exception as e:
@@ -75,18 +117,100 @@ def check_db_connection():
 def health_check():
     """Check database health"""
     try:
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             # Check if we can execute a simple query
-            connection.execute("SELECT 1")
+            connection.execute(text("SELECT 1"))
             return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": str(e)}
 
+def pool_stats():
+    """Connection pool utilization; exhausted when every connection is checked out"""
+    pool = get_engine().pool
+    if not hasattr(pool, "checkedout"):
+        # StaticPool and NullPool don't track checkouts
+        return {"pool": type(pool).__name__, "exhausted": False}
+    
+    size = pool.size()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = size + max_overflow if max_overflow >= 0 else None
+    checked_out = pool.checkedout()
+    return {
+        "pool": type(pool).__name__,
+        "size": size,
+        "max_overflow": max_overflow,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "utilization": round(checked_out / capacity, 3) if capacity else None,
+        "exhausted": capacity is not None and checked_out >= capacity
+    }
+
+def _prime_connection(connection) -> list:
+    """Touch every mapped table so the server backend loads its catalog entries now; returns tables that failed"""
+    failed = []
+    for table in Base.metadata.sorted_tables:
+        try:
+            connection.execute(select(table).limit(0))
+        except Exception:
+            # Missing tables (migrations not run yet) shouldn't stop the warm-up
+            connection.rollback()
+            failed.append(table.name)
+    connection.rollback()
+    return failed
+
+def warm_pool(connections: int, prime: bool = True) -> int:
+    """Open pooled connections before traffic arrives; returns how many were opened"""
+    pool = get_engine().pool
+    if hasattr(pool, "size"):
+        connections = min(connections, pool.size())
+    else:
+        # StaticPool and friends hold a single connection
+        connections = min(connections, 1)
+    if connections <= 0:
+        return 0
+    
+    unprimed = set()
+    
+    def open_connection():
+        connection = get_engine().connect()
+        try:
+            if prime:
+                unprimed.update(_prime_connection(connection))
+            else:
+                connection.execute(text("SELECT 1"))
+        except Exception:
+            connection.close()
+            raise
+        return connection
+    
+    # All connections are held open together, otherwise the pool would hand
+    # the same one back each time; connecting in parallel overlaps the handshakes
+    opened = []
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="db-warmup") as executor:
+        futures = [executor.submit(open_connection) for _ in range(connections)]
+        errors = []
+        for future in futures:
+            try:
+                opened.append(future.result())
+            except Exception as e:
+                errors.append(e)
+    for connection in opened:
+        connection.close()
+    
+    if errors:
+        logger.warning(f"Pool warm-up opened {len(opened)}/{connections} connections: {errors[0]}")
+    if unprimed:
+        logger.warning(f"Pool warm-up could not prime: {', '.join(sorted(unprimed))}")
+    return len(opened)
+
 # Close database connections on shutdown
 def close_db_connections():
     """Close all database connections"""
+    if _engine is None:
+        return
     try:
-        engine.dispose()
+        _engine.dispose()
         logger.info("✅ Database connections closed")
     except Exception as e:
         logger.error(f"❌ Error closing database connections: {e}")
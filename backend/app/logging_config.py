@@ -0,0 +1,131 @@
+"""
+Logging setup.
+
+Records are handed to a QueueHandler, which only appends to an in-memory queue,
+and a QueueListener thread does the formatting and the blocking stdout writes.
+Nothing on the request path ever waits on I/O to log. Output is one JSON object
+per line (or LOG_FORMAT text when LOG_JSON is off), and every record carries
+the id of the request it was logged under.
+
+High-volume events can be sampled: a record logged with extra={"sample": key}
+is kept once every N times for that key, so health check traffic doesn't drown
+everything else. Warnings and errors are never sampled.
+"""
+
+import atexit
+import copy
+import itertools
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.config import settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed in extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "request_id", "sample",
+    "color_message",  # uvicorn's ANSI-coloured copy of the message
+}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every N records that share a sample key"""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        every = self.rates.get(key, 1)
+        if every <= 1:
+            return True
+        counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % every == 0
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that captures request context before the record leaves the caller"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the calling thread, so the request id context is still visible
+        record = copy.copy(record)
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Arguments and tracebacks may not survive being handed to another thread
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def configure_logging():
+    """Route all logging through a background queue listener; safe to call twice"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_JSON else logging.Formatter(settings.LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter({"health": max(settings.LOG_HEALTH_CHECK_SAMPLE_EVERY, 1)}))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    # Send uvicorn's own logs through the queue too; access lines come from our middleware
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,34 +1,61 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+import logging
 import time
 import uuid
 from contextlib import asynccontextmanager
 
 from app.config import settings
+from app.database import get_engine
+from app.logging_config import configure_logging, request_id_var
+from app.middleware.admission import AdmissionControlMiddleware
 from app.middleware.auth import AuthMiddleware
+from app.middleware.drain import DrainMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.request_context import RequestContextMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
-from app.api.v1 import personas, auth, cultural, planning, admin
+from app.middleware.replica_routing import ReadYourWritesMiddleware
+from app.api.v1 import personas, auth, cultural, planning, admin, media
+from app.metrics import render_metrics
+from app.replicas import replica_set
+from app.services.blob_store import blob_store
+from app.services.cultural_catalog import cultural_catalog
+from app.services.entitlements import entitlement_changes
+from app.services.health import readiness_probe
+from app.services.lifecycle import drain_and_close, warm_database_pool
+from app.services.permissions import permission_matrix
+from app.services.sessions import session_revocations
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# Global variables for request tracking
-request_count = 0
 start_time = time.time()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Starting AfterLight FastAPI Backend...")
-    print(f"📊 Environment: {settings.ENVIRONMENT}")
-    print(f"🔐 JWT Secret: {'*' * 10 if settings.JWT_SECRET else 'NOT SET'}")
-    print(f"🗄️ Database: {settings.DATABASE_URL[:20]}..." if settings.DATABASE_URL else "NOT SET")
+    logger.info(f"Starting AfterLight FastAPI Backend ({settings.ENVIRONMENT})")
+    logger.info(f"JWT secret: {'configured' if settings.JWT_SECRET else 'NOT SET'}")
+    logger.info(f"Database: {settings.DATABASE_URL[:20]}..." if settings.DATABASE_URL else "Database: NOT SET")
+    # The engine (and the psycopg2 driver) is created here rather than at import
+    get_engine()
+    await warm_database_pool()
+    replica_set.start()
+    session_revocations.start()
+    entitlement_changes.start()
+    permission_matrix.start()
+    cultural_catalog.start()
+    blob_store.start()
     
     yield
     
     # Shutdown
-    print("🛑 Shutting down AfterLight Backend...")
-    print(f"📈 Total requests processed: {request_count}")
-    print(f"⏱️ Uptime: {time.time() - start_time:.2f} seconds")
+    logger.info("Shutting down AfterLight Backend...")
+    await drain_and_close()
+    logger.info(f"Uptime: {time.time() - start_time:.2f} seconds")
 
 # Create FastAPI app
 app = FastAPI(
@@ -67,14 +94,37 @@ if settings.ENVIRONMENT == "production":
 # Add custom middleware
 app.add_middleware(RateLimitMiddleware)
 app.add_middleware(AuthMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+
+# Tracks writes so a client's reads stay on the primary until replicas catch up
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Sheds load with a fast 503 before any auth, rate limiting or database work happens
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# Counts in-flight requests for the shutdown drain and refuses new ones once it starts
+app.add_middleware(DrainMiddleware)
+
+# Outside the rate limiter, so rejected and failed requests are measured too
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost: request ids and access logging cover every response
+app.add_middleware(RequestContextMiddleware)
 
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    request_id = str(uuid.uuid4())
+    # Same id the access log and every other record for this request carry
+    request_id = request_id_var.get() or uuid.uuid4().hex
     
-    # Log the error (in production, send to monitoring service)
-    print(f"❌ Error {request_id}: {str(exc)}")
+    logger.error(
+        f"Unhandled error on {request.method} {request.url.path}: {exc}",
+        exc_info=exc,
+        extra={"request_id": request_id}
+    )
     
     return JSONResponse(
         status_code=500,
@@ -84,40 +134,42 @@ async def global_exception_handler(request: Request, exc: Exception):
             "code": "INTERNAL_ERROR",
             "request_id": request_id,
             "timestamp": time.time()
-        }
+        },
+        headers={"X-Request-ID": request_id}
     )
 
-# Health check endpoint
+# Liveness probe: no I/O, so probing it constantly costs nothing
 @app.get("/health", include_in_schema=True)
-async def health_check(request: Request):
-    global request_count
-    request_count += 1
-    
-    # Get client IP and user agent for logging
-    client_ip = request.client.host if request.client else "unknown"
-    user_agent = request.headers.get("user-agent", "unknown")
-    
-    # Log health check request
-    print(f"🏥 Health check from {client_ip} ({user_agent})")
-    
-    # Get environment info
-    env_info = {
-        "environment": settings.ENVIRONMENT,
-        "debug": settings.DEBUG,
-        "allowed_origins": settings.ALLOWED_ORIGINS,
-        "allowed_hosts": settings.ALLOWED_HOSTS
-    }
-    
+async def health_check():
     return {
         "success": True,
         "status": "healthy",
-        "timestamp": time.time(),
         "uptime": time.time() - start_time,
-        "requests_processed": request_count,
-        "version": "1.1.0",
-        "environment": env_info
+        "version": "1.1.0"
     }
 
+# Readiness probe: cached dependency checks plus live pool utilization
+@app.get("/health/ready", include_in_schema=True)
+async def readiness_check():
+    report = await readiness_probe.status()
+    return JSONResponse(
+        status_code=200 if report["ready"] else 503,
+        content={
+            "success": report["ready"],
+            "status": "ready" if report["ready"] else "not_ready",
+            **report
+        },
+        headers={"Cache-Control": "no-store"}
+    )
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 # API information endpoint
 @app.get("/")
 async def root():
@@ -126,7 +178,8 @@ async def root():
         "message": "AfterLight API - Premium Memorial Planning Platform",
         "version": "1.1.0",
         "docs": "/docs" if settings.ENVIRONMENT != "production" else None,
-        "health": "/health"
+        "health": "/health",
+        "ready": "/health/ready"
     }
 
 # Include API routers
@@ -135,7 +188,9 @@ app.include_router(personas.router, prefix="/api/v1/personas", tags=["Personas"]
 app.include_router(cultural.router, prefix="/api/v1/cultural", tags=["Cultural"])
 app.include_router(planning.router, prefix="/api/v1/planning", tags=["Planning"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
+app.include_router(media.router, prefix=settings.MEDIA_URL_PREFIX, tags=["Media"])
 
+# Development entry point; production starts through railway_start.py
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,198 @@
+"""
+Prometheus metrics.
+
+Every metric the backend exports is defined here so names and labels stay in
+one place. When PROMETHEUS_MULTIPROC_DIR is set (several server workers),
+values are written to per-process files in that directory and /metrics
+aggregates them, so a scrape sees the whole instance rather than whichever
+worker answered.
+"""
+
+import os
+import time
+
+from app.config import settings
+
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    # prometheus_client picks its value storage when it is first imported
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.pool import QueuePool  # noqa: E402
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "afterlight_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "afterlight_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "afterlight_http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+
+# Database connection pool
+DB_POOL_CHECKOUTS = Counter(
+    "afterlight_db_pool_checkouts_total",
+    "Connections checked out of the pool"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "afterlight_db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "afterlight_db_pool_overflow",
+    "Connections open beyond pool_size",
+    multiprocess_mode="livesum"
+)
+DB_POOL_WAIT = Histogram(
+    "afterlight_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+DB_POOL_TIMEOUTS = Counter(
+    "afterlight_db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a connection"
+)
+
+DB_READ_ROUTING = Counter(
+    "afterlight_db_read_routing_total",
+    "Read-only sessions by the database they were sent to",
+    ["target"]
+)
+DB_REPLICAS_HEALTHY = Gauge(
+    "afterlight_db_replicas_healthy",
+    "Read replicas that passed their last health check",
+    multiprocess_mode="livemin"
+)
+
+# SQL statements
+DB_QUERY_DURATION = Histogram(
+    "afterlight_db_query_duration_seconds",
+    "SQL statement execution time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "afterlight_db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_SLOW_QUERIES = Counter(
+    "afterlight_db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_THRESHOLD_MS"
+)
+DB_N_PLUS_ONE = Counter(
+    "afterlight_db_n_plus_one_total",
+    "Requests where one statement shape repeated N_PLUS_ONE_THRESHOLD times or more",
+    ["route"]
+)
+
+# Admission control
+ADMISSION_IN_FLIGHT = Gauge(
+    "afterlight_admission_in_flight",
+    "Requests holding an admission slot",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "afterlight_admission_queue_wait_seconds",
+    "Time requests waited for an admission slot",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+ADMISSION_REJECTIONS = Counter(
+    "afterlight_admission_rejections_total",
+    "Requests shed with 503 because the worker was saturated",
+    ["pool"]
+)
+
+# Rate limiting and authentication
+RATE_LIMIT_REJECTIONS = Counter(
+    "afterlight_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter"
+)
+AUTH_FAILURES = Counter(
+    "afterlight_auth_failures_total",
+    "Failed authentication attempts by reason",
+    ["reason"]
+)
+SESSION_REVOCATION_CHECKS = Counter(
+    "afterlight_session_revocation_checks_total",
+    "Access-token revocation checks by outcome; only non-negative ones read the database",
+    ["result"]
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "afterlight_password_hash_duration_seconds",
+    "Time spent in bcrypt, by operation",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+)
+
+
+def route_label(scope) -> str:
+    """Route template for a request, so labels don't grow with path parameters"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Track checkouts and overflow on an engine's pool"""
+    pool = engine.pool
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        DB_POOL_CHECKED_OUT.inc()
+        if hasattr(pool, "overflow"):
+            DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+        if hasattr(pool, "overflow"):
+            DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def render_metrics():
+    """Exposition-format payload and content type for a scrape"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,14 +1,18 @@
 from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from jose import JWTError
 from datetime import datetime, timedelta
 from typing import Optional
 import logging
 
 from app.config import settings
 from app.database import get_db
-from app.models.user import User
+from app.metrics import AUTH_FAILURES
+from app.models.user import TIER_LEVELS, User
+from app.services.entitlements import TokenClaims, entitlement_changes, entitlement_claims
+from app.services.permissions import permission_matrix
+from app.services.sessions import session_revocations
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +29,20 @@ class AuthMiddleware:
         # Skip auth for certain paths
         if scope["type"] == "http":
             path = scope["path"]
-            if path in ["/health", "/docs", "/redoc", "/openapi.json"]:
+            if path in ["/health", "/health/ready", "/metrics", "/docs", "/redoc", "/openapi.json"]:
                 await self.app(scope, receive, send)
                 return
         
         await self.app(scope, receive, send)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, user=None):
+    """Create JWT access token; with a user (or row of its entitlement columns), embeds its entitlement claims"""
+    # jose.jwt pulls in its key backends; import on first use to keep startup lean
+    from jose import jwt
+    
     to_encode = data.copy()
+    if user is not None:
+        to_encode["ent"] = entitlement_claims(user)
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -45,11 +54,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str) -> dict:
     """Verify JWT token and return payload"""
+    from jose import jwt
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
         return payload
     except JWTError as e:
         logger.error(f"JWT verification failed: {e}")
+        AUTH_FAILURES.labels(reason="invalid_token").inc()
         raise HTTPException(
             status_code=401,
             detail="Invalid authentication credentials",
@@ -67,24 +79,67 @@ async def get_current_user(
         
         user_id: str = payload.get("sub")
         if user_id is None:
+            AUTH_FAILURES.labels(reason="invalid_payload").inc()
             raise HTTPException(status_code=401, detail="Invalid token payload")
         
+        # Signed out or revoked sessions; a bloom filter answers without the database
+        session_id = payload.get("sid")
+        if session_id and session_revocations.is_revoked(db, session_id):
+            AUTH_FAILURES.labels(reason="revoked_session").inc()
+            raise HTTPException(status_code=401, detail="Session has been signed out")
+        
         # Get user from database
         user = db.query(User).filter(User.id == user_id).first()
         if user is None:
+            AUTH_FAILURES.labels(reason="unknown_user").inc()
             raise HTTPException(status_code=401, detail="User not found")
         
         if not user.is_active:
+            AUTH_FAILURES.labels(reason="inactive_user").inc()
             raise HTTPException(status_code=401, detail="User account is deactivated")
         
         return user
         
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         logger.error(f"Authentication error: {e}")
+        AUTH_FAILURES.labels(reason="error").inc()
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> TokenClaims:
+    """Verify the access token and return its entitlement claims; no database access on the common path"""
+    payload = verify_token(credentials.credentials)
+    if payload.get("sub") is None:
+        AUTH_FAILURES.labels(reason="invalid_payload").inc()
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    claims = TokenClaims.from_payload(payload)
+    if claims is None or entitlement_changes.is_stale(claims):
+        # Issued before claims existed, or before the user's role or subscription changed
+        AUTH_FAILURES.labels(reason="stale_entitlements").inc()
+        raise HTTPException(
+            status_code=401,
+            detail="Access token is out of date, refresh it",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token", error_description="entitlements changed"'},
+        )
+    
+    if not claims.is_active:
+        AUTH_FAILURES.labels(reason="inactive_user").inc()
+        raise HTTPException(status_code=401, detail="User account is deactivated")
+    
+    # The session only gets opened on a bloom filter hit
+    if claims.session_id and session_revocations.is_revoked(db, claims.session_id):
+        AUTH_FAILURES.labels(reason="revoked_session").inc()
+        raise HTTPException(status_code=401, detail="Session has been signed out")
+    
+    return claims
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     if not current_user.is_active:
@@ -102,20 +157,22 @@ def require_role(required_roles: list):
         return current_user
     return role_checker
 
+def require_permission(resource: str, action: str):
+    """Decorator to require a role grant (or per-user override) from role_permissions; checked in memory"""
+    def permission_checker(current_user: User = Depends(get_current_user)):
+        if not permission_matrix.user_can(current_user, resource, action):
+            raise HTTPException(
+                status_code=403,
+                detail="Insufficient permissions"
+            )
+        return current_user
+    return permission_checker
+
 def require_subscription(min_tier: str = "free"):
     """Decorator to require subscription tier"""
     def subscription_checker(current_user: User = Depends(get_current_user)):
-        # Define tier hierarchy
-        tier_hierarchy = {
-            "free": 0,
-            "premium": 1,
-            "religious": 2,
-            "healthcare": 3,
-            "other": 2
-        }
-        
-        user_tier_level = tier_hierarchy.get(current_user.subscription_tier, 0)
-        required_tier_level = tier_hierarchy.get(min_tier, 0)
+        user_tier_level = TIER_LEVELS.get(current_user.subscription_tier, 0)
+        required_tier_level = TIER_LEVELS.get(min_tier, 0)
         
         if user_tier_level < required_tier_level:
             raise HTTPException(
@@ -133,9 +190,43 @@ def require_subscription(min_tier: str = "free"):
         return current_user
     return subscription_checker
 
+def require_role_claims(required_roles: list):
+    """Like require_role, but authorizes from the token's claims without loading the user"""
+    def role_checker(claims: TokenClaims = Depends(get_token_claims)):
+        if claims.role not in required_roles:
+            raise HTTPException(
+                status_code=403,
+                detail="Insufficient permissions"
+            )
+        return claims
+    return role_checker
+
+def require_subscription_claims(min_tier: str = "free"):
+    """Like require_subscription, but authorizes from the token's claims without loading the user"""
+    required_tier_level = TIER_LEVELS.get(min_tier, 0)
+    
+    def subscription_checker(claims: TokenClaims = Depends(get_token_claims)):
+        if claims.tier_level < required_tier_level:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Subscription tier {min_tier} or higher required"
+            )
+        
+        if not claims.is_subscription_active:
+            raise HTTPException(
+                status_code=403,
+                detail="Active subscription required"
+            )
+        
+        return claims
+    return subscription_checker
+
 # Convenience functions for common role requirements
 require_admin = require_role(["ADMIN", "SUPER_ADMIN"])
 require_super_admin = require_role(["SUPER_ADMIN"])
 require_premium = require_subscription("premium")
 require_religious = require_subscription("religious")
 require_healthcare = require_subscription("healthcare")
+require_admin_claims = require_role_claims(["ADMIN", "SUPER_ADMIN"])
+require_super_admin_claims = require_role_claims(["SUPER_ADMIN"])
+require_premium_claims = require_subscription_claims("premium")
@@ -0,0 +1,33 @@
+from fastapi.responses import JSONResponse
+
+from app.services.lifecycle import inflight_requests
+
+class DrainMiddleware:
+    """Track in-flight requests and turn new ones away once shutdown has begun"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if inflight_requests.draining:
+            response = JSONResponse(
+                status_code=503,
+                content={
+                    "success": False,
+                    "error": "Server is shutting down",
+                    "code": "SHUTTING_DOWN"
+                },
+                headers={"Connection": "close", "Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        inflight_requests.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            inflight_requests.finished()
@@ -0,0 +1,34 @@
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.metrics import DB_N_PLUS_ONE, DB_QUERIES_PER_REQUEST, route_label
+from app.query_stats import report_n_plus_one, start_tracking, stop_tracking
+
+class QueryStatsMiddleware:
+    """Collect per-request SQL stats; exposed as Server-Timing outside production"""
+
+    def __init__(self, app):
+        self.app = app
+        self.add_header = settings.ENVIRONMENT != "production"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_tracking()
+
+        async def send_wrapper(message):
+            if self.add_header and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_tracking()
+            route = route_label(scope)
+            DB_QUERIES_PER_REQUEST.labels(route=route).observe(stats.count)
+            if report_n_plus_one(stats, route):
+                DB_N_PLUS_ONE.labels(route=route).inc()
@@ -4,6 +4,7 @@ import time
 import logging
 from typing import Dict, Tuple
 from app.config import settings
+from app.metrics import RATE_LIMIT_REJECTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +18,15 @@ class RateLimitMiddleware:
         self.last_cleanup = time.time()
     
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
+        # Load balancer probes and metric scrapes are never rate limited
+        if scope["type"] == "http" and not scope["path"].startswith(("/health", "/metrics")):
             # Get client identifier
             client_id = self._get_client_id(scope)
             
             # Check rate limit
             if not self._check_rate_limit(client_id):
                 # Rate limit exceeded
+                RATE_LIMIT_REJECTIONS.inc()
                 response = JSONResponse(
                     status_code=429,
                     content={
@@ -0,0 +1,40 @@
+import math
+import time
+
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+
+from app.config import settings
+from app.replicas import LAST_WRITE_COOKIE, begin_request, client_key, end_request, record_write, wrote_recently
+
+class ReadYourWritesMiddleware:
+    """Pin a client's reads to the primary for a short window after it writes"""
+
+    def __init__(self, app):
+        self.app = app
+        attributes = f"Max-Age={math.ceil(settings.REPLICA_STICKY_SECONDS)}; Path=/; HttpOnly; SameSite=Lax"
+        if settings.ENVIRONMENT == "production":
+            attributes += "; Secure"
+        self.cookie_attributes = attributes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = client_key(headers.get("authorization"))
+        last_write = cookie_parser(headers.get("cookie", "")).get(LAST_WRITE_COOKIE)
+        state = begin_request(sticky=wrote_recently(key, last_write))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                record_write(key)
+                cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; {self.cookie_attributes}"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request()
@@ -0,0 +1,60 @@
+import logging
+import re
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+
+from app.logging_config import request_id_var
+from app.metrics import route_label
+
+access_logger = logging.getLogger("app.access")
+
+# Accept a caller's request id only if it is short and header-safe
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestContextMiddleware:
+    """Assign every request an id, echo it in X-Request-ID and write the access log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        request_id = incoming if incoming and VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        # Left set after the call so the global exception handler can still read it
+        request_id_var.set(request_id)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = scope["path"]
+            extra = {
+                "method": scope["method"],
+                "route": route_label(scope),
+                "path": path,
+                "status": status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                "client": scope["client"][0] if scope.get("client") else None,
+            }
+            if path.startswith("/health") and status_code < 400:
+                extra["sample"] = "health"
+            access_logger.info(f"{scope['method']} {path} {status_code}", extra=extra)
@@ -1,21 +1,28 @@
 # Import all models to ensure they're registered with SQLAlchemy
 from .user import User, UserRole, SubscriptionTier
+from .user_session import UserSession
+from .role_permission import RolePermission
 from .persona import Persona, PersonaAccessStatus
-
-# Placeholder imports for models we'll create next
-# from .memory import Memory
-# from .media import Media
-# from .cultural import CulturalTemplate
-# from .planning import PlanningSession
+from .memory import Memory
+from .media import Media, MediaBlob, MediaType
+from .planning import PlanningSession, PlanningStep, PlanningStatus, StepStatus
+from .cultural import CulturalTradition
 
 __all__ = [
     "User",
     "UserRole", 
     "SubscriptionTier",
+    "UserSession",
+    "RolePermission",
     "Persona",
     "PersonaAccessStatus",
-    # "Memory",
-    # "Media", 
-    # "CulturalTemplate",
-    # "PlanningSession"
+    "Memory",
+    "Media",
+    "MediaBlob",
+    "MediaType",
+    "PlanningSession",
+    "PlanningStep",
+    "PlanningStatus",
+    "StepStatus",
+    "CulturalTradition",
 ]
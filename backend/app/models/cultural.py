@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.planning import JSONDocument
+
+class CulturalTradition(Base):
+    """A cultural or religious tradition that memorial planning can follow"""
+    __tablename__ = "cultural_traditions"
+    
+    id = Column(String(36), primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    religious_background = Column(String(100), nullable=True)
+    requirements = Column(JSONDocument, nullable=True)  # e.g. {"burial_within_hours": 24, "officiant": "rabbi"}
+    is_active = Column(Boolean, default=True, nullable=True)
+    
+    # Timestamps; updated_at also versions the in-memory catalog
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    updated_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    
+    def to_dict(self) -> dict:
+        """Serialize for API responses"""
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+    
+    def __repr__(self):
+        return f"<CulturalTradition(id={self.id}, name={self.name})>"
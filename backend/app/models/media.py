@@ -0,0 +1,88 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, BigInteger, Enum, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+import enum
+
+class MediaType(str, enum.Enum):
+    PHOTO = "photo"
+    VOICE = "voice"
+    DOCUMENT = "document"
+
+class MediaBlob(Base):
+    """Content-addressed file shared by every media row with the same bytes"""
+    __tablename__ = "media_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    storage_path = Column(String(500), nullable=False)  # relative to UPLOAD_DIR
+    ref_count = Column(Integer, default=0, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    released_at = Column(DateTime(timezone=True), nullable=True)  # when ref_count last dropped
+    
+    def __repr__(self):
+        return f"<MediaBlob(sha256={self.sha256}, refs={self.ref_count})>"
+
+class Media(Base):
+    """Photo, voice recording or document attached to a persona"""
+    __tablename__ = "media"
+    
+    # Core fields
+    id = Column(String(36), primary_key=True, index=True)
+    persona_id = Column(String(36), ForeignKey("personas.id", ondelete="CASCADE"), nullable=False)
+    media_type = Column(
+        Enum(MediaType, name="media_type", values_callable=lambda e: [m.value for m in e]),
+        nullable=False
+    )
+    
+    # File details
+    file_url = Column(String(500), nullable=False)
+    file_name = Column(String(255), nullable=True)
+    file_size_bytes = Column(BigInteger, nullable=True)
+    mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), ForeignKey("media_blobs.sha256"), nullable=True)
+    
+    # Descriptions and embeddings
+    description = Column(Text, nullable=True)
+    ai_generated_description = Column(Text, nullable=True)
+    embedding_vector = Column(JSON, nullable=True)
+    embedding_model = Column(String(50), nullable=True)
+    media_metadata = Column("metadata", JSON, nullable=True)  # dimensions, duration, etc.
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    
+    # Relationships
+    persona = relationship("Persona", back_populates="media_files")
+    blob = relationship("MediaBlob")
+    
+    __table_args__ = (
+        # A persona's media, newest first
+        Index("idx_media_persona_created", "persona_id", "created_at"),
+        # Named as in schema.sql and revision 0005
+        Index("idx_media_content_hash", "content_hash"),
+    )
+    
+    def __repr__(self):
+        return f"<Media(id={self.id}, persona_id={self.persona_id}, type={self.media_type})>"
+    
+    def to_dict(self) -> dict:
+        """Serialize for API responses"""
+        return {
+            "id": self.id,
+            "persona_id": self.persona_id,
+            "media_type": self.media_type,
+            "file_url": self.file_url,
+            "file_name": self.file_name,
+            "file_size_bytes": self.file_size_bytes,
+            "mime_type": self.mime_type,
+            "content_hash": self.content_hash,
+            "description": self.description,
+            "metadata": self.media_metadata or {},
+            "created_at": self.created_at,
+        }
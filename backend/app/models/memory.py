@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class Memory(Base):
+    """Text-based memory attached to a persona"""
+    __tablename__ = "memories"
+    
+    # Core fields
+    id = Column(String(36), primary_key=True, index=True)
+    persona_id = Column(String(36), ForeignKey("personas.id", ondelete="CASCADE"), nullable=False)
+    
+    # Content
+    title = Column(String(255), nullable=True)
+    content = Column(Text, nullable=False)
+    memory_type = Column(String(100), nullable=True)  # childhood, career, family, hobby, etc.
+    emotional_tone = Column(String(50), nullable=True)  # joyful, touching, humorous, etc.
+    
+    # Embeddings
+    embedding_vector = Column(JSON, nullable=True)
+    embedding_model = Column(String(50), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    
+    # Relationships
+    persona = relationship("Persona", back_populates="memories")
+    user = relationship("User", back_populates="memories")
+    
+    __table_args__ = (
+        # A persona's memories, newest first
+        Index("idx_memories_persona_created", "persona_id", "created_at"),
+    )
+    
+    def __repr__(self):
+        return f"<Memory(id={self.id}, persona_id={self.persona_id}, title={self.title})>"
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, Enum, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, Text, Integer, Enum, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
+import json
 
 class PersonaAccessStatus(str, enum.Enum):
     ACTIVE = "active"
@@ -16,7 +17,7 @@ class Persona(Base):
     
     # Core fields
     id = Column(String(36), primary_key=True, index=True)
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
     
     # Basic information
     name = Column(String(255), nullable=False)
@@ -79,9 +80,41 @@ class Persona(Base):
     memories = relationship("Memory", back_populates="persona", cascade="all, delete-orphan")
     media_files = relationship("Media", back_populates="persona", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Persona list: a user's personas in priority order, all or only active ones
+        Index("idx_personas_user_priority", "user_id", "priority_order", "id"),
+        Index(
+            "idx_personas_user_active_priority", "user_id", "priority_order", "id",
+            postgresql_where=access_status == PersonaAccessStatus.ACTIVE,
+            sqlite_where=access_status == PersonaAccessStatus.ACTIVE
+        ),
+    )
+    
+    # Columns stored as JSON text; each has get_<field>/set_<field> helpers
+    JSON_FIELDS = (
+        "cultural_traditions", "personality_traits", "memorable_quotes", "hobbies_interests",
+        "family_members", "close_friends", "pets", "venue_preferences", "music_preferences",
+        "flower_preferences", "photos", "videos", "documents",
+    )
+    
     def __repr__(self):
         return f"<Persona(id={self.id}, name={self.name}, status={self.access_status})>"
     
+    def set_fields(self, values: dict):
+        """Assign API fields, encoding the JSON text columns"""
+        for field, value in values.items():
+            if field in self.JSON_FIELDS:
+                setattr(self, field, json.dumps(value) if value is not None else None)
+            elif hasattr(self, field):
+                setattr(self, field, value)
+    
+    def to_dict(self) -> dict:
+        """Serialize for API responses"""
+        data = {column.name: getattr(self, column.name) for column in self.__table__.columns}
+        for field in self.JSON_FIELDS:
+            data[field] = getattr(self, f"get_{field}")()
+        return data
+    
     @property
     def is_locked(self) -> bool:
         """Check if persona is locked"""
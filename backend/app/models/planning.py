@@ -0,0 +1,114 @@
+from sqlalchemy import Column, String, DateTime, Date, Time, Text, Integer, Enum, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+import enum
+
+# JSONB on PostgreSQL, so step payloads can be patched in place
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+class PlanningStatus(str, enum.Enum):
+    DRAFT = "draft"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    ARCHIVED = "archived"
+
+class StepStatus(str, enum.Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    AI_GUIDED = "ai_guided"
+    COMPLETED = "completed"
+
+class PlanningSession(Base):
+    """Memorial planning session"""
+    __tablename__ = "planning_sessions"
+    
+    # Core fields
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    persona_id = Column(String(36), ForeignKey("personas.id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    # Service details
+    title = Column(String(255), nullable=False)
+    status = Column(
+        Enum(PlanningStatus, name="planning_status", values_callable=lambda e: [m.value for m in e]),
+        default=PlanningStatus.DRAFT,
+        nullable=False
+    )
+    cultural_tradition = Column(String(100), nullable=True)
+    deceased_name = Column(String(255), nullable=True)
+    service_type = Column(String(100), nullable=True)
+    venue = Column(String(255), nullable=True)
+    service_date = Column(Date, nullable=True)
+    service_time = Column(Time, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Relationships
+    user = relationship("User", back_populates="planning_sessions")
+    steps = relationship(
+        "PlanningStep",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="PlanningStep.step_number"
+    )
+    
+    def to_dict(self, include_steps: bool = False) -> dict:
+        """Serialize for API responses; steps only when they were loaded with the session"""
+        data = {column.name: getattr(self, column.name) for column in self.__table__.columns}
+        if include_steps:
+            data["steps"] = [step.to_dict() for step in self.steps]
+        return data
+    
+    def __repr__(self):
+        return f"<PlanningSession(id={self.id}, title={self.title}, status={self.status})>"
+
+class PlanningStep(Base):
+    """Single step of a planning session"""
+    __tablename__ = "planning_steps"
+    
+    # Core fields
+    id = Column(String(36), primary_key=True, index=True)
+    session_id = Column(String(36), ForeignKey("planning_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    step_number = Column(Integer, nullable=False)
+    step_type = Column(String(100), nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    
+    # Step payloads
+    data = Column(JSONDocument, nullable=True)
+    ai_insights = Column(JSONDocument, nullable=True)
+    revenue_opportunities = Column(JSONDocument, nullable=True)
+    
+    status = Column(
+        Enum(StepStatus, name="step_status", values_callable=lambda e: [m.value for m in e]),
+        default=StepStatus.PENDING,
+        nullable=False
+    )
+    estimated_time = Column(Integer, nullable=True)  # in minutes
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Relationships
+    session = relationship("PlanningSession", back_populates="steps")
+    
+    __table_args__ = (
+        # Steps are always read in order within their session
+        Index("idx_planning_steps_step_number", "session_id", "step_number"),
+    )
+    
+    # Columns that take JSON Merge Patch documents on update
+    JSON_FIELDS = ("data", "ai_insights", "revenue_opportunities")
+    
+    def to_dict(self) -> dict:
+        """Serialize for API responses"""
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+    
+    def __repr__(self):
+        return f"<PlanningStep(id={self.id}, step_number={self.step_number}, status={self.status})>"
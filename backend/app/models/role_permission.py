@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, DateTime, Enum, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.user import UserRole
+
+class RolePermission(Base):
+    """One action a role may take on a resource, e.g. ADMIN may read users"""
+    __tablename__ = "role_permissions"
+
+    id = Column(String(36), primary_key=True, index=True)
+    role = Column(Enum(UserRole, name="user_role"), nullable=False)
+    resource = Column(String(100), nullable=False)
+    action = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("role", "resource", "action"),
+    )
+
+    def __repr__(self):
+        return f"<RolePermission(role={self.role}, resource={self.resource}, action={self.action})>"
@@ -1,8 +1,12 @@
 from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Enum
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import object_session, relationship
 from app.database import Base
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import FrozenSet, Optional
 import enum
+import json
 
 class UserRole(str, enum.Enum):
     USER = "USER"
@@ -16,6 +20,36 @@ class SubscriptionTier(str, enum.Enum):
     HEALTHCARE = "healthcare"
     OTHER = "other"
 
+# Higher tiers include the features of lower ones
+TIER_LEVELS = {
+    SubscriptionTier.FREE.value: 0,
+    SubscriptionTier.PREMIUM.value: 1,
+    SubscriptionTier.RELIGIOUS.value: 2,
+    SubscriptionTier.HEALTHCARE.value: 3,
+    SubscriptionTier.OTHER.value: 2
+}
+
+TIER_LIMITS = {
+    SubscriptionTier.FREE: {"personas": 1, "storage": 100},
+    SubscriptionTier.PREMIUM: {"personas": 5, "storage": 1000},
+    SubscriptionTier.RELIGIOUS: {"personas": 10, "storage": 2000},
+    SubscriptionTier.HEALTHCARE: {"personas": 20, "storage": 5000},
+    SubscriptionTier.OTHER: {"personas": 10, "storage": 2000}
+}
+
+@lru_cache(maxsize=4096)
+def _decode_permissions(raw: Optional[str]) -> FrozenSet[str]:
+    """Parse a users.permissions JSON list; each distinct value is parsed once per worker"""
+    if not raw:
+        return frozenset()
+    try:
+        permissions = json.loads(raw)
+    except ValueError:
+        return frozenset()
+    if not isinstance(permissions, list):
+        return frozenset()
+    return frozenset(p for p in permissions if isinstance(p, str))
+
 class User(Base):
     """User model for AfterLight platform"""
     __tablename__ = "users"
@@ -54,6 +88,8 @@ class User(Base):
     # Role and permissions
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     permissions = Column(Text, nullable=True)  # JSON string of permissions
+    # Last change to role, tier or limits; access tokens issued before it must be refreshed
+    entitlements_updated_at = Column(DateTime(timezone=True), nullable=True, index=True)
     
     # Limits and usage
     max_personas = Column(Integer, default=1, nullable=False)
@@ -71,6 +107,17 @@ class User(Base):
     memories = relationship("Memory", back_populates="user", cascade="all, delete-orphan")
     planning_sessions = relationship("PlanningSession", back_populates="user", cascade="all, delete-orphan")
     
+    # Never serialized into API responses
+    PRIVATE_FIELDS = ("hashed_password", "salt", "permissions", "stripe_customer_id")
+    
+    def to_dict(self) -> dict:
+        """Serialize for API responses"""
+        return {
+            column.name: getattr(self, column.name)
+            for column in self.__table__.columns
+            if column.name not in self.PRIVATE_FIELDS
+        }
+    
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, tier={self.subscription_tier})>"
     
@@ -99,8 +146,16 @@ class User(Base):
         if not self.is_subscription_active:
             return False
         
-        # Count active personas
-        active_personas = sum(1 for p in self.personas if p.access_status == "active")
+        # Count active personas in SQL rather than loading every persona row
+        session = object_session(self)
+        if session is None:
+            active_personas = sum(1 for p in self.personas if p.access_status == "active")
+        else:
+            from app.models.persona import Persona, PersonaAccessStatus
+            active_personas = session.query(func.count(Persona.id)).filter(
+                Persona.user_id == self.id,
+                Persona.access_status == PersonaAccessStatus.ACTIVE
+            ).scalar()
         return active_personas < self.max_personas
     
     @property
@@ -110,25 +165,43 @@ class User(Base):
             return 0.0
         return (self.current_storage_mb / self.max_storage_mb) * 100
     
+    @property
+    def permission_overrides(self) -> FrozenSet[str]:
+        """Per-user grants from the permissions column, like manage_users or users:read"""
+        return _decode_permissions(self.permissions)
+    
     def has_permission(self, permission: str) -> bool:
-        """Check if user has specific permission"""
+        """Check if user has specific permission; "resource:action" also consults the role matrix"""
         if self.role == UserRole.SUPER_ADMIN:
             return True
         
         if self.role == UserRole.ADMIN and permission in ["manage_users", "manage_content", "view_analytics"]:
             return True
         
-        # Check custom permissions
-        if self.permissions:
-            try:
-                import json
-                user_permissions = json.loads(self.permissions)
-                return permission in user_permissions
-            except:
-                pass
+        if permission in self.permission_overrides:
+            return True
+        
+        resource, _, action = permission.partition(":")
+        if action:
+            from app.services.permissions import permission_matrix
+            return permission_matrix.allows(self.role, resource, action)
         
         return False
     
+    def mark_entitlements_changed(self):
+        """Call after changing role, tier, expiry or limits: access tokens carrying the old claims stop working"""
+        self.entitlements_updated_at = datetime.now(timezone.utc)
+        # This worker rejects them at once; others within ENTITLEMENT_SYNC_SECONDS
+        from app.services.entitlements import entitlement_changes
+        entitlement_changes.record(self.id, self.entitlements_updated_at)
+    
+    def deactivate(self):
+        """Deactivate the account and sign it out everywhere; commits the session the user is loaded in"""
+        self.is_active = False
+        self.mark_entitlements_changed()
+        from app.services.sessions import session_revocations
+        session_revocations.revoke_user(object_session(self), self.id)
+    
     def upgrade_subscription(self, new_tier: SubscriptionTier, expires_at: DateTime = None):
         """Upgrade user subscription"""
         self.subscription_tier = new_tier
@@ -136,18 +209,11 @@ class User(Base):
             self.subscription_expires_at = expires_at
         
         # Update limits based on tier
-        tier_limits = {
-            SubscriptionTier.FREE: {"personas": 1, "storage": 100},
-            SubscriptionTier.PREMIUM: {"personas": 5, "storage": 1000},
-            SubscriptionTier.RELIGIOUS: {"personas": 10, "storage": 2000},
-            SubscriptionTier.HEALTHCARE: {"personas": 20, "storage": 5000},
-            SubscriptionTier.OTHER: {"personas": 10, "storage": 2000}
-        }
-        
-        limits = tier_limits.get(new_tier, {"personas": 1, "storage": 100})
+        limits = TIER_LIMITS.get(new_tier, TIER_LIMITS[SubscriptionTier.FREE])
         self.max_personas = limits["personas"]
         self.max_storage_mb = limits["storage"]
         self.is_premium = new_tier != SubscriptionTier.FREE
+        self.mark_entitlements_changed()
     
     def downgrade_subscription(self, new_tier: SubscriptionTier):
         """Downgrade user subscription"""
@@ -155,18 +221,11 @@ class User(Base):
         self.subscription_tier = new_tier
         
         # Update limits
-        tier_limits = {
-            SubscriptionTier.FREE: {"personas": 1, "storage": 100},
-            SubscriptionTier.PREMIUM: {"personas": 5, "storage": 1000},
-            SubscriptionTier.RELIGIOUS: {"personas": 10, "storage": 2000},
-            SubscriptionTier.HEALTHCARE: {"personas": 20, "storage": 5000},
-            SubscriptionTier.OTHER: {"personas": 10, "storage": 2000}
-        }
-        
-        limits = tier_limits.get(new_tier, {"personas": 1, "storage": 100})
+        limits = TIER_LIMITS.get(new_tier, TIER_LIMITS[SubscriptionTier.FREE])
         self.max_personas = limits["personas"]
         self.max_storage_mb = limits["storage"]
         self.is_premium = new_tier != SubscriptionTier.FREE
+        self.mark_entitlements_changed()
         
         # Return old tier for downgrade processing
         return old_tier
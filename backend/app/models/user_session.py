@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UserSession(Base):
+    """A signed-in device: one refresh token lineage, rotated on every refresh"""
+    __tablename__ = "user_sessions"
+    
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # SHA-256 of the refresh token; the token itself is never stored
+    token_hash = Column(String(64), nullable=False)
+    # The token this one replaced: presenting it again means it was stolen
+    previous_token_hash = Column(String(64), nullable=True)
+    
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("idx_user_sessions_token_hash", "token_hash", unique=True),
+        Index("idx_user_sessions_previous_token_hash", "previous_token_hash"),
+        # Revocation sync reads recently revoked sessions only
+        Index(
+            "idx_user_sessions_revoked_at", "revoked_at",
+            postgresql_where=revoked_at.isnot(None),
+            sqlite_where=revoked_at.isnot(None)
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<UserSession(id={self.id}, user_id={self.user_id}, revoked={self.revoked_at is not None})>"
@@ -0,0 +1,118 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor execution events on the engine time every statement and add it to the
+QueryStats of the request being served (tracked in a context variable, which
+follows the request into the threadpool). Statements slower than
+SLOW_QUERY_THRESHOLD_MS are logged with their SQL normalized, and when one
+statement shape runs N_PLUS_ONE_THRESHOLD times or more within a single
+request it is reported as a likely N+1 lazy load.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.metrics import DB_QUERY_DURATION, DB_SLOW_QUERIES
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape: literals and bind parameters become ?"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryStats:
+    """Queries executed while serving one request"""
+    count: int = 0
+    total_seconds: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[normalize_sql(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes run at least threshold times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_tracking() -> QueryStats:
+    """Begin collecting query stats for the current request"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def stop_tracking():
+    _current_stats.set(None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def instrument_queries(engine):
+    """Time every statement executed through an engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        DB_QUERY_DURATION.observe(elapsed)
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            DB_SLOW_QUERIES.inc()
+            slow_query_logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {normalize_sql(statement)}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+def report_n_plus_one(stats: QueryStats, route: str) -> Dict[str, int]:
+    """Log statement shapes repeated often enough to look like N+1 loads"""
+    repeated = stats.repeated_shapes(settings.N_PLUS_ONE_THRESHOLD)
+    for shape, count in repeated:
+        logger.warning(f"Possible N+1 on {route}: {count} executions of {shape}")
+    return dict(repeated)
@@ -0,0 +1,223 @@
+"""
+Read-replica routing.
+
+Routes that only read declare `db: Session = Depends(get_read_db)` instead of
+get_db. Their session is bound to one of DATABASE_REPLICA_URLS, chosen round
+robin among the replicas that passed their last health check; with no
+replicas configured or none healthy, reads go to the primary as before, on
+the request's own get_db session rather than a second primary connection.
+
+Read-your-writes: when a request commits changes on the primary, that client
+reads from the primary for REPLICA_STICKY_SECONDS afterwards, so it never sees
+a replica that hasn't caught up with its own write. The client is recognised
+by a short-lived cookie (which works across workers and instances) and, for
+clients that drop cookies, by its bearer token within this worker.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal, create_pooled_engine, get_db
+from app.metrics import DB_READ_ROUTING, DB_REPLICAS_HEALTHY
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_COOKIE = "afterlight_last_write"
+
+
+class Replica:
+    def __init__(self, url: str, index: int):
+        self.url = url
+        self.name = f"replica-{index}"
+        self.engine = create_pooled_engine(url)
+        self.healthy = True
+        self.error: Optional[str] = None
+
+
+class ReplicaSet:
+    """Round-robin choice among healthy replicas, with a background health check"""
+
+    def __init__(self, urls: List[str]):
+        self.urls = urls
+        self._replicas: Optional[List[Replica]] = None
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def replicas(self) -> List[Replica]:
+        # Engines are created on first use, like the primary's
+        if self._replicas is None:
+            with self._lock:
+                if self._replicas is None:
+                    self._replicas = [Replica(url, i) for i, url in enumerate(self.urls)]
+                    DB_REPLICAS_HEALTHY.set(len(self._replicas))
+        return self._replicas
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, or None to read from the primary"""
+        if not self.urls:
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check(self, replica: Replica):
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            if not replica.healthy:
+                logger.info(f"Read replica {replica.name} is healthy again")
+            replica.healthy, replica.error = True, None
+        except Exception as e:
+            if replica.healthy:
+                logger.warning(f"Read replica {replica.name} failed its health check: {e}")
+            replica.healthy, replica.error = False, str(e)
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+        DB_REPLICAS_HEALTHY.set(sum(replica.healthy for replica in self.replicas))
+
+    async def _monitor_loop(self):
+        while True:
+            await run_in_threadpool(self.check_all)
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+    def start(self):
+        """Begin periodic health checks; call from the running event loop"""
+        if self.urls and self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+        for replica in self._replicas or []:
+            replica.engine.dispose()
+
+    def status(self) -> List[Dict[str, object]]:
+        return [
+            {"name": replica.name, "healthy": replica.healthy, "error": replica.error}
+            for replica in (self.replicas if self.urls else [])
+        ]
+
+
+replica_set = ReplicaSet(settings.DATABASE_REPLICA_URLS)
+
+
+@dataclass
+class RoutingState:
+    """Per-request routing flags, shared with threadpool copies of the context"""
+    sticky: bool = False
+    wrote: bool = False
+
+
+_routing_state: ContextVar[Optional[RoutingState]] = ContextVar("replica_routing", default=None)
+
+# Bearer token digest -> monotonic time of that client's last write, this worker only
+_recent_writes: Dict[str, float] = {}
+_last_prune = time.monotonic()
+
+
+def client_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()[:32]
+
+
+def wrote_recently(key: Optional[str], last_write_cookie: Optional[str]) -> bool:
+    """Whether the client wrote within the sticky window"""
+    window = settings.REPLICA_STICKY_SECONDS
+    if last_write_cookie:
+        try:
+            if time.time() - float(last_write_cookie) < window:
+                return True
+        except ValueError:
+            pass
+    written_at = _recent_writes.get(key) if key else None
+    return written_at is not None and time.monotonic() - written_at < window
+
+
+def record_write(key: Optional[str]):
+    global _last_prune
+    now = time.monotonic()
+    if key:
+        _recent_writes[key] = now
+    if now - _last_prune > 60:
+        cutoff = now - settings.REPLICA_STICKY_SECONDS
+        for stale in [k for k, written_at in _recent_writes.items() if written_at < cutoff]:
+            _recent_writes.pop(stale, None)
+        _last_prune = now
+
+
+def begin_request(sticky: bool) -> RoutingState:
+    state = RoutingState(sticky=sticky)
+    _routing_state.set(state)
+    return state
+
+
+def end_request():
+    _routing_state.set(None)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False) and session.info.get("target") != "replica":
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+            state.sticky = True
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("wrote", None)
+
+
+def get_read_db(primary: Session = Depends(get_db)):
+    """Dependency for read-only routes: a session on a replica when one is usable"""
+    state = _routing_state.get()
+    replica = None if state is not None and state.sticky else replica_set.choose()
+    if replica is None:
+        # Share the request's primary session (authentication already uses it)
+        # rather than holding a second primary connection
+        DB_READ_ROUTING.labels(target="primary").inc()
+        yield primary
+        return
+    
+    db = SessionLocal(bind=replica.engine, info={"target": "replica"})
+    DB_READ_ROUTING.labels(target="replica").inc()
+    try:
+        yield db
+    finally:
+        db.close()
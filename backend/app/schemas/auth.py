@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Any
+import re
+
+# Deliberately loose: deliverability is what email verification is for
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+class SignupRequest(BaseModel):
+    """Schema for creating an account"""
+    email: str = Field(..., max_length=255, description="Email address")
+    password: str = Field(..., min_length=8, description="Password, 8 characters to 72 bytes")
+    first_name: Optional[str] = Field(None, max_length=100, description="First name")
+    last_name: Optional[str] = Field(None, max_length=100, description="Last name")
+    
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, v):
+        """Normalize and sanity-check the email address"""
+        v = v.strip().lower()
+        if not EMAIL_PATTERN.match(v):
+            raise ValueError("Invalid email address")
+        return v
+    
+    @field_validator("password")
+    @classmethod
+    def validate_password(cls, v):
+        """bcrypt only looks at the first 72 bytes"""
+        if len(v.encode("utf-8")) > 72:
+            raise ValueError("Password must be at most 72 bytes")
+        return v
+
+class LoginRequest(BaseModel):
+    """Schema for signing in"""
+    email: str = Field(..., max_length=255)
+    password: str = Field(..., max_length=1024)
+    
+    @field_validator("email")
+    @classmethod
+    def normalize_email(cls, v):
+        """Match the normalization done at signup"""
+        return v.strip().lower()
+
+class RefreshRequest(BaseModel):
+    """Schema for exchanging a refresh token"""
+    refresh_token: str = Field(..., min_length=1)
+
+class AuthResponse(BaseModel):
+    """Schema for token responses"""
+    success: bool
+    data: Optional[Any] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
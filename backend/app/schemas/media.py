@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Any
+
+class MediaHashReference(BaseModel):
+    """Attach already-uploaded content to a persona by its hash"""
+    sha256: str = Field(..., min_length=64, max_length=64, pattern="^[0-9a-f]{64}$")
+    file_name: Optional[str] = Field(None, max_length=255)
+    description: Optional[str] = None
+
+class MediaResponse(BaseModel):
+    """Schema for media response"""
+    success: bool
+    data: Optional[Any] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class MediaListResponse(BaseModel):
+    """Schema for media list response"""
+    success: bool
+    data: List[Any]
+    total: int
+    message: Optional[str] = None
+    error: Optional[str] = None
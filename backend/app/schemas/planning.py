@@ -0,0 +1,94 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Any
+from datetime import date, time
+from app.models.planning import PlanningStatus, StepStatus
+
+def _not_null(v):
+    if v is None:
+        raise ValueError("May be omitted but not null")
+    return v
+
+class PlanningStepCreate(BaseModel):
+    """Schema for adding a step to a planning session"""
+    step_number: Optional[int] = Field(None, ge=1, description="Position in the session; appended when omitted")
+    step_type: str = Field(..., min_length=1, max_length=100)
+    title: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    data: Optional[Any] = None
+    ai_insights: Optional[Any] = None
+    revenue_opportunities: Optional[Any] = None
+    status: StepStatus = StepStatus.PENDING
+    estimated_time: Optional[int] = Field(None, ge=0, description="Estimated time in minutes")
+
+class PlanningStepUpdate(BaseModel):
+    """Schema for updating a step
+
+    data, ai_insights and revenue_opportunities are JSON Merge Patch documents:
+    objects are merged into the stored document, null removes a key, and any
+    other value replaces it. Only fields present in the request are changed.
+    """
+    step_number: Optional[int] = Field(None, ge=1)
+    step_type: Optional[str] = Field(None, min_length=1, max_length=100)
+    title: Optional[str] = Field(None, min_length=1, max_length=255)
+    description: Optional[str] = None
+    data: Optional[Any] = None
+    ai_insights: Optional[Any] = None
+    revenue_opportunities: Optional[Any] = None
+    status: Optional[StepStatus] = None
+    estimated_time: Optional[int] = Field(None, ge=0)
+    
+    @field_validator("step_number", "step_type", "title", "status")
+    @classmethod
+    def reject_null(cls, v):
+        """Optional only so the field can be omitted; the columns are NOT NULL"""
+        return _not_null(v)
+
+class PlanningSessionBase(BaseModel):
+    """Base planning session schema"""
+    title: str = Field(..., min_length=1, max_length=255)
+    persona_id: Optional[str] = Field(None, max_length=36)
+    cultural_tradition: Optional[str] = Field(None, max_length=100)
+    deceased_name: Optional[str] = Field(None, max_length=255)
+    service_type: Optional[str] = Field(None, max_length=100)
+    venue: Optional[str] = Field(None, max_length=255)
+    service_date: Optional[date] = None
+    service_time: Optional[time] = None
+
+class PlanningSessionCreate(PlanningSessionBase):
+    """Schema for starting a planning session, optionally with its steps"""
+    steps: List[PlanningStepCreate] = Field(default_factory=list, max_length=100)
+
+class PlanningSessionUpdate(BaseModel):
+    """Schema for updating a planning session"""
+    title: Optional[str] = Field(None, min_length=1, max_length=255)
+    persona_id: Optional[str] = Field(None, max_length=36)
+    status: Optional[PlanningStatus] = None
+    cultural_tradition: Optional[str] = Field(None, max_length=100)
+    deceased_name: Optional[str] = Field(None, max_length=255)
+    service_type: Optional[str] = Field(None, max_length=100)
+    venue: Optional[str] = Field(None, max_length=255)
+    service_date: Optional[date] = None
+    service_time: Optional[time] = None
+    
+    @field_validator("title", "status")
+    @classmethod
+    def reject_null(cls, v):
+        """Optional only so the field can be omitted; the columns are NOT NULL"""
+        return _not_null(v)
+
+class PlanningResponse(BaseModel):
+    """Schema for planning session and step responses"""
+    success: bool
+    data: Optional[Any] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class PlanningListResponse(BaseModel):
+    """Schema for planning session list responses"""
+    success: bool
+    data: List[Any]
+    total: int
+    skip: int
+    limit: int
+    message: Optional[str] = None
+    error: Optional[str] = None
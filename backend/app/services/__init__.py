@@ -0,0 +1 @@
+# Business logic shared by the API routers
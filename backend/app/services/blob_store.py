@@ -0,0 +1,214 @@
+"""
+Content-addressed, deduplicated storage for persona media.
+
+Every distinct file is stored once under UPLOAD_DIR/blobs, keyed by its SHA-256,
+and tracked by a reference-counted media_blobs row. Media rows point at blobs
+through media.content_hash, so the same family photo attached to several
+personas takes disk space once. When the last reference goes away the blob is
+garbage collected, right after the releasing request commits and, as a
+fallback, by a sweep every MEDIA_BLOB_GC_INTERVAL_MINUTES that also removes
+files moved in by an upload whose transaction then rolled back.
+
+Lock ordering: every path that creates, re-references or deletes a blob takes
+the media_blobs row lock first, and the collector unlinks the file before it
+deletes the row, so a concurrent upload of the same content can never lose
+its file. On PostgreSQL, creating a blob also holds a transaction-level
+advisory lock on its hash, which the sweep takes before deleting a file that
+has no row, so it can't remove a file whose row is about to be committed.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.media import Media, MediaBlob
+from app.services.uploads import StoredUpload
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Reference-counted content-addressed file store"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._task: Optional[asyncio.Task] = None
+
+    def relative_path(self, sha256: str) -> Path:
+        return Path("blobs") / sha256[:2] / sha256[2:4] / sha256
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / self.relative_path(sha256)
+
+    def _locked(self, db: Session, sha256: str) -> Optional[MediaBlob]:
+        return db.query(MediaBlob).filter(MediaBlob.sha256 == sha256).with_for_update().first()
+
+    def _lock_content(self, db: Session, sha256: str):
+        """Serialize file creation and orphan removal for one hash until the transaction ends"""
+        if db.get_bind().dialect.name == "postgresql":
+            # 60 bits of the hash fit a signed bigint key
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(sha256[:15], 16)})
+
+    def add(self, db: Session, upload: StoredUpload) -> MediaBlob:
+        """Store an upload, reusing the existing blob if the content is already known"""
+        self._lock_content(db, upload.sha256)
+        blob = self.acquire(db, upload.sha256)
+        if blob is not None:
+            if not self.path_for(upload.sha256).exists():
+                # Heal a blob whose file went missing
+                upload.move_to(self.path_for(upload.sha256))
+            return blob
+
+        upload.move_to(self.path_for(upload.sha256))
+        blob = MediaBlob(
+            sha256=upload.sha256,
+            size_bytes=upload.size,
+            mime_type=upload.mime_type,
+            storage_path=str(self.relative_path(upload.sha256)),
+            ref_count=1
+        )
+        try:
+            with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            # Another upload of the same content won the insert
+            blob = self.acquire(db, upload.sha256)
+        return blob
+
+    def acquire(self, db: Session, sha256: str) -> Optional[MediaBlob]:
+        """Take another reference on an existing blob"""
+        blob = self._locked(db, sha256)
+        if blob is None:
+            return None
+        blob.ref_count += 1
+        blob.released_at = None
+        return blob
+
+    def release(self, db: Session, sha256: str) -> bool:
+        """Drop a reference; returns True when the blob became unreferenced"""
+        blob = self._locked(db, sha256)
+        if blob is None:
+            return False
+        blob.ref_count = max(blob.ref_count - 1, 0)
+        if blob.ref_count == 0:
+            blob.released_at = datetime.utcnow()
+            return True
+        return False
+
+    def collect(self, sha256: str) -> bool:
+        """Delete an unreferenced blob; call after the releasing transaction commits"""
+        db = SessionLocal()
+        try:
+            blob = self._locked(db, sha256)
+            if blob is None or blob.ref_count > 0:
+                db.rollback()
+                return False
+            self.path_for(sha256).unlink(missing_ok=True)
+            db.delete(blob)
+            db.commit()
+            logger.info(f"Garbage collected blob {sha256}")
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to collect blob {sha256}: {e}")
+            return False
+        finally:
+            db.close()
+
+    def collect_orphan_files(self, grace_period: timedelta) -> int:
+        """Delete blob files older than the grace period that have no media_blobs row
+
+        They come from uploads whose transaction rolled back after add() moved the file in.
+        """
+        blobs_dir = self.root / "blobs"
+        if not blobs_dir.is_dir():
+            return 0
+        cutoff = time.time() - grace_period.total_seconds()
+        removed = 0
+        for directory, _, files in os.walk(blobs_dir):
+            for name in files:
+                if len(name) != 64 or name.strip("0123456789abcdef"):
+                    continue
+                path = Path(directory) / name
+                try:
+                    if path.stat().st_mtime >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                db = SessionLocal()
+                try:
+                    self._lock_content(db, name)
+                    if db.query(MediaBlob.sha256).filter(MediaBlob.sha256 == name).first() is None:
+                        path.unlink(missing_ok=True)
+                        removed += 1
+                        logger.info(f"Removed orphaned blob file {name}")
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to check blob file {name}: {e}")
+                finally:
+                    db.close()
+        return removed
+
+    def collect_garbage(self, grace_period: Optional[timedelta] = None) -> int:
+        """Sweep blobs left unreferenced, and files left without a row, longer than the grace period"""
+        if grace_period is None:
+            grace_period = timedelta(minutes=settings.MEDIA_BLOB_GC_GRACE_MINUTES)
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - grace_period
+            candidates: List[str] = [
+                sha256 for (sha256,) in db.query(MediaBlob.sha256).filter(
+                    MediaBlob.ref_count <= 0,
+                    MediaBlob.released_at < cutoff
+                ).all()
+            ]
+        finally:
+            db.close()
+        collected = sum(1 for sha256 in candidates if self.collect(sha256))
+        return collected + self.collect_orphan_files(grace_period)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(settings.MEDIA_BLOB_GC_INTERVAL_MINUTES * 60)
+            try:
+                collected = await run_in_threadpool(self.collect_garbage)
+                if collected:
+                    logger.info(f"Blob garbage collection removed {collected} blobs")
+            except Exception as e:
+                logger.warning(f"Blob garbage collection failed: {e}")
+
+    def start(self):
+        """Begin periodic garbage collection sweeps; call from the running event loop"""
+        if self._task is None and settings.MEDIA_BLOB_GC_INTERVAL_MINUTES > 0:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def find_owned(self, db: Session, user_persona_ids, sha256: str) -> Optional[Media]:
+        """Find a media row with this content among a user's personas"""
+        return db.query(Media).filter(
+            Media.content_hash == sha256,
+            Media.persona_id.in_(user_persona_ids)
+        ).first()
+
+
+blob_store = BlobStore(Path(settings.UPLOAD_DIR))
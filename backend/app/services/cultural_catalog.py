@@ -0,0 +1,194 @@
+"""
+In-memory cultural traditions catalog.
+
+cultural_traditions is a small table that changes only when the catalog is
+edited, and every planning flow reads it. Each worker serves it from an
+immutable CatalogSnapshot: the active traditions plus indexes by id, by name,
+by religious background and by requirement key, so no catalog request touches
+the database.
+
+Every CULTURAL_CATALOG_SYNC_SECONDS a version check reads the row count and
+the latest updated_at. Only when that changes is the table reloaded and a new
+snapshot swapped in; requests holding the old one finish with it. Edits made
+outside the ORM must bump updated_at to be picked up. A worker that edits the
+catalog calls refresh() to see the change at once.
+
+The version is derived from the table, so every worker computes the same one,
+and responses carry ETags built from it. A client revalidating with
+If-None-Match gets a 304 until the catalog actually changes. Serialized
+responses are memoized on the snapshot, so a catalog response is encoded once
+per snapshot rather than once per request.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.cultural import CulturalTradition
+
+logger = logging.getLogger(__name__)
+
+# Distinct (endpoint, filter) responses memoized per snapshot; arbitrary filters can't grow it further
+MAX_CACHED_RESPONSES = 1024
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+def requirement_keys(requirements) -> Tuple[str, ...]:
+    """Top-level keys of an object, or the entries of a list of strings"""
+    if isinstance(requirements, dict):
+        return tuple(sorted(requirements))
+    if isinstance(requirements, list):
+        return tuple(sorted({item for item in requirements if isinstance(item, str)}))
+    return ()
+
+
+class CatalogSnapshot:
+    """Immutable view of the active traditions with lookup indexes"""
+
+    def __init__(self, traditions: Iterable[dict], version: str):
+        self.version = version
+        self.traditions: Tuple[dict, ...] = tuple(sorted(traditions, key=lambda t: (_key(t["name"]), t["id"])))
+
+        by_background: Dict[str, List[dict]] = {}
+        by_requirement: Dict[str, List[dict]] = {}
+        for tradition in self.traditions:
+            by_background.setdefault(_key(tradition["religious_background"]), []).append(tradition)
+            for requirement in tradition["requirement_keys"]:
+                by_requirement.setdefault(_key(requirement), []).append(tradition)
+
+        self.by_id = MappingProxyType({tradition["id"]: tradition for tradition in self.traditions})
+        self.by_name = MappingProxyType({_key(tradition["name"]): tradition for tradition in self.traditions})
+        self.by_religious_background = MappingProxyType(
+            {background: tuple(group) for background, group in by_background.items()}
+        )
+        self.by_requirement = MappingProxyType(
+            {requirement: tuple(group) for requirement, group in by_requirement.items()}
+        )
+        self._responses: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, key: str) -> str:
+        """Strong ETag for one response; unchanged until the catalog changes"""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+        return f'"{self.version}-{digest}"'
+
+    def find(
+        self,
+        religious_background: Optional[str] = None,
+        requirement: Optional[str] = None
+    ) -> Tuple[dict, ...]:
+        """Traditions matching every filter given"""
+        if religious_background is not None:
+            matches = self.by_religious_background.get(_key(religious_background), ())
+        else:
+            matches = self.traditions
+        if requirement is not None:
+            wanted = set(map(id, self.by_requirement.get(_key(requirement), ())))
+            matches = tuple(tradition for tradition in matches if id(tradition) in wanted)
+        return matches
+
+    def lookup(self, id_or_name: str) -> Optional[dict]:
+        return self.by_id.get(id_or_name) or self.by_name.get(_key(id_or_name))
+
+    def response_body(self, key: str, build: Callable[[], object]) -> bytes:
+        """JSON for a response, encoded once per snapshot"""
+        body = self._responses.get(key)
+        if body is None:
+            body = json.dumps(build(), default=str, separators=(",", ":")).encode("utf-8")
+            with self._lock:
+                if len(self._responses) < MAX_CACHED_RESPONSES:
+                    self._responses[key] = body
+        return body
+
+
+class CulturalCatalog:
+    """Per-worker current snapshot, reloaded when the table's version changes"""
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # First read before the startup sync finished
+            self.sync()
+            snapshot = self._snapshot
+        return snapshot
+
+    async def current(self) -> CatalogSnapshot:
+        """The snapshot, loading it off the event loop if the startup sync hasn't finished"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = await run_in_threadpool(lambda: self.snapshot)
+        return snapshot
+
+    def sync(self, force: bool = False) -> bool:
+        """Check the table's version and reload on a change; True if a new snapshot was installed"""
+        db = SessionLocal()
+        try:
+            count, last_updated = db.execute(
+                select(func.count(CulturalTradition.id), func.max(CulturalTradition.updated_at))
+            ).one()
+            version = hashlib.sha256(f"{count}:{last_updated}".encode("utf-8")).hexdigest()[:16]
+
+            current = self._snapshot
+            if current is not None and current.version == version and not force:
+                return False
+
+            traditions = db.query(CulturalTradition).filter(CulturalTradition.is_active.isnot(False)).all()
+            entries = [
+                {**tradition.to_dict(), "requirement_keys": requirement_keys(tradition.requirements)}
+                for tradition in traditions
+            ]
+        finally:
+            db.close()
+
+        with self._lock:
+            self._snapshot = CatalogSnapshot(entries, version)
+        logger.info(f"Cultural catalog {version} loaded: {len(entries)} active traditions")
+        return True
+
+    def refresh(self) -> bool:
+        """Pick up a catalog edit in this worker without waiting for the next version check"""
+        return self.sync(force=True)
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                # Keep serving the last snapshot until the table can be read again
+                logger.warning(f"Cultural catalog sync failed: {e}")
+            await asyncio.sleep(settings.CULTURAL_CATALOG_SYNC_SECONDS)
+
+    def start(self):
+        """Load the catalog and keep it current; call from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+cultural_catalog = CulturalCatalog()
@@ -0,0 +1,187 @@
+"""
+Entitlement claims in access tokens.
+
+Role and subscription checks used to load the user row on every request just
+to compare a role or a tier. Access tokens now carry the user's entitlements
+as an `ent` claim, signed with the token and living only as long as it does:
+
+    {"role": "USER", "tier": "premium", "lvl": 1, "sub_exp": 1767225600,
+     "max_personas": 5, "active": true, "v": 1760832000000}
+
+so require_role_claims() and require_subscription_claims() authorize from the
+token alone.
+
+Claims must not outlive a change to what they describe. Each change stamps
+users.entitlements_updated_at (User.mark_entitlements_changed()), and `v` is
+that stamp in milliseconds when the token was issued. Every worker keeps the
+stamps changed within the last access-token lifetime, polling them every
+ENTITLEMENT_SYNC_SECONDS through the index on that column; a token whose `v`
+is older than its user's stamp gets a 401, and the client refreshes to get
+current claims. Older changes can't matter: every token issued before them
+has already expired.
+
+Deactivation is such a change: User.deactivate() clears is_active, stamps
+the column and revokes every session, so the user's tokens are rejected as
+stale and can't be refreshed, and tokens claiming an inactive account are
+refused outright. Routes that must see the current row, such as admin-only
+ones, still authenticate with get_current_user().
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.user import TIER_LEVELS, User
+
+logger = logging.getLogger(__name__)
+
+# Catch changes committed slightly out of entitlements_updated_at order by other workers
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+def _millis(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def entitlement_claims(user) -> dict:
+    """The `ent` claim for a User, or any row with the same entitlement columns"""
+    role = getattr(user.role, "value", user.role)
+    tier = getattr(user.subscription_tier, "value", user.subscription_tier)
+    expires_at = user.subscription_expires_at
+    return {
+        "role": role,
+        "tier": tier,
+        "lvl": TIER_LEVELS.get(tier, 0),
+        "sub_exp": _millis(expires_at) // 1000 if expires_at else None,
+        "max_personas": user.max_personas,
+        "active": bool(user.is_active),
+        "v": _millis(user.entitlements_updated_at)
+    }
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """Who a verified access token belongs to and what they may do"""
+    user_id: str
+    session_id: Optional[str]
+    role: str
+    tier: str
+    tier_level: int
+    subscription_expires_at: Optional[int]
+    max_personas: int
+    is_active: bool
+    version: int
+
+    @property
+    def id(self) -> str:
+        # Lets routes written against User keep using `current_user.id`
+        return self.user_id
+
+    @property
+    def is_subscription_active(self) -> bool:
+        return self.subscription_expires_at is None or self.subscription_expires_at > time.time()
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> Optional["TokenClaims"]:
+        """None for tokens issued without entitlement claims"""
+        ent = payload.get("ent")
+        if not isinstance(ent, dict) or "active" not in ent:
+            return None
+        return cls(
+            user_id=payload["sub"],
+            session_id=payload.get("sid"),
+            role=ent["role"],
+            tier=ent["tier"],
+            tier_level=ent["lvl"],
+            subscription_expires_at=ent.get("sub_exp"),
+            max_personas=ent["max_personas"],
+            is_active=ent["active"],
+            version=ent["v"]
+        )
+
+
+class EntitlementChanges:
+    """Per-worker view of users whose entitlements changed recently"""
+
+    def __init__(self):
+        self._changed: Dict[str, int] = {}
+        self._synced_through: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def window(self) -> timedelta:
+        return timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    def is_stale(self, claims: TokenClaims) -> bool:
+        """True if the user's entitlements changed after the token was issued"""
+        changed = self._changed.get(claims.user_id)
+        return changed is not None and changed > claims.version
+
+    def record(self, user_id: str, changed_at: datetime):
+        changed = _millis(changed_at)
+        if changed > self._changed.get(user_id, 0):
+            self._changed[user_id] = changed
+
+    def sync(self):
+        """Load changes made by other workers and forget those older than a token lifetime"""
+        now = _now()
+        since = now - self.window if self._synced_through is None else self._synced_through - SYNC_OVERLAP
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(User.id, User.entitlements_updated_at).where(User.entitlements_updated_at > since)
+            ).all()
+        finally:
+            db.close()
+
+        for user_id, changed_at in rows:
+            self.record(user_id, changed_at)
+
+        cutoff = _millis(now - self.window)
+        expired = [user_id for user_id, changed in self._changed.items() if changed < cutoff]
+        for user_id in expired:
+            del self._changed[user_id]
+        self._synced_through = now
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                # Keep the changes already known; only newer ones from other workers are missed
+                logger.warning(f"Entitlement change sync failed: {e}")
+            await asyncio.sleep(settings.ENTITLEMENT_SYNC_SECONDS)
+
+    def start(self):
+        """Begin periodic syncs; call from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+entitlement_changes = EntitlementChanges()
@@ -0,0 +1,120 @@
+"""
+Readiness checks for load balancer probes.
+
+Liveness (/health) does no I/O at all. Readiness (/health/ready) pings the
+database and, when enabled, Redis, but the result is cached for a few seconds
+and refreshed by a single probe at a time, so frequent probing from several
+sources costs one round trip per cache period. Pool utilization is read live
+on every call since it is free, and an exhausted pool marks the instance as
+not ready so traffic goes elsewhere until connections come back.
+"""
+
+import asyncio
+import logging
+import ssl
+import time
+from typing import Dict, Optional
+from urllib.parse import unquote, urlparse
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import health_check, pool_stats
+from app.replicas import replica_set
+
+logger = logging.getLogger(__name__)
+
+
+def _resp_command(*parts: str) -> bytes:
+    encoded = [part.encode() for part in parts]
+    return b"*%d\r\n" % len(encoded) + b"".join(b"$%d\r\n%s\r\n" % (len(part), part) for part in encoded)
+
+
+async def ping_redis(url: str, timeout: float) -> Dict[str, str]:
+    """PING Redis over a bare connection; no client library needed"""
+    parsed = urlparse(url)
+    context = ssl.create_default_context() if parsed.scheme == "rediss" else None
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379, ssl=context),
+            timeout
+        )
+        commands = []
+        if parsed.password:
+            credentials = [unquote(parsed.username)] if parsed.username else []
+            commands.append(_resp_command("AUTH", *credentials, unquote(parsed.password)))
+        commands.append(_resp_command("PING"))
+        writer.write(b"".join(commands))
+        await writer.drain()
+
+        for _ in commands:
+            reply = await asyncio.wait_for(reader.readline(), timeout)
+            if not reply.startswith((b"+OK", b"+PONG")):
+                return {"status": "unhealthy", "redis": reply.decode(errors="replace").strip()}
+        return {"status": "healthy", "redis": "connected"}
+    except Exception as e:
+        return {"status": "unhealthy", "redis": str(e) or type(e).__name__}
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class ReadinessProbe:
+    """Cached dependency checks combined with live pool utilization"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._checks: Optional[Dict[str, dict]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _run_checks(self) -> Dict[str, dict]:
+        checks = {}
+        try:
+            checks["database"] = await asyncio.wait_for(
+                run_in_threadpool(health_check), settings.HEALTH_CHECK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            checks["database"] = {"status": "unhealthy", "database": "timed out"}
+
+        if settings.HEALTH_CHECK_REDIS:
+            checks["redis"] = await ping_redis(settings.REDIS_URL, settings.HEALTH_CHECK_TIMEOUT)
+        return checks
+
+    async def checks(self) -> Dict[str, dict]:
+        """Dependency check results, at most ttl seconds old"""
+        if self._checks is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._checks
+
+        async with self._lock:
+            # Another probe may have refreshed the cache while we waited
+            if self._checks is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._checks = await self._run_checks()
+                self._checked_at = time.monotonic()
+                failing = [name for name, check in self._checks.items() if check["status"] != "healthy"]
+                if failing:
+                    logger.warning(f"Readiness check failing: {', '.join(failing)}")
+            return self._checks
+
+    async def status(self) -> dict:
+        """Full readiness report"""
+        pool = pool_stats()
+        if pool["exhausted"]:
+            # Pinging would just queue behind requests for a connection
+            checks = self._checks or {}
+        else:
+            checks = await self.checks()
+
+        ready = not pool["exhausted"] and all(check["status"] == "healthy" for check in checks.values())
+        return {
+            "ready": ready,
+            "checks": checks,
+            "pool": pool,
+            # Replicas don't gate readiness; reads fall back to the primary without them
+            "replicas": replica_set.status(),
+            "checked_at": time.time() - (time.monotonic() - self._checked_at) if self._checks else None
+        }
+
+
+readiness_probe = ReadinessProbe(ttl=settings.HEALTH_CHECK_CACHE_SECONDS)
@@ -0,0 +1,274 @@
+"""
+Server-side image derivatives.
+
+Resized and cropped variants (avatar thumbnails, print sizes) are rendered with
+Pillow in a process pool so decoding and resampling never run on the event
+loop. Results live in a content-addressed on-disk cache keyed by the source
+hash and the transform, with LRU eviction once the cache exceeds its size cap.
+Repeated requests for a variant are served straight from disk.
+
+Every worker process shares the cache directory, so the disk is the source of
+truth: a hit is confirmed with a stat (and picks up variants other workers
+rendered), file mtimes record use, and eviction re-reads the directory so it
+counts every worker's files.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> (width, height, fit). "cover" crops to fill, "contain" fits inside.
+VARIANT_SIZES: Dict[str, Tuple[int, int, str]] = {
+    "150": (150, 150, "cover"),
+    "300": (300, 300, "cover"),
+    "print": (2400, 3000, "contain"),  # 8x10 inches at 300 dpi
+}
+
+# Format name -> (Pillow format, mime type, file extension)
+VARIANT_FORMATS: Dict[str, Tuple[str, str, str]] = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+
+# A hit refreshes the file's mtime at most this often, so LRU order is shared without a write per request
+TOUCH_INTERVAL_SECONDS = 60
+# Other workers' writes are counted when the directory is re-read, at least this often
+RESCAN_INTERVAL_SECONDS = 30
+
+# Variants rendered ahead of time whenever a new avatar is uploaded
+DEFAULT_AVATAR_VARIANTS = [("150", "webp"), ("300", "webp")]
+
+
+def _render_variant(source: str, destination: str, width: int, height: int,
+                    fit: str, pil_format: str, quality: int) -> int:
+    """Render one variant to disk; runs inside a worker process"""
+    from PIL import Image, ImageOps
+    
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale while decoding, which is far cheaper
+        img.draft("RGB", (width, height))
+        img = ImageOps.exif_transpose(img)
+
+        if pil_format == "JPEG" and img.mode != "RGB":
+            img = _flatten(img)
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        if fit == "cover":
+            # Bias the crop upwards slightly, portraits usually frame the face high
+            img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS, centering=(0.5, 0.4))
+        else:
+            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+        save_options = {"quality": quality}
+        if pil_format == "JPEG":
+            save_options.update(optimize=True, progressive=True)
+        else:
+            save_options.update(method=4)
+        img.save(destination, pil_format, **save_options)
+
+    return os.path.getsize(destination)
+
+
+def _flatten(img: "Image.Image") -> "Image.Image":
+    """Composite transparent images onto white for formats without alpha"""
+    from PIL import Image
+    
+    rgba = img.convert("RGBA")
+    background = Image.new("RGB", rgba.size, (255, 255, 255))
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+
+class VariantCache:
+    """Size-capped LRU cache of rendered variants on disk"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._scanned_at = 0.0
+        self.loaded = False
+
+    def path_for(self, key: str, extension: str) -> Path:
+        return self.root / key[:2] / f"{key}{extension}"
+
+    def temp_path(self, extension: str) -> Path:
+        """A unique path in the cache directory for rendering into"""
+        tmp_dir = self.root / ".tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=tmp_dir, suffix=extension)
+        os.close(fd)
+        return Path(path)
+
+    def load(self):
+        """Index the variants on disk, least recently used first"""
+        self._scan()
+        self._evict()
+
+    def _scan(self):
+        files = []
+        if self.root.exists():
+            for path in self.root.glob("*/*"):
+                if path.parent.name == ".tmp" or not path.is_file():
+                    continue
+                stat = path.stat()
+                files.append((stat.st_mtime, path, stat.st_size))
+        files.sort()
+
+        with self._lock:
+            self._entries = OrderedDict((path, size) for _, path, size in files)
+            self._total_bytes = sum(size for _, _, size in files)
+            self._scanned_at = time.monotonic()
+            self.loaded = True
+
+    def get(self, path: Path) -> Optional[Path]:
+        """Return the variant path if it is on disk, marking it recently used"""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # Evicted by another worker, or never rendered
+            with self._lock:
+                self._total_bytes -= self._entries.pop(path, 0)
+            return None
+
+        with self._lock:
+            # Possibly rendered by another worker
+            self._total_bytes += stat.st_size - self._entries.pop(path, 0)
+            self._entries[path] = stat.st_size
+        if time.time() - stat.st_mtime > TOUCH_INTERVAL_SECONDS:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        return path
+
+    def put(self, path: Path, rendered: Path) -> Path:
+        """Move a freshly rendered file into the cache"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(rendered, path)
+        size = path.stat().st_size
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+        self._evict()
+        return path
+
+    def _evict(self):
+        if self._total_bytes > self.max_bytes or time.monotonic() - self._scanned_at > RESCAN_INTERVAL_SECONDS:
+            # Count every worker's files, not just the ones this process wrote
+            self._scan()
+
+        evicted = []
+        with self._lock:
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                path, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                evicted.append(path)
+
+        for path in evicted:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} image variants from cache")
+
+
+class ImageDerivativeService:
+    """Renders image variants in a process pool and caches them on disk"""
+
+    def __init__(self):
+        self.cache = VariantCache(
+            Path(settings.UPLOAD_DIR) / "variants",
+            settings.IMAGE_VARIANT_CACHE_MB * 1024 * 1024
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Path, asyncio.Task] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers avoid inheriting the event loop and its threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def get_variant(self, source: Path, source_hash: str, size: str, fmt: str) -> Path:
+        """Return the path of a rendered variant, rendering it on a cache miss"""
+        if size not in VARIANT_SIZES:
+            raise ValueError(f"Unknown image size: {size}")
+        if fmt not in VARIANT_FORMATS:
+            raise ValueError(f"Unknown image format: {fmt}")
+
+        if not self.cache.loaded:
+            await run_in_threadpool(self.cache.load)
+
+        extension = VARIANT_FORMATS[fmt][2]
+        path = self.cache.path_for(f"{source_hash}-{size}-q{settings.IMAGE_QUALITY}", extension)
+        if await run_in_threadpool(self.cache.get, path):
+            return path
+
+        # Concurrent requests for the same variant share a single render
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._render(source, path, size, fmt))
+            self._inflight[path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return await asyncio.shield(task)
+
+    async def run_in_pool(self, fn, *args):
+        """Run a picklable function in the image worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    async def warm_variants(self, source: Path, source_hash: str, variants=DEFAULT_AVATAR_VARIANTS):
+        """Render a set of variants ahead of the first request for them"""
+        for size, fmt in variants:
+            try:
+                await self.get_variant(source, source_hash, size, fmt)
+            except Exception as e:
+                logger.warning(f"Failed to pre-render {size}/{fmt} variant of {source_hash}: {e}")
+
+    async def _render(self, source: Path, path: Path, size: str, fmt: str) -> Path:
+        width, height, fit = VARIANT_SIZES[size]
+        pil_format = VARIANT_FORMATS[fmt][0]
+        rendered = await run_in_threadpool(self.cache.temp_path, path.suffix)
+        try:
+            await self.run_in_pool(
+                _render_variant,
+                str(source), str(rendered), width, height, fit, pil_format, settings.IMAGE_QUALITY
+            )
+            return await run_in_threadpool(self.cache.put, path, rendered)
+        except BaseException:
+            rendered.unlink(missing_ok=True)
+            raise
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_service = ImageDerivativeService()
@@ -0,0 +1,103 @@
+"""
+Startup warm-up and shutdown drain.
+
+At startup each worker opens DB_POOL_WARM_CONNECTIONS pooled connections in
+parallel (optionally priming them), so the first requests after a deploy
+don't queue behind TCP, TLS and authentication handshakes to Postgres.
+
+At shutdown new requests are refused with 503 and Connection: close, requests
+already running get up to SERVER_DRAIN_TIMEOUT seconds to finish, and only
+then are the image workers stopped and the engine disposed.
+"""
+
+import asyncio
+import logging
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import close_db_connections, warm_pool
+from app.replicas import replica_set
+from app.services.blob_store import blob_store
+from app.services.cultural_catalog import cultural_catalog
+from app.services.entitlements import entitlement_changes
+from app.services.images import image_service
+from app.services.passwords import password_hasher
+from app.services.permissions import permission_matrix
+from app.services.sessions import session_revocations
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightRequests:
+    """Counts requests being served and whether the process is draining"""
+
+    def __init__(self):
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self):
+        self.count += 1
+        self._idle.clear()
+
+    def finished(self):
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    def begin_drain(self):
+        self.draining = True
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait for running requests to finish; False if some were still running at the timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+inflight_requests = InFlightRequests()
+
+
+async def warm_database_pool():
+    """Open pooled connections before the worker takes traffic; failures only log"""
+    if settings.DB_POOL_WARM_CONNECTIONS <= 0:
+        return
+
+    started = time.perf_counter()
+    try:
+        opened = await asyncio.wait_for(
+            run_in_threadpool(warm_pool, settings.DB_POOL_WARM_CONNECTIONS, settings.DB_POOL_PRIME_STATEMENTS),
+            settings.DB_POOL_WARM_TIMEOUT
+        )
+        logger.info(f"Database pool warmed: {opened} connections in {(time.perf_counter() - started) * 1000:.0f}ms")
+    except asyncio.TimeoutError:
+        logger.warning(f"Database pool warm-up gave up after {settings.DB_POOL_WARM_TIMEOUT}s")
+    except Exception as e:
+        # Readiness will report the database; don't stop the worker from starting
+        logger.warning(f"Database pool warm-up failed: {e}")
+
+
+async def drain_and_close():
+    """Refuse new requests, let running ones finish, then release the pool"""
+    inflight_requests.begin_drain()
+    if inflight_requests.count:
+        logger.info(f"Draining {inflight_requests.count} in-flight requests")
+    if not await inflight_requests.wait_idle(settings.SERVER_DRAIN_TIMEOUT):
+        logger.warning(
+            f"{inflight_requests.count} requests still running after {settings.SERVER_DRAIN_TIMEOUT}s; closing anyway"
+        )
+
+    image_service.shutdown()
+    password_hasher.shutdown()
+    await replica_set.stop()
+    await session_revocations.stop()
+    await entitlement_changes.stop()
+    await permission_matrix.stop()
+    await cultural_catalog.stop()
+    await blob_store.stop()
+    close_db_connections()
@@ -0,0 +1,167 @@
+"""
+File responses for stored media.
+
+Photos, voice recordings and videos are streamed from disk in fixed-size chunks
+(or handed to the server's zero-copy extension when it offers one), so a
+download never loads the file into Python memory. Single byte ranges are
+supported for audio and video scrubbing, ETags are strong, and serving can be
+offloaded entirely to nginx with X-Accel-Redirect.
+"""
+
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+
+# Cache policy for content-addressed files whose URL changes with their content
+IMMUTABLE_CACHE_CONTROL = f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file"""
+
+
+def parse_range_header(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into inclusive (start, end) offsets"""
+    unit, _, ranges = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # Unknown units and multi-range requests get the whole file
+        return None
+
+    start_text, separator, end_text = ranges.strip().partition("-")
+    if not separator:
+        return None
+
+    try:
+        if not start_text:
+            suffix_length = int(end_text)
+            if suffix_length == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix_length, 0), size - 1
+        else:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+class MediaFileResponse(FileResponse):
+    """FileResponse that can send a byte range and use zero-copy sends"""
+
+    def __init__(self, path: Path, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        size = self.stat_result.st_size
+        self.offset, last = byte_range if byte_range else (0, size - 1)
+        self.count = max(last - self.offset + 1, 0)
+        if byte_range:
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {self.offset}-{last}/{size}"
+            self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.send_header_only or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            # Let the server sendfile() straight from the page cache
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.offset)
+                remaining = self.count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining > 0:
+                    # File shrank underneath us; close the response cleanly
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+
+async def media_file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    etag: str,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+) -> Response:
+    """Serve a file from UPLOAD_DIR with conditional, range and offload support"""
+    stat_result = await anyio.to_thread.run_sync(os.stat, path)
+
+    quoted_etag = f'"{etag}"'
+    headers = {
+        "etag": quoted_etag,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), quoted_etag):
+        return Response(status_code=304, headers=headers)
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the bytes (ranges included) with sendfile
+        relative = path.resolve().relative_to(Path(settings.UPLOAD_DIR).resolve())
+        headers["x-accel-redirect"] = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(relative.as_posix())}"
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == quoted_etag):
+        try:
+            byte_range = parse_range_header(range_header, stat_result.st_size)
+        except RangeNotSatisfiable:
+            headers["content-range"] = f"bytes */{stat_result.st_size}"
+            return Response(status_code=416, headers=headers)
+
+    return MediaFileResponse(
+        path,
+        byte_range=byte_range,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
+        method=request.method,
+    )
@@ -0,0 +1,122 @@
+"""
+Password hashing.
+
+bcrypt is deliberately slow (~250ms at cost 12) and holds a CPU for that
+long, so it never runs on the event loop. Hashes and checks run on a small
+dedicated thread pool (bcrypt releases the GIL), sized separately from the
+default executor that sync routes and file I/O share. In front of the pool, a
+ConcurrencyLimiter bounds how many logins may wait for it: a login storm
+gets fast 503s instead of a queue that makes every other request slow.
+
+Stored hashes whose cost differs from BCRYPT_ROUNDS are reported by verify()
+so the caller can rehash them while it has the plaintext.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+
+from app.config import settings
+from app.metrics import ADMISSION_REJECTIONS, PASSWORD_HASH_DURATION
+from app.middleware.admission import ConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+# bcrypt ignores everything past 72 bytes; longer passwords are refused at signup
+MAX_PASSWORD_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool and its queue are full"""
+
+
+def _hash(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode("ascii")
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password, hashed)
+    except ValueError:
+        # Not a bcrypt hash (or a password bcrypt refuses): never a match
+        return False
+
+
+def _rounds(hashed: str) -> Optional[int]:
+    # $2b$12$<22 char salt><31 char hash>
+    parts = hashed.split("$")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._limiter: Optional[ConcurrencyLimiter] = None
+        self._dummy_hash: Optional[bytes] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+            self._limiter = ConcurrencyLimiter(
+                "password_hash",
+                settings.PASSWORD_HASH_WORKERS,
+                settings.PASSWORD_HASH_MAX_QUEUE,
+                settings.PASSWORD_HASH_QUEUE_TIMEOUT_MS / 1000
+            )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        executor = self._get_executor()
+        if not await self._limiter.acquire():
+            ADMISSION_REJECTIONS.labels(pool="password_hash").inc()
+            logger.warning(f"Password hashing saturated: {self._limiter.active} active, {self._limiter.waiting} queued")
+            raise PasswordHasherBusy()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self._limiter.release()
+            PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password at the configured cost"""
+        return await self._run("hash", _hash, password.encode("utf-8"), settings.BCRYPT_ROUNDS)
+
+    async def verify(self, password: str, hashed: Optional[str]) -> Tuple[bool, bool]:
+        """Check a password; returns (matches, needs_rehash)
+
+        With no stored hash (unknown account) a dummy hash is checked instead,
+        so the response takes as long as for a real account.
+        """
+        encoded = password.encode("utf-8")
+        if len(encoded) > MAX_PASSWORD_BYTES:
+            encoded = encoded[:MAX_PASSWORD_BYTES]  # all bcrypt ever compared; newer releases refuse the rest
+        if not hashed:
+            if self._dummy_hash is None:
+                self._dummy_hash = (await self.hash("afterlight-dummy-password")).encode("ascii")
+            await self._run("verify", _check, encoded, self._dummy_hash)
+            return False, False
+
+        matches = await self._run("verify", _check, encoded, hashed.encode("ascii", "replace"))
+        needs_rehash = matches and (not hashed.startswith("$2b$") or _rounds(hashed) != settings.BCRYPT_ROUNDS)
+        return matches, needs_rehash
+
+    def shutdown(self):
+        """Stop the hashing threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._limiter = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,158 @@
+"""
+Role permission matrix.
+
+The role_permissions table is small and changes only when an operator edits
+it, yet check_user_permission() queried it (and users) on every call. Each
+worker instead holds the whole table as an immutable PermissionMatrix: one
+bitset of granted actions per (role, resource), so a check is two dict
+lookups and an AND, with no I/O.
+
+The matrix is rebuilt only when the table's contents change. Every
+PERMISSION_MATRIX_SYNC_SECONDS the rows are read back and fingerprinted; a
+different fingerprint swaps in a new matrix with the next version number,
+and requests already holding the old one finish with it. A worker that
+edits the table calls refresh() to see the change at once.
+
+Per-user overrides in users.permissions are decoded by the User model once
+per distinct value (User.permission_overrides), so they cost no JSON
+parsing per check either.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.role_permission import RolePermission
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+
+def _role_name(role) -> str:
+    return getattr(role, "value", role)
+
+
+class PermissionMatrix:
+    """Immutable role × resource × action grants"""
+
+    __slots__ = ("version", "fingerprint", "_action_bits", "_grants")
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str]], version: int = 0, fingerprint: str = ""):
+        action_bits: Dict[str, int] = {}
+        grants: Dict[Tuple[str, str], int] = {}
+        for role, resource, action in rows:
+            bit = action_bits.setdefault(action, 1 << len(action_bits))
+            key = (_role_name(role), resource)
+            grants[key] = grants.get(key, 0) | bit
+        self.version = version
+        self.fingerprint = fingerprint
+        self._action_bits = MappingProxyType(action_bits)
+        self._grants = MappingProxyType(grants)
+
+    def allows(self, role, resource: str, action: str) -> bool:
+        """True if the role is granted the action; SUPER_ADMIN is granted everything"""
+        role = _role_name(role)
+        if role == UserRole.SUPER_ADMIN.value:
+            return True
+        bit = self._action_bits.get(action)
+        return bit is not None and bool(self._grants.get((role, resource), 0) & bit)
+
+    def grants_for(self, role) -> Dict[str, List[str]]:
+        """Every resource the role may act on, with its actions"""
+        role = _role_name(role)
+        granted: Dict[str, List[str]] = {}
+        for (grant_role, resource), mask in self._grants.items():
+            if grant_role == role:
+                granted[resource] = sorted(action for action, bit in self._action_bits.items() if mask & bit)
+        return dict(sorted(granted.items()))
+
+    def roles(self) -> List[str]:
+        return sorted({role for role, _ in self._grants})
+
+
+class PermissionMatrixCache:
+    """Per-worker current matrix, re-read when the table changes"""
+
+    def __init__(self):
+        self._matrix: Optional[PermissionMatrix] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def matrix(self) -> PermissionMatrix:
+        matrix = self._matrix
+        if matrix is None:
+            # First check before the startup sync finished
+            self.sync()
+            matrix = self._matrix
+        return matrix
+
+    def allows(self, role, resource: str, action: str) -> bool:
+        return self.matrix.allows(role, resource, action)
+
+    def user_can(self, user, resource: str, action: str) -> bool:
+        """Role grant or a per-user "resource:action" override"""
+        return (
+            self.matrix.allows(user.role, resource, action)
+            or f"{resource}:{action}" in user.permission_overrides
+        )
+
+    def sync(self, force: bool = False) -> bool:
+        """Reload the table; True if a new matrix version was installed"""
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(RolePermission.role, RolePermission.resource, RolePermission.action)
+            ).all()
+        finally:
+            db.close()
+
+        rows = sorted((_role_name(role), resource, action) for role, resource, action in rows)
+        fingerprint = hashlib.sha256(repr(rows).encode("utf-8")).hexdigest()
+
+        with self._lock:
+            current = self._matrix
+            if current is not None and current.fingerprint == fingerprint and not force:
+                return False
+            version = current.version + 1 if current is not None else 1
+            self._matrix = PermissionMatrix(rows, version, fingerprint)
+        logger.info(f"Permission matrix v{version} loaded: {len(rows)} grants")
+        return True
+
+    def refresh(self) -> bool:
+        """Pick up an edit to role_permissions in this worker without waiting for the next sync"""
+        return self.sync(force=True)
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                # Keep checking against the last matrix until the table can be read again
+                logger.warning(f"Permission matrix sync failed: {e}")
+            await asyncio.sleep(settings.PERMISSION_MATRIX_SYNC_SECONDS)
+
+    def start(self):
+        """Load the matrix and keep it current; call from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+permission_matrix = PermissionMatrixCache()
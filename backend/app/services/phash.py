@@ -0,0 +1,253 @@
+"""
+Perceptual hashes for duplicate and near-duplicate photo detection.
+
+Each photo gets a 64-bit dHash (gradient) and pHash (DCT) computed with NumPy
+in the image worker pool and stored in media.metadata as hex. Lookups run over
+a packed uint64 array: a single query is one vectorized XOR + popcount pass,
+and all-pairs duplicate search uses multi-index hashing (sorted joins on 16-bit
+blocks) so only candidate pairs are ever compared. No pairwise Python loops.
+
+Checking one new photo applies the same block rule in SQL: only photos whose
+stored hex matches a probe on some block are loaded, not the user's whole
+library.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.media import Media, MediaType
+from app.models.persona import Persona
+from app.services.images import image_service
+
+HASH_BITS = 64
+
+# Multi-index hashing: hashes within distance d differ by at most d // 4 bits
+# in at least one of four 16-bit blocks
+BLOCK_COUNT = 4
+BLOCK_BITS = HASH_BITS // BLOCK_COUNT
+
+# Popcount lookup for one byte, used when numpy lacks bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis"""
+    k = np.arange(size).reshape(-1, 1)
+    n = np.arange(size).reshape(1, -1)
+    matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def _compute_hashes(path: str) -> Tuple[int, int]:
+    """Compute (dhash, phash) for an image; runs inside a worker process"""
+    with Image.open(path) as img:
+        img.draft("L", (64, 64))
+        gray = ImageOps.exif_transpose(img).convert("L")
+
+    # dHash: is each pixel brighter than its left neighbour on a 9x8 thumbnail
+    small = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    dhash = _pack_bits(small[:, 1:] > small[:, :-1])
+
+    # pHash: low-frequency DCT coefficients against their median, DC term excluded
+    pixels = np.asarray(gray.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    phash = _pack_bits(low > np.median(low.ravel()[1:]))
+
+    return dhash, phash
+
+
+async def compute_perceptual_hashes(path) -> Dict[str, str]:
+    """Hash a stored photo off the event loop; returns hex strings for metadata"""
+    dhash, phash = await image_service.run_in_pool(_compute_hashes, str(path))
+    return {"dhash": f"{dhash:016x}", "phash": f"{phash:016x}"}
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    """Bit distance between every hash in a uint64 array and one value"""
+    return _popcount(np.bitwise_xor(hashes, np.uint64(value)))
+
+
+@lru_cache(maxsize=8)
+def _flip_masks(radius: int) -> Tuple[int, ...]:
+    """Every block-sized mask with at most radius bits set"""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for weight in range(radius + 1)
+        for bits in combinations(range(BLOCK_BITS), weight)
+    )
+
+
+@dataclass(frozen=True)
+class HashMatch:
+    media_id: str
+    distance: int
+
+
+@dataclass(frozen=True)
+class HashPair:
+    media_id: str
+    other_media_id: str
+    distance: int
+
+
+class HashIndex:
+    """Packed uint64 array of perceptual hashes with vectorized lookups"""
+
+    def __init__(self, ids: Sequence[str], hashes: np.ndarray):
+        self.ids = list(ids)
+        self.hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+
+    @classmethod
+    def from_hex(cls, rows: Sequence[Tuple[str, Optional[str]]]) -> "HashIndex":
+        """Build from (media_id, hex hash) rows, skipping rows without a hash"""
+        pairs = [(media_id, int(value, 16)) for media_id, value in rows if value]
+        ids = [media_id for media_id, _ in pairs]
+        hashes = np.fromiter((value for _, value in pairs), dtype=np.uint64, count=len(pairs))
+        return cls(ids, hashes)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, value: int, max_distance: int) -> List[HashMatch]:
+        """All hashes within max_distance bits of value, closest first"""
+        if not self.ids:
+            return []
+        distances = hamming_distances(self.hashes, value)
+        hits = np.flatnonzero(distances <= max_distance)
+        hits = hits[np.argsort(distances[hits], kind="stable")]
+        return [HashMatch(self.ids[i], int(distances[i])) for i in hits]
+
+    def duplicate_pairs(self, max_distance: int) -> List[HashPair]:
+        """Every pair of hashes within max_distance bits of each other"""
+        count = len(self.ids)
+        if count < 2:
+            return []
+
+        found_left, found_right = [], []
+        for left, right in self._candidate_pairs(max_distance):
+            distances = _popcount(np.bitwise_xor(self.hashes[left], self.hashes[right]))
+            keep = distances <= max_distance
+            found_left.append(left[keep])
+            found_right.append(right[keep])
+        if not found_left:
+            return []
+
+        # A pair close on several blocks is found once per block
+        unique = np.unique(np.concatenate(found_left) * count + np.concatenate(found_right))
+        left, right = unique // count, unique % count
+        distances = _popcount(np.bitwise_xor(self.hashes[left], self.hashes[right]))
+        return [
+            HashPair(self.ids[i], self.ids[j], int(d))
+            for i, j, d in zip(left, right, distances)
+        ]
+
+    def _candidate_pairs(self, max_distance: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Index pairs (i < j) within the per-block radius on some block"""
+        count = len(self.ids)
+        radius = max_distance // BLOCK_COUNT
+        block_mask = np.uint64((1 << BLOCK_BITS) - 1)
+        positions = np.arange(count, dtype=np.int64)
+
+        for block in range(BLOCK_COUNT):
+            keys = ((self.hashes >> np.uint64(block * BLOCK_BITS)) & block_mask).astype(np.intp)
+            # Dense bucket table over the 16-bit key space: order[starts[k]:starts[k] + sizes[k]]
+            order = np.argsort(keys, kind="stable")
+            sizes = np.bincount(keys, minlength=1 << BLOCK_BITS)
+            starts = np.cumsum(sizes) - sizes
+
+            for flip in _flip_masks(radius):
+                probes = keys ^ flip
+                counts = sizes[probes]
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                left = np.repeat(positions, counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                right = order[np.repeat(starts[probes], counts) + offsets]
+                keep = left < right
+                yield left[keep], right[keep]
+
+
+def load_user_index(db: Session, user_id: str, hash_name: str = "phash") -> HashIndex:
+    """Index every hashed photo across a user's personas"""
+    rows = db.query(Media.id, Media.media_metadata[hash_name].as_string()).join(
+        Persona, Persona.id == Media.persona_id
+    ).filter(
+        Persona.user_id == user_id,
+        Media.media_type == MediaType.PHOTO
+    ).all()
+    return HashIndex.from_hex(rows)
+
+
+def load_candidate_index(db: Session, user_id: str, value: int, max_distance: int,
+                         hash_name: str = "phash", exclude_id: Optional[str] = None) -> HashIndex:
+    """Index the user's photos that could be within max_distance bits of value
+
+    A photo qualifies if some 16-bit block is within the per-block radius of
+    value's, compared on the block's four hex digits, so the database returns
+    only candidates for query() to check exactly.
+    """
+    column = Media.media_metadata[hash_name].as_string()
+    block_mask = (1 << BLOCK_BITS) - 1
+    digits = BLOCK_BITS // 4
+    conditions = []
+    for block in range(BLOCK_COUNT):
+        key = (value >> (block * BLOCK_BITS)) & block_mask
+        probes = [f"{key ^ flip:0{digits}x}" for flip in _flip_masks(max_distance // BLOCK_COUNT)]
+        # Hex is most significant first, so block 0 is the last four digits
+        start = (BLOCK_COUNT - 1 - block) * digits + 1
+        conditions.append(func.substr(column, start, digits).in_(probes))
+
+    query = db.query(Media.id, column).join(
+        Persona, Persona.id == Media.persona_id
+    ).filter(
+        Persona.user_id == user_id,
+        Media.media_type == MediaType.PHOTO,
+        or_(*conditions)
+    )
+    if exclude_id is not None:
+        query = query.filter(Media.id != exclude_id)
+    return HashIndex.from_hex(query.all())
+
+
+def group_pairs(pairs: Sequence[HashPair]) -> List[List[str]]:
+    """Merge overlapping pairs into groups of likely duplicates"""
+    parent: Dict[str, str] = {}
+
+    def find(item: str) -> str:
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for pair in pairs:
+        root_a, root_b = find(pair.media_id), find(pair.other_media_id)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    groups: Dict[str, List[str]] = {}
+    for item in parent:
+        groups.setdefault(find(item), []).append(item)
+    return [members for members in groups.values() if len(members) > 1]
@@ -0,0 +1,163 @@
+"""
+Partial updates to planning steps.
+
+The planner UI autosaves the step being edited every few seconds, usually
+changing a few keys of its `data`, `ai_insights` or `revenue_opportunities`
+document. Instead of reading the step, merging in Python and writing the
+whole document back, a step update carries JSON Merge Patch documents
+(RFC 7386) for those columns and is compiled into a single
+UPDATE ... RETURNING: objects merge key by key with `||`, a null removes a
+key with `-`, and any other value replaces what was there. The ownership
+check is part of the same statement, so an autosave is one round trip that
+rewrites only the step row.
+
+Databases other than PostgreSQL (SQLite in development) have no jsonb
+operators, so there the patch is applied in Python on the loaded step.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Text, case, cast, func, literal, null, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Session
+
+from app.models.planning import PlanningSession, PlanningStep, StepStatus
+
+MAX_PATCH_DEPTH = 16
+# jsonb_build_object takes at most 100 arguments
+MAX_KEYS_PER_OBJECT = 50
+
+
+class PatchTooDeep(ValueError):
+    pass
+
+
+def merge_patch(target: Any, patch: Any, depth: int = 0) -> Any:
+    """Apply a JSON Merge Patch to a decoded document"""
+    if not isinstance(patch, dict):
+        return patch
+    if depth > MAX_PATCH_DEPTH:
+        raise PatchTooDeep(f"Merge patches can nest at most {MAX_PATCH_DEPTH} objects deep")
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value, depth + 1)
+    return result
+
+
+def _jsonb(value: Any):
+    return cast(literal(json.dumps(value), Text), JSONB)
+
+
+def merge_patch_expression(target, patch: Any, depth: int = 0):
+    """SQL that applies a JSON Merge Patch to a jsonb expression"""
+    if not isinstance(patch, dict):
+        return _jsonb(patch)
+    if depth > MAX_PATCH_DEPTH:
+        raise PatchTooDeep(f"Merge patches can nest at most {MAX_PATCH_DEPTH} objects deep")
+
+    # A missing or non-object target is patched as an empty object
+    merged = case((func.jsonb_typeof(target) == "object", target), else_=_jsonb({}))
+
+    removed = [key for key, value in patch.items() if value is None]
+    if removed:
+        merged = merged.op("-", return_type=JSONB)(cast(literal(removed, ARRAY(Text)), ARRAY(Text)))
+
+    pairs = []
+    for key, value in patch.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            member = target.op("->", return_type=JSONB)(literal(key, Text))
+            value_expression = merge_patch_expression(member, value, depth + 1)
+        else:
+            value_expression = _jsonb(value)
+        pairs.append((key, value_expression))
+
+    for start in range(0, len(pairs), MAX_KEYS_PER_OBJECT):
+        arguments = []
+        for key, value_expression in pairs[start:start + MAX_KEYS_PER_OBJECT]:
+            arguments.extend((literal(key, Text), value_expression))
+        merged = merged.op("||", return_type=JSONB)(func.jsonb_build_object(*arguments, type_=JSONB))
+    return merged
+
+
+def owned_session_id(session_id: str, user_id: str):
+    """Scalar subquery for the session id, or NULL when the user doesn't own it"""
+    return select(PlanningSession.id).where(
+        PlanningSession.id == session_id,
+        PlanningSession.user_id == user_id
+    ).scalar_subquery()
+
+
+def _status_values(changes: Dict[str, Any]) -> Dict[str, Any]:
+    if "status" not in changes:
+        return {}
+    completed = changes["status"] == StepStatus.COMPLETED
+    return {"completed_at": func.now() if completed else None}
+
+
+def update_step(
+    db: Session,
+    user_id: str,
+    session_id: str,
+    step_id: str,
+    changes: Dict[str, Any]
+) -> Optional[dict]:
+    """Apply column changes and merge patches to a step the user owns; None if there is no such step
+
+    The caller commits.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return _update_step_in_python(db, user_id, session_id, step_id, changes)
+
+    values = {**changes, **_status_values(changes)}
+    for field in PlanningStep.JSON_FIELDS:
+        if field not in values:
+            continue
+        if values[field] is None:
+            # A null patch removes the whole document; SQL NULL rather than JSON null
+            values[field] = null()
+        else:
+            values[field] = merge_patch_expression(PlanningStep.__table__.c[field], values[field])
+
+    row = db.execute(
+        update(PlanningStep)
+        .where(
+            PlanningStep.id == step_id,
+            PlanningStep.session_id == owned_session_id(session_id, user_id)
+        )
+        .values(**values)
+        .returning(*PlanningStep.__table__.columns)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def _update_step_in_python(
+    db: Session,
+    user_id: str,
+    session_id: str,
+    step_id: str,
+    changes: Dict[str, Any]
+) -> Optional[dict]:
+    step = db.query(PlanningStep).join(PlanningSession).filter(
+        PlanningStep.id == step_id,
+        PlanningStep.session_id == session_id,
+        PlanningSession.user_id == user_id
+    ).first()
+    if step is None:
+        return None
+
+    for field, value in changes.items():
+        if field in PlanningStep.JSON_FIELDS:
+            value = null() if value is None else merge_patch(getattr(step, field), value)
+        setattr(step, field, value)
+    if "status" in changes:
+        step.completed_at = func.now() if changes["status"] == StepStatus.COMPLETED else None
+    db.flush()
+    db.refresh(step)
+    return step.to_dict()
@@ -0,0 +1,209 @@
+"""
+On-demand profiling of a live instance.
+
+The CPU sampler is a background thread that wakes every few milliseconds,
+reads sys._current_frames() and counts each thread's stack. It never traces or
+instruments the code being profiled, so overhead is one frame walk per thread
+per tick, which is safe under production traffic. Results come out as
+collapsed stacks ("frame;frame;frame count") that flamegraph.pl and
+speedscope read directly.
+
+The memory profiler runs tracemalloc for a bounded window and diffs the
+snapshots taken at either end, showing which call sites grew. tracemalloc is
+expensive while it is on, so it is only ever enabled for that window.
+
+Only one profiling run is allowed at a time per process.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Leaf frames that mean a thread is parked rather than doing work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("handlers.py", "dequeue"),  # the logging QueueListener
+}
+
+
+class ProfilerBusy(Exception):
+    """Another profiling run is already in progress"""
+
+
+_run_lock = threading.Lock()
+
+
+@dataclass
+class StackProfile:
+    duration: float
+    interval: float
+    ticks: int = 0
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, heaviest stacks first"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 20) -> List[Dict[str, object]]:
+        """Functions ranked by samples where they were the leaf frame"""
+        leaf_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        total = max(self.samples, 1)
+        return [
+            {"function": function, "samples": count, "percent": round(100 * count / total, 2)}
+            for function, count in leaf_counts.most_common(limit)
+        ]
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+class StackSampler:
+    """Samples every thread's stack on a fixed interval"""
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self._labels: Dict[object, str] = {}
+        self._idle_codes: Dict[object, bool] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{_short_path(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, code) -> bool:
+        idle = self._idle_codes.get(code)
+        if idle is None:
+            idle = (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+            self._idle_codes[code] = idle
+        return idle
+
+    def sample_once(self, profile: StackProfile, own_thread_id: int, thread_names: Dict[int, str]):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            if not self.include_idle and self._is_idle(frame.f_code):
+                continue
+
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            labels.reverse()
+            profile.stacks[";".join(labels)] += 1
+            profile.samples += 1
+        profile.ticks += 1
+
+    def run(self, duration: float) -> StackProfile:
+        """Sample until duration elapses; blocks the calling thread"""
+        profile = StackProfile(duration=duration, interval=self.interval)
+        own_thread_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        next_tick = time.monotonic()
+        while next_tick < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.sample_once(profile, own_thread_id, thread_names)
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind; skip missed ticks instead of sampling in a burst
+                next_tick = time.monotonic()
+        return profile
+
+
+async def _run_exclusive(fn, *args):
+    """Run a profiling job on its own thread so it doesn't occupy the request threadpool"""
+    if not _run_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(setter, value):
+        if not future.done():
+            setter(value)
+
+    def target():
+        try:
+            loop.call_soon_threadsafe(settle, future.set_result, fn(*args))
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, future.set_exception, e)
+        finally:
+            _run_lock.release()
+
+    threading.Thread(target=target, name="profiler", daemon=True).start()
+    return await future
+
+
+async def profile_cpu(duration: float, interval: float, include_idle: bool = False) -> StackProfile:
+    """Sample all thread stacks for duration seconds"""
+    sampler = StackSampler(interval, include_idle)
+    return await _run_exclusive(sampler.run, duration)
+
+
+def _memory_diff(duration: float, frames: int, limit: int, group_by: str) -> Dict[str, object]:
+    if tracemalloc.is_tracing():
+        raise ProfilerBusy()
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+    tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        time.sleep(duration)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    diffs = after.compare_to(before, group_by)
+    return {
+        "duration": duration,
+        "group_by": group_by,
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "total_growth_bytes": sum(diff.size_diff for diff in diffs),
+        "top": [
+            {
+                "size_diff_bytes": diff.size_diff,
+                "size_bytes": diff.size,
+                "count_diff": diff.count_diff,
+                "count": diff.count,
+                "traceback": [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in diff.traceback],
+            }
+            for diff in diffs[:limit]
+        ],
+    }
+
+
+async def profile_memory(duration: float, frames: int, limit: int, group_by: str = "lineno") -> Dict[str, object]:
+    """Trace allocations for duration seconds and report the call sites that grew"""
+    return await _run_exclusive(_memory_diff, duration, frames, limit, group_by)
@@ -0,0 +1,244 @@
+"""
+Refresh-token sessions and access-token revocation.
+
+A sign-in creates a user_sessions row holding the SHA-256 of an opaque
+refresh token. Every refresh rotates the token in place, and presenting a
+token that was already rotated away revokes the session, since one of its
+two holders stole it. Access tokens carry the session id as `sid`.
+
+Revoking a session has to stop its access tokens before they expire,
+without a database read on every request. Each worker keeps the ids of
+sessions revoked within the last access-token lifetime in a bloom filter.
+Older revocations can't matter, because every access token they could stop
+has already expired. A miss in the filter means "definitely not revoked",
+which covers nearly every request, and costs one hash. Only a hit, whether
+a real revocation or a false positive (SESSION_REVOCATION_BLOOM_FP_RATE),
+is confirmed against the table. A worker adds its own revocations to the
+filter at once. Revocations made by other workers are polled every
+SESSION_REVOCATION_SYNC_SECONDS through a partial index on revoked_at.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import AUTH_FAILURES, SESSION_REVOCATION_CHECKS
+from app.models.user_session import UserSession
+
+logger = logging.getLogger(__name__)
+
+# Catch revocations committed slightly out of revoked_at order by other workers
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings; no false negatives, no removal"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        if key in self:
+            return  # re-synced ids mustn't inflate the count
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SessionRevocations:
+    """Per-worker view of recently revoked sessions"""
+
+    def __init__(self):
+        self._filter: Optional[BloomFilter] = None
+        self._synced_through: Optional[datetime] = None
+        self._rebuilt_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def window(self) -> timedelta:
+        # An access token issued just before its session was revoked lives this long
+        return timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    def is_revoked(self, db: Session, session_id: str) -> bool:
+        """True if the session was revoked; reads the database only on a filter hit"""
+        bloom = self._filter
+        if bloom is not None and session_id not in bloom:
+            SESSION_REVOCATION_CHECKS.labels(result="negative").inc()
+            return False
+
+        # A filter hit, or no filter yet because the first sync hasn't finished
+        revoked = db.query(UserSession.revoked_at).filter(UserSession.id == session_id).scalar() is not None
+        if bloom is None:
+            SESSION_REVOCATION_CHECKS.labels(result="unsynced").inc()
+        else:
+            SESSION_REVOCATION_CHECKS.labels(result="revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    def _add(self, session_ids: Iterable[str]):
+        bloom = self._filter
+        if bloom is None:
+            return  # the first sync loads everything
+        for session_id in session_ids:
+            bloom.add(session_id)
+
+    def revoke(self, db: Session, session_id: str) -> bool:
+        """Revoke one session; False if it was already revoked or doesn't exist"""
+        revoked = db.execute(
+            update(UserSession)
+            .where(UserSession.id == session_id, UserSession.revoked_at.is_(None))
+            .values(revoked_at=_now())
+        ).rowcount
+        db.commit()
+        self._add([session_id])
+        return bool(revoked)
+
+    def revoke_user(self, db: Session, user_id: str) -> int:
+        """Revoke every session of a user, e.g. on sign-out everywhere or deactivation"""
+        session_ids = db.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
+            .values(revoked_at=_now())
+            .returning(UserSession.id)
+        ).scalars().all()
+        db.commit()
+        self._add(session_ids)
+        return len(session_ids)
+
+    def sync(self):
+        """Load revocations made by other workers; rebuilds the filter once per window"""
+        now = _now()
+        rebuild = (
+            self._filter is None
+            or now - self._rebuilt_at >= self.window
+            or self._filter.count > self._filter.capacity
+        )
+        since = now - self.window if rebuild else self._synced_through - SYNC_OVERLAP
+
+        db = SessionLocal()
+        try:
+            session_ids = db.execute(
+                select(UserSession.id).where(UserSession.revoked_at > since)
+            ).scalars().all()
+        finally:
+            db.close()
+
+        if rebuild:
+            bloom = BloomFilter(
+                max(settings.SESSION_REVOCATION_BLOOM_CAPACITY, len(session_ids) * 2),
+                settings.SESSION_REVOCATION_BLOOM_FP_RATE
+            )
+            for session_id in session_ids:
+                bloom.add(session_id)
+            # A revocation made here while the query ran went into the old filter; the
+            # next sync reads back past `now`, so it is only missing until then
+            self._filter, self._rebuilt_at = bloom, now
+            logger.info(f"Session revocation filter rebuilt: {len(session_ids)} revoked sessions, "
+                        f"{bloom.size // 8 // 1024}KB, {bloom.hashes} hashes")
+        else:
+            self._add(session_ids)
+        self._synced_through = now
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                # Keep serving from the last filter; it only misses revocations since then
+                logger.warning(f"Session revocation sync failed: {e}")
+            await asyncio.sleep(settings.SESSION_REVOCATION_SYNC_SECONDS)
+
+    def start(self):
+        """Begin periodic syncs; call from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_revocations = SessionRevocations()
+
+
+def create_session(db: Session, user_id: str) -> Tuple[str, str]:
+    """Add a session for a sign-in; returns (session_id, refresh_token). The caller commits"""
+    refresh_token = secrets.token_urlsafe(32)
+    session = UserSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        token_hash=hash_token(refresh_token),
+        expires_at=_now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.add(session)
+    return session.id, refresh_token
+
+
+def rotate_session(db: Session, refresh_token: str) -> Optional[Tuple[str, str, str]]:
+    """Swap a refresh token for a new one; returns (session_id, user_id, refresh_token) or None"""
+    presented = hash_token(refresh_token)
+    replacement = secrets.token_urlsafe(32)
+    now = _now()
+
+    # One statement, so two refreshes racing with the same token can't both succeed
+    row = db.execute(
+        update(UserSession)
+        .where(
+            UserSession.token_hash == presented,
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > now
+        )
+        .values(token_hash=hash_token(replacement), previous_token_hash=presented, last_used_at=now)
+        .returning(UserSession.id, UserSession.user_id)
+    ).first()
+    if row is not None:
+        db.commit()
+        return row.id, row.user_id, replacement
+
+    reused = db.query(UserSession.id).filter(
+        UserSession.previous_token_hash == presented,
+        UserSession.revoked_at.is_(None)
+    ).scalar()
+    db.rollback()
+    if reused is not None:
+        logger.warning(f"Refresh token reused for session {reused}; revoking the session")
+        AUTH_FAILURES.labels(reason="refresh_token_reuse").inc()
+        session_revocations.revoke(db, reused)
+    return None
@@ -0,0 +1,330 @@
+"""
+Streaming multipart uploads.
+
+The request body is parsed incrementally and written straight to a temp file
+under UPLOAD_DIR, so each upload holds roughly one network chunk in memory no
+matter how large the file is or how many uploads run at once. The content hash
+and MIME sniffing happen on the same pass, and the upload is aborted as soon as
+it exceeds MAX_FILE_SIZE.
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import multipart
+from multipart.multipart import parse_options_header
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+# Magic numbers for the file types we know how to store: (offset, signature, mime type)
+FILE_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (8, b"WAVE", "audio/wav"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"\xff\xfb", "audio/mpeg"),
+    (0, b"\xff\xf3", "audio/mpeg"),
+    (4, b"ftypM4A", "audio/mp4"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"%PDF-", "application/pdf"),
+]
+
+# Types that live inside a RIFF container
+RIFF_TYPES = {"image/webp", "audio/wav"}
+
+# Number of leading bytes needed to identify any of the signatures above
+SNIFF_BYTES = 16
+
+# Header bytes we are willing to buffer for a single multipart part
+MAX_PART_HEADER_BYTES = 16 * 1024
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "audio/wav": ".wav",
+    "audio/mpeg": ".mp3",
+    "audio/mp4": ".m4a",
+    "video/mp4": ".mp4",
+    "application/pdf": ".pdf",
+}
+
+# OpenAPI description for routes that read the multipart body themselves
+MULTIPART_FILE_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+def sniff_mime_type(head: bytes) -> Optional[str]:
+    """Identify a file type from its leading bytes"""
+    for offset, signature, mime_type in FILE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if mime_type in RIFF_TYPES and not head.startswith(b"RIFF"):
+                continue
+            return mime_type
+    return None
+
+
+def media_url(persona_id: str, kind: str, name: str) -> str:
+    """Build the public URL for a stored persona file"""
+    return f"{settings.MEDIA_URL_PREFIX}/{persona_id}/{kind}/{name}"
+
+
+def parse_media_url(url: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """Split a URL built by media_url() into (persona_id, kind, name)"""
+    prefix = f"{settings.MEDIA_URL_PREFIX}/"
+    if not url or not url.startswith(prefix):
+        return None
+    parts = url[len(prefix):].split("/")
+    if len(parts) != 3 or not all(parts) or ".." in parts:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def avatar_path(persona_id: str, file_name: str) -> Path:
+    """Location of a persona avatar under UPLOAD_DIR"""
+    return Path(settings.UPLOAD_DIR) / "avatars" / persona_id / file_name
+
+
+@dataclass
+class StoredUpload:
+    """An upload that has been fully received into a temp file"""
+    path: Path
+    sha256: str
+    size: int
+    mime_type: str
+    filename: Optional[str] = None
+    committed: bool = False
+
+    @property
+    def extension(self) -> str:
+        return MIME_EXTENSIONS.get(self.mime_type, "")
+
+    def move_to(self, destination: Path) -> Path:
+        """Atomically move the temp file into its final location"""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.path, destination)
+        self.path = destination
+        self.committed = True
+        return destination
+
+    def discard(self):
+        """Remove the temp file if it was never moved into place"""
+        if self.committed:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+@dataclass
+class _PartState:
+    """Bookkeeping for the multipart part currently being parsed"""
+    disposition: bytes = b""
+    header_name: bytes = b""
+    header_value: bytes = b""
+    header_bytes: int = 0
+    is_target: bool = False
+
+
+@dataclass
+class _UploadReceiver:
+    """Collects the bytes of a single file field from python-multipart callbacks"""
+    field_name: str
+    part: _PartState = field(default_factory=_PartState)
+    pending: List[bytes] = field(default_factory=list)
+    found: bool = False
+    finished: bool = False
+    filename: Optional[str] = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self.part = _PartState()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._track_header_bytes(end - start)
+        self.part.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._track_header_bytes(end - start)
+        self.part.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.part.header_name.lower() == b"content-disposition":
+            self.part.disposition = self.part.header_value
+        self.part.header_name = b""
+        self.part.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.part.disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        # Only the first matching file part is stored, everything else is skipped
+        if name == self.field_name and b"filename" in options and not self.found:
+            self.part.is_target = True
+            self.found = True
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.part.is_target:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        if self.part.is_target:
+            self.finished = True
+
+    def drain(self) -> bytes:
+        """Return and clear the file bytes parsed from the last chunk"""
+        if not self.pending:
+            return b""
+        data = b"".join(self.pending)
+        self.pending.clear()
+        return data
+
+    def _track_header_bytes(self, count: int):
+        self.part.header_bytes += count
+        if self.part.header_bytes > MAX_PART_HEADER_BYTES:
+            raise HTTPException(status_code=400, detail="Multipart headers too large")
+
+
+class _TempFileWriter:
+    """Writes and hashes upload chunks; called from the threadpool"""
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, prefix="upload-")
+        self.path = Path(path)
+        self.file = os.fdopen(fd, "wb")
+        self.hasher = hashlib.sha256()
+
+    def write(self, data: bytes):
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def receive_upload(
+    request: Request,
+    field_name: str = "file",
+    allowed_types: Optional[Sequence[str]] = None,
+    max_size: Optional[int] = None,
+) -> StoredUpload:
+    """Stream a multipart file field to a temp file under UPLOAD_DIR"""
+    allowed_types = allowed_types if allowed_types is not None else settings.ALLOWED_FILE_TYPES
+    max_size = max_size if max_size is not None else settings.MAX_FILE_SIZE
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data upload")
+
+    # Reject obviously oversized bodies before reading a single byte
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_size + MULTIPART_OVERHEAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"File exceeds maximum size of {max_size} bytes")
+
+    receiver = _UploadReceiver(field_name=field_name)
+    parser = multipart.MultipartParser(params[b"boundary"], receiver.callbacks())
+    writer = await run_in_threadpool(_TempFileWriter, Path(settings.UPLOAD_DIR) / ".tmp")
+
+    size = 0
+    head = b""
+    mime_type = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            data = receiver.drain()
+            if not data:
+                if receiver.finished:
+                    break
+                continue
+
+            size += len(data)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail=f"File exceeds maximum size of {max_size} bytes")
+
+            if mime_type is None:
+                head = (head + data)[:SNIFF_BYTES]
+                if len(head) >= SNIFF_BYTES:
+                    mime_type = _check_mime_type(head, allowed_types)
+
+            await run_in_threadpool(writer.write, data)
+            if receiver.finished:
+                break
+        parser.finalize()
+
+        if not receiver.found or size == 0:
+            raise HTTPException(status_code=400, detail=f"No file provided in field '{field_name}'")
+        if not receiver.finished:
+            # The body ended before the part's closing boundary: a truncated file
+            raise HTTPException(status_code=400, detail="Upload ended before the file was complete")
+        if mime_type is None:
+            mime_type = _check_mime_type(head, allowed_types)
+
+        await run_in_threadpool(writer.finish)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+
+    return StoredUpload(
+        path=writer.path,
+        sha256=writer.hasher.hexdigest(),
+        size=size,
+        mime_type=mime_type,
+        filename=receiver.filename,
+    )
+
+
+def _check_mime_type(head: bytes, allowed_types: Sequence[str]) -> str:
+    mime_type = sniff_mime_type(head)
+    if mime_type is None or mime_type not in allowed_types:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
+        )
+    return mime_type
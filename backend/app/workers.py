@@ -0,0 +1,19 @@
+"""
+Gunicorn worker class for production.
+
+Each gunicorn worker runs one uvicorn server with the compiled event loop and
+HTTP parser forced on: if uvloop or httptools is missing the worker fails to
+boot instead of silently falling back to the slower pure-Python versions.
+"""
+
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "access_log": False,  # RequestContextMiddleware writes the access log
+        "server_header": False,
+    }
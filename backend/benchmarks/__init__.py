@@ -0,0 +1,10 @@
+"""
+Load tests and benchmarks for the AfterLight API.
+
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --users 500
+    python -m benchmarks.run --base-url http://localhost:8000 --output results/HEAD.json
+    python -m benchmarks.compare results/main.json results/HEAD.json
+    python -m benchmarks.query_plans --database-url postgresql://localhost/afterlight_plans
+
+See benchmarks/README.md for the full workflow.
+"""
@@ -0,0 +1,85 @@
+"""
+Diff two benchmark result files.
+
+    python -m benchmarks.compare results/main.json results/HEAD.json --threshold 10
+
+Prints the change in throughput and latency percentiles for every scenario
+and request present in both runs. The exit status is 1 when any p95 or p99
+latency grows by more than --threshold percent, or when the error rate rises.
+That makes the check usable as a CI gate.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def _format(before: float, after: float, unit: str = "") -> str:
+    change = _change(before, after)
+    delta = f"{change:+.1f}%" if change is not None else "n/a"
+    return f"{before:>9.2f}{unit} -> {after:>9.2f}{unit} ({delta})"
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> List[str]:
+    """Print a comparison and return the regressions found"""
+    regressions = []
+    for scenario, base_result in baseline["scenarios"].items():
+        new_result = candidate["scenarios"].get(scenario)
+        if new_result is None:
+            continue
+        rows = [("overall", base_result["overall"], new_result["overall"])]
+        rows += [
+            (label, stats, new_result["requests"][label])
+            for label, stats in base_result["requests"].items()
+            if label in new_result["requests"] and label != scenario
+        ]
+
+        print(f"\n{scenario}")
+        for label, before, after in rows:
+            print(f"  {label}")
+            print(f"    throughput  {_format(before['throughput_rps'], after['throughput_rps'], ' rps')}")
+            for pct in ("p50", "p95", "p99"):
+                print(f"    {pct:<10}  {_format(before['latency_ms'][pct], after['latency_ms'][pct], ' ms')}")
+                change = _change(before["latency_ms"][pct], after["latency_ms"][pct])
+                if pct != "p50" and change is not None and change > threshold:
+                    regressions.append(f"{scenario}/{label} {pct} +{change:.1f}%")
+            if after["error_rate"] > before["error_rate"]:
+                print(f"    errors      {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+                regressions.append(f"{scenario}/{label} error rate {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95/p99 growth in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['meta']['commit']} -> {candidate['meta']['commit']}")
+    if baseline["meta"].get("data") != candidate["meta"].get("data"):
+        print("warning: the runs used different data sets")
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Seeded synthetic data for benchmarks.
+
+Generates users across every SubscriptionTier, personas with realistic JSON
+fields, memories and media rows, and bulk-loads them into SQLite or Postgres
+with batched executemany inserts. The same seed always produces the same
+rows, so benchmark runs against a fresh load are comparable.
+
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --users 500 --seed 42
+
+A manifest (user ids, tiers, entitlement claims and persona ids) is written
+next to the data for the load runner to pick users and personas from and
+mint their access tokens with.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Iterator, List
+
+from sqlalchemy import create_engine
+
+from app.database import Base
+from app.models import Media, MediaType, Memory, Persona, PersonaAccessStatus, SubscriptionTier, User, UserRole
+from app.services.entitlements import entitlement_claims
+
+# Share of users on each tier, and the persona/storage limits each tier gets
+TIER_WEIGHTS = {
+    SubscriptionTier.FREE: 0.55,
+    SubscriptionTier.PREMIUM: 0.25,
+    SubscriptionTier.RELIGIOUS: 0.08,
+    SubscriptionTier.HEALTHCARE: 0.07,
+    SubscriptionTier.OTHER: 0.05,
+}
+TIER_LIMITS = {
+    SubscriptionTier.FREE: (1, 100),
+    SubscriptionTier.PREMIUM: (5, 1000),
+    SubscriptionTier.RELIGIOUS: (10, 2000),
+    SubscriptionTier.HEALTHCARE: (20, 5000),
+    SubscriptionTier.OTHER: (10, 2000),
+}
+
+FIRST_NAMES = ["Margaret", "James", "Rosa", "Wei", "Amara", "Thomas", "Leila", "Samuel", "Ines", "Kenji",
+               "Olivia", "Dmitri", "Fatima", "George", "Hannah", "Rahul", "Esther", "Miguel", "Grace", "Yusuf"]
+LAST_NAMES = ["Okafor", "Smith", "Garcia", "Chen", "Kowalski", "Haddad", "Nguyen", "Rossi", "Murphy", "Cohen",
+              "Tanaka", "Silva", "Johansson", "Patel", "Mensah", "Novak", "Dubois", "Kim", "Adeyemi", "Walsh"]
+RELATIONSHIPS = ["mother", "father", "grandmother", "grandfather", "sister", "brother", "spouse", "friend", "aunt", "uncle"]
+HOMETOWNS = ["Dayton, OH", "Lagos", "Seville", "Chengdu", "Krakow", "Beirut", "Da Nang", "Naples", "Cork", "Haifa"]
+OCCUPATIONS = ["teacher", "nurse", "carpenter", "engineer", "farmer", "pastor", "accountant", "chef", "pilot", "librarian"]
+CULTURES = ["irish_catholic", "jewish", "hindu", "buddhist", "muslim", "orthodox", "protestant", "secular", "yoruba", "catholic"]
+TRAITS = ["kind", "stubborn", "generous", "funny", "patient", "curious", "devout", "adventurous", "quiet", "loyal"]
+HOBBIES = ["gardening", "fishing", "chess", "baking", "choir", "woodworking", "birdwatching", "dancing", "quilting", "football"]
+SONGS = ["Amazing Grace", "Danny Boy", "Hallelujah", "What a Wonderful World", "Ave Maria", "My Way", "Abide With Me"]
+FLOWERS = ["lilies", "roses", "carnations", "chrysanthemums", "orchids", "tulips", "gladioli"]
+MEMORY_TYPES = ["childhood", "career", "family", "hobby", "travel", "holiday"]
+TONES = ["joyful", "touching", "humorous", "bittersweet", "proud"]
+WORDS = ("the summer we drove to the coast she sang every song on the radio and taught us to fish off the "
+         "old pier he never missed a game always arrived early with thermos of coffee and folding chairs "
+         "every sunday dinner was loud and long and somebody always burned the rolls").split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _tier(rng: random.Random) -> SubscriptionTier:
+    return rng.choices(list(TIER_WEIGHTS), weights=list(TIER_WEIGHTS.values()))[0]
+
+
+def generate_user(rng: random.Random, index: int) -> Dict:
+    tier = _tier(rng)
+    max_personas, max_storage_mb = TIER_LIMITS[tier]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "id": _uuid(rng),
+        "email": f"bench{index}@example.com",
+        "username": f"bench{index}",
+        "hashed_password": "!",  # not a valid hash; benchmark users authenticate with minted tokens
+        "salt": "",
+        "first_name": first,
+        "last_name": last,
+        "subscription_tier": tier,
+        "cultural_background": rng.choice(CULTURES),
+        "language_preference": "en",
+        "is_active": True,
+        "is_verified": True,
+        "is_premium": tier != SubscriptionTier.FREE,
+        "max_personas": max_personas,
+        "max_storage_mb": max_storage_mb,
+        "current_storage_mb": 0,
+    }
+
+
+def generate_persona(rng: random.Random, user_id: str, priority: int) -> Dict:
+    born = datetime(1920, 1, 1) + timedelta(days=rng.randint(0, 365 * 70))
+    passed = born + timedelta(days=rng.randint(365 * 40, 365 * 100))
+    first = rng.choice(FIRST_NAMES)
+    return {
+        "id": _uuid(rng),
+        "user_id": user_id,
+        "name": f"{first} {rng.choice(LAST_NAMES)}",
+        "relationship_type": rng.choice(RELATIONSHIPS),
+        "date_of_birth": born,
+        "date_of_passing": passed,
+        "age_at_passing": (passed - born).days // 365,
+        "hometown": rng.choice(HOMETOWNS),
+        "occupation": rng.choice(OCCUPATIONS),
+        "cultural_background": rng.choice(CULTURES),
+        "cultural_traditions": json.dumps({"wake": rng.random() < 0.5, "service_language": rng.choice(["en", "es", "he", "ar"])}),
+        "personality_traits": json.dumps(rng.sample(TRAITS, rng.randint(2, 5))),
+        "life_story": _paragraph(rng, rng.randint(3, 12)),
+        "memorable_quotes": json.dumps([_sentence(rng, rng.randint(5, 12)) for _ in range(rng.randint(0, 4))]),
+        "hobbies_interests": json.dumps(rng.sample(HOBBIES, rng.randint(1, 4))),
+        "family_members": json.dumps([
+            {"name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "relationship": rng.choice(RELATIONSHIPS)}
+            for _ in range(rng.randint(1, 8))
+        ]),
+        "pets": json.dumps([{"name": rng.choice(["Biscuit", "Max", "Luna", "Pepper"]), "species": rng.choice(["dog", "cat"])}]
+                           if rng.random() < 0.4 else []),
+        "memorial_type": rng.choice(["funeral", "celebration_of_life", "memorial_service"]),
+        "venue_preferences": json.dumps({"indoor": rng.random() < 0.7, "capacity": rng.choice([50, 100, 200])}),
+        "music_preferences": json.dumps(rng.sample(SONGS, rng.randint(1, 3))),
+        "flower_preferences": json.dumps(rng.sample(FLOWERS, rng.randint(1, 3))),
+        "access_status": PersonaAccessStatus.ACTIVE,
+        "priority_order": priority,
+        "storage_used_mb": 0,
+        "is_featured": priority == 0,
+    }
+
+
+def generate_memory(rng: random.Random, persona_id: str, user_id: str) -> Dict:
+    return {
+        "id": _uuid(rng),
+        "persona_id": persona_id,
+        "title": _sentence(rng, rng.randint(3, 7)).rstrip("."),
+        "content": _paragraph(rng, rng.randint(1, 6)),
+        "memory_type": rng.choice(MEMORY_TYPES),
+        "emotional_tone": rng.choice(TONES),
+        "created_by": user_id,
+    }
+
+
+def generate_media(rng: random.Random, persona_id: str, user_id: str) -> Dict:
+    width, height = rng.choice([(4032, 3024), (3024, 4032), (1920, 1080), (1200, 1600)])
+    media_id = _uuid(rng)
+    return {
+        "id": media_id,
+        "persona_id": persona_id,
+        "media_type": MediaType.PHOTO,
+        "file_url": f"/api/v1/media/{persona_id}/blobs/{media_id}.jpg",
+        "file_name": f"IMG_{rng.randint(1000, 9999)}.jpg",
+        "file_size_bytes": rng.randint(400_000, 6_000_000),
+        "mime_type": "image/jpeg",
+        "description": _sentence(rng, rng.randint(4, 12)) if rng.random() < 0.5 else None,
+        "media_metadata": {
+            "width": width,
+            "height": height,
+            "phash": f"{rng.getrandbits(64):016x}",
+            "dhash": f"{rng.getrandbits(64):016x}",
+        },
+        "created_by": user_id,
+    }
+
+
+def generate(seed: int, users: int, memories_per_persona: int, media_per_persona: int) -> Dict[str, List[Dict]]:
+    """Rows for every table, deterministic for a given seed and size"""
+    rng = random.Random(seed)
+    data = {"users": [], "personas": [], "memories": [], "media": []}
+    for index in range(users):
+        user = generate_user(rng, index)
+        data["users"].append(user)
+        # Most users sit at or just under their tier's persona limit
+        persona_count = max(1, user["max_personas"] - rng.randint(0, 2))
+        for priority in range(persona_count):
+            persona = generate_persona(rng, user["id"], priority)
+            data["personas"].append(persona)
+            for _ in range(rng.randint(0, memories_per_persona * 2)):
+                data["memories"].append(generate_memory(rng, persona["id"], user["id"]))
+            for _ in range(rng.randint(0, media_per_persona * 2)):
+                data["media"].append(generate_media(rng, persona["id"], user["id"]))
+    return data
+
+
+def _batches(rows: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def load(engine, data: Dict[str, List[Dict]], batch_size: int = 1000, reset: bool = False):
+    """Create the schema and bulk insert the generated rows"""
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    # Parents before children, one transaction per table
+    for model, key in ((User, "users"), (Persona, "personas"), (Memory, "memories"), (Media, "media")):
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            for batch in _batches(data[key], batch_size):
+                connection.execute(model.__table__.insert(), [_column_row(model, row) for row in batch])
+        print(f"  {key}: {len(data[key])} rows in {time.perf_counter() - started:.2f}s")
+
+
+def _column_row(model, row: Dict) -> Dict:
+    # Attribute names can differ from column names (media_metadata -> metadata)
+    mapper = model.__mapper__
+    return {mapper.attrs[key].columns[0].key: value for key, value in row.items()}
+
+
+def _claims(user: Dict) -> Dict:
+    # Loaded rows take the column defaults for everything generate_user() leaves out
+    return entitlement_claims(SimpleNamespace(
+        role=UserRole.USER,
+        subscription_expires_at=None,
+        entitlements_updated_at=None,
+        **user
+    ))
+
+
+def manifest(data: Dict[str, List[Dict]], seed: int) -> Dict:
+    personas_by_user: Dict[str, List[str]] = {}
+    for persona in data["personas"]:
+        personas_by_user.setdefault(persona["user_id"], []).append(persona["id"])
+    return {
+        "seed": seed,
+        "counts": {key: len(rows) for key, rows in data.items()},
+        "users": [
+            {
+                "id": user["id"],
+                "tier": user["subscription_tier"].value,
+                "max_personas": user["max_personas"],
+                "ent": _claims(user),
+                "personas": personas_by_user.get(user["id"], []),
+            }
+            for user in data["users"]
+        ],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate and load synthetic benchmark data")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--memories-per-persona", type=int, default=5, help="Average; actual counts vary per persona")
+    parser.add_argument("--media-per-persona", type=int, default=8, help="Average; actual counts vary per persona")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--reset", action="store_true", help="Drop existing tables first")
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    data = generate(args.seed, args.users, args.memories_per_persona, args.media_per_persona)
+    print(f"Generated {', '.join(f'{len(rows)} {key}' for key, rows in data.items())} "
+          f"in {time.perf_counter() - started:.2f}s (seed {args.seed})")
+
+    engine = create_engine(args.database_url)
+    try:
+        load(engine, data, args.batch_size, args.reset)
+    finally:
+        engine.dispose()
+
+    with open(args.manifest, "w") as f:
+        json.dump(manifest(data, args.seed), f)
+    print(f"Manifest written to {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
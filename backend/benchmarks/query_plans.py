@@ -0,0 +1,287 @@
+"""
+Query-plan regression check for the hot queries.
+
+Seeds a scaled data set with benchmarks.datagen, runs EXPLAIN (ANALYZE,
+BUFFERS) on every registered hot query, and fails when a plan uses a
+sequential scan or its estimated cost grows beyond --threshold percent of
+the recorded baseline:
+
+    python -m benchmarks.query_plans --database-url postgresql://localhost/afterlight_plans --users 2000
+    python -m benchmarks.query_plans --skip-load --update-baseline   # after an intended plan change
+
+Planner cost rather than execution time is compared: for the same data and
+statistics it is deterministic, so the check doesn't flap on a busy machine.
+Sequential scans and sorts come with an index suggestion, and indexes that
+are a prefix of another index on the same table are reported as redundant.
+PostgreSQL only.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.sql import Select
+
+from app.models import Media, Memory, Persona, PersonaAccessStatus
+from benchmarks import datagen
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "query_plans.baseline.json")
+
+
+@dataclass
+class HotQuery:
+    name: str
+    description: str
+    build: Callable[[Dict[str, str]], Select]  # keep in step with the route it mirrors
+    allow_seq_scan: bool = False
+
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        "persona_list", "GET /personas: a user's personas in priority order",
+        lambda p: select(Persona).where(Persona.user_id == p["user_id"])
+        .order_by(Persona.priority_order, Persona.id).offset(0).limit(100)
+    ),
+    HotQuery(
+        "persona_list_active", "GET /personas?status=active",
+        lambda p: select(Persona).where(Persona.user_id == p["user_id"], Persona.access_status == PersonaAccessStatus.ACTIVE)
+        .order_by(Persona.priority_order, Persona.id).offset(0).limit(100)
+    ),
+    HotQuery(
+        "persona_count", "GET /personas: total for pagination",
+        lambda p: select(func.count()).select_from(Persona).where(Persona.user_id == p["user_id"])
+    ),
+    HotQuery(
+        "persona_detail", "Persona lookup by id and owner, done by every persona route",
+        lambda p: select(Persona).where(Persona.id == p["persona_id"], Persona.user_id == p["user_id"]).limit(1)
+    ),
+    HotQuery(
+        "persona_memories", "A persona's memories, newest first",
+        lambda p: select(Memory).where(Memory.persona_id == p["persona_id"]).order_by(Memory.created_at.desc())
+    ),
+    HotQuery(
+        "persona_media", "GET /personas/{id}/media",
+        lambda p: select(Media).where(Media.persona_id == p["persona_id"]).order_by(Media.created_at.desc())
+    ),
+]
+
+
+def sample_parameters(connection) -> Dict[str, str]:
+    """The heaviest user and their persona with the most memories: worst-case plans"""
+    user_id = connection.execute(
+        select(Persona.user_id).group_by(Persona.user_id).order_by(func.count().desc(), Persona.user_id).limit(1)
+    ).scalar()
+    persona_id = connection.execute(
+        select(Persona.id).join(Memory, Memory.persona_id == Persona.id, isouter=True)
+        .where(Persona.user_id == user_id).group_by(Persona.id)
+        .order_by(func.count(Memory.id).desc(), Persona.id).limit(1)
+    ).scalar()
+    return {"user_id": user_id, "persona_id": persona_id}
+
+
+def _nodes(plan: Dict, parents: tuple = ()) -> Iterator[tuple]:
+    yield plan, parents
+    for child in plan.get("Plans", []):
+        yield from _nodes(child, parents + (plan,))
+
+
+def _describe(node: Dict) -> str:
+    label = node["Node Type"]
+    if node.get("Index Name"):
+        label += f" using {node['Index Name']}"
+    if node.get("Relation Name"):
+        label += f" on {node['Relation Name']}"
+    return label
+
+
+# "((user_id)::text = 'x'::text)" or "(persona_id = 'x')" -> user_id / persona_id
+_EQUALITY = re.compile(r"(\w+)\)?(?:::[\w ]+?)? = ")
+
+
+def _suggest_index(relation: str, condition: str, sort_keys: List[str]) -> Optional[str]:
+    columns = []
+    for column in _EQUALITY.findall(condition or "") + [key.split(".")[-1] for key in sort_keys]:
+        if column not in columns:
+            columns.append(column)
+    if not columns:
+        return None
+    return f"CREATE INDEX CONCURRENTLY ON {relation} ({', '.join(columns)})"
+
+
+def analyze_plan(query: HotQuery, explain: Dict) -> Dict:
+    root = explain["Plan"]
+    seq_scans, sorts, advice = [], [], []
+    for node, parents in _nodes(root):
+        if node["Node Type"] == "Seq Scan":
+            seq_scans.append(node["Relation Name"])
+            sort = next((parent for parent in reversed(parents) if parent["Node Type"] == "Sort"), None)
+            suggestion = _suggest_index(node["Relation Name"], node.get("Filter"), sort["Sort Key"] if sort else [])
+            if suggestion:
+                advice.append(suggestion)
+        elif node["Node Type"] == "Sort":
+            sorts.append(", ".join(node["Sort Key"]))
+            scan = next(
+                (child for child, _ in _nodes(node) if child.get("Relation Name") and child["Node Type"] != "Seq Scan"),
+                None
+            )
+            if scan is not None:
+                suggestion = _suggest_index(
+                    scan["Relation Name"], " AND ".join(filter(None, [scan.get("Index Cond"), scan.get("Recheck Cond"),
+                                                                        scan.get("Filter")])),
+                    node["Sort Key"]
+                )
+                if suggestion:
+                    advice.append(suggestion)
+
+    return {
+        "description": query.description,
+        "total_cost": root["Total Cost"],
+        "actual_rows": root.get("Actual Rows"),
+        "execution_ms": round(explain.get("Execution Time", 0.0), 3),
+        "planning_ms": round(explain.get("Planning Time", 0.0), 3),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "nodes": [_describe(node) for node, _ in _nodes(root)],
+        "seq_scans": seq_scans,
+        "sorts": sorts,
+        "advice": advice,
+    }
+
+
+def explain(connection, query: HotQuery, params: Dict[str, str]) -> Dict:
+    # Literal values, as the planner sees them from psycopg2's client-side binding
+    compiled = query.build(params).compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    return connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}").scalar()[0]
+
+
+def redundant_indexes(connection, tables: List[str]) -> List[str]:
+    """Indexes whose columns are a leading prefix of another index on the same table"""
+    rows = connection.execute(text("""
+        SELECT t.relname, i.relname, x.indkey::text, x.indisunique, x.indisprimary, x.indpred IS NOT NULL
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        WHERE t.relname = ANY(:tables) AND pg_table_is_visible(t.oid)
+    """), {"tables": tables}).all()
+    redundant = []
+    for table, index, keys, unique, primary, partial in rows:
+        columns = keys.split()
+        if unique or primary or partial or "0" in columns:  # 0: expression column
+            continue
+        for other_table, other, other_keys, other_unique, other_primary, other_partial in rows:
+            other_columns = other_keys.split()
+            if other_table != table or other == index or other_partial or other_columns[:len(columns)] != columns:
+                continue
+            # Of two identical indexes, keep the unique one (or the first by name)
+            if len(other_columns) > len(columns) or other_unique or other_primary or other < index:
+                redundant.append(f"{index} (covered by {other})")
+                break
+    return sorted(redundant)
+
+
+def check(results: Dict[str, Dict], baseline: Optional[Dict], threshold: float) -> List[str]:
+    failures = []
+    for query in HOT_QUERIES:
+        result = results[query.name]
+        if result["seq_scans"] and not query.allow_seq_scan:
+            failures.append(f"{query.name}: sequential scan on {', '.join(result['seq_scans'])}")
+        recorded = (baseline or {}).get("queries", {}).get(query.name)
+        if recorded and recorded["total_cost"]:
+            growth = (result["total_cost"] - recorded["total_cost"]) / recorded["total_cost"] * 100
+            result["cost_change_pct"] = round(growth, 1)
+            if growth > threshold:
+                failures.append(
+                    f"{query.name}: cost {recorded['total_cost']:.2f} -> {result['total_cost']:.2f} (+{growth:.1f}%)"
+                )
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check hot query plans for sequential scans and cost regressions")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=2000, help="Scale of the seeded data set")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="Reuse the data already loaded")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Record these plans as the new baseline")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed cost growth in percent")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required")
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("EXPLAIN (ANALYZE, BUFFERS) needs PostgreSQL")
+
+    try:
+        if not args.skip_load:
+            started = time.perf_counter()
+            data = datagen.generate(args.seed, args.users, memories_per_persona=5, media_per_persona=8)
+            datagen.load(engine, data, reset=True)
+            print(f"Seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+            connection.commit()
+            params = sample_parameters(connection)
+            results = {}
+            for query in HOT_QUERIES:
+                results[query.name] = analyze_plan(query, explain(connection, query, params))
+                connection.rollback()
+            redundant = redundant_indexes(connection, ["personas", "memories", "media"])
+    finally:
+        engine.dispose()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get("users"), baseline.get("seed")) != (args.users, args.seed):
+            print(f"warning: baseline was recorded with {baseline.get('users')} users (seed {baseline.get('seed')}); "
+                  "costs are not compared")
+            baseline = None
+    failures = check(results, baseline, args.threshold)
+
+    for name, result in results.items():
+        change = f" ({result['cost_change_pct']:+.1f}%)" if "cost_change_pct" in result else ""
+        print(f"\n{name}: cost {result['total_cost']:.2f}{change}, {result['execution_ms']}ms, "
+              f"{result['shared_hit_blocks']} hit / {result['shared_read_blocks']} read blocks")
+        print(f"  {' -> '.join(result['nodes'])}")
+        for suggestion in result["advice"]:
+            print(f"  suggest: {suggestion}")
+    if redundant:
+        print("\nRedundant indexes:")
+        for index in redundant:
+            print(f"  {index}")
+
+    report = {"users": args.users, "seed": args.seed, "queries": results, "redundant_indexes": redundant}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"users": args.users, "seed": args.seed, "queries": {
+                name: {"total_cost": result["total_cost"], "nodes": result["nodes"]} for name, result in results.items()
+            }}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    if baseline is None and not args.update_baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Scenario-driven load runner.
+
+Drives a running server with N concurrent virtual users per scenario, each a
+distinct generated user with its own bearer token, for a fixed duration
+after a warm-up period. Writes latency percentiles, throughput and error
+counts as JSON:
+
+    python -m benchmarks.run --base-url http://localhost:8000 --manifest bench_manifest.json \\
+        --scenarios list,detail,update --concurrency 32 --duration 30 --output results/HEAD.json
+
+Tokens are minted locally with the app's JWT settings and the entitlement
+claims datagen wrote into the manifest, so run this with the same JWT_SECRET
+as the server under test.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+
+from app.middleware.auth import create_access_token
+from benchmarks.scenarios import SCENARIOS, VirtualUser
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[tuple], elapsed: float) -> Dict:
+    latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+    statuses = Counter(status for _, _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not 200 <= status < 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        },
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def virtual_users(manifest: Dict, scenario: str, count: int, seed: int) -> List[VirtualUser]:
+    users = [user for user in manifest["users"] if user["personas"]]
+    if scenario == "create":
+        users = [user for user in users if len(user["personas"]) < user["max_personas"]]
+    if not users:
+        raise SystemExit(f"No generated users are usable for the {scenario} scenario")
+    if any("ent" not in user for user in users):
+        raise SystemExit("The manifest has no entitlement claims; regenerate it with benchmarks.datagen")
+    if count > len(users):
+        print(f"  warning: {count} virtual users share {len(users)} accounts; writes may interfere", file=sys.stderr)
+
+    rng = random.Random(seed)
+    rng.shuffle(users)
+    return [
+        VirtualUser(
+            user_id=user["id"],
+            persona_ids=user["personas"],
+            headers={"Authorization": f"Bearer {create_access_token({'sub': user['id'], 'ent': user['ent']})}"},
+            rng=random.Random(seed + i),
+            can_create=len(user["personas"]) < user["max_personas"],
+        )
+        for i, user in enumerate(users[i % len(users)] for i in range(count))
+    ]
+
+
+async def run_scenario(base_url: str, scenario: str, manifest: Dict, concurrency: int,
+                       duration: float, warmup: float, seed: int, timeout: float) -> Dict:
+    step = SCENARIOS[scenario]
+    vus = virtual_users(manifest, scenario, concurrency, seed)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        loop = asyncio.get_running_loop()
+        record_from = loop.time() + warmup
+        stop_at = record_from + duration
+
+        async def drive(vu: VirtualUser):
+            while loop.time() < stop_at:
+                vu.recording = loop.time() >= record_from
+                await step(client, vu)
+
+        await asyncio.gather(*(drive(vu) for vu in vus))
+
+    samples = [sample for vu in vus for sample in vu.samples]
+    by_request: Dict[str, List[tuple]] = defaultdict(list)
+    for sample in samples:
+        by_request[sample[0]].append(sample)
+
+    return {
+        "overall": summarize(samples, duration),
+        "requests": {label: summarize(group, duration) for label, group in sorted(by_request.items())},
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> Dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=10) as client:
+        response = await client.get("/health")
+        response.raise_for_status()
+
+    results = {
+        "meta": {
+            "commit": os.getenv("BENCH_COMMIT") or _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "seed": args.seed,
+            "data": manifest.get("counts", {}),
+            "data_seed": manifest.get("seed"),
+            "python": platform.python_version(),
+            "host": platform.node(),
+        },
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        print(f"Running {scenario}: {args.concurrency} users for {args.duration:g}s (+{args.warmup:g}s warm-up)")
+        started = time.perf_counter()
+        result = await run_scenario(
+            args.base_url, scenario, manifest, args.concurrency, args.duration, args.warmup, args.seed, args.timeout
+        )
+        results["scenarios"][scenario] = result
+        overall = result["overall"]
+        print(
+            f"  {overall['requests']} requests, {overall['throughput_rps']} req/s, "
+            f"p50 {overall['latency_ms']['p50']}ms p95 {overall['latency_ms']['p95']}ms "
+            f"p99 {overall['latency_ms']['p99']}ms, {overall['errors']} errors "
+            f"({time.perf_counter() - started:.1f}s)"
+        )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run load scenarios against the API")
+    parser.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    parser.add_argument("--scenarios", default="list,detail,create,update,access",
+                        type=lambda value: value.split(","), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds run before measuring")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Load scenarios.
+
+Each scenario is one virtual user's iteration: it issues its requests through
+VirtualUser.request(), which times them. Scenarios leave the data as they
+found it (created personas are deleted, locked personas unlocked) so runs are
+repeatable against the same load. Cleanup requests are sent untimed.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+API = "/api/v1/personas"
+
+
+@dataclass
+class VirtualUser:
+    user_id: str
+    persona_ids: List[str]
+    headers: Dict[str, str]
+    rng: random.Random
+    can_create: bool = False  # below the tier's persona limit
+    # (scenario, seconds, status) for every timed request
+    samples: List[Tuple[str, float, int]] = field(default_factory=list)
+    recording: bool = False
+
+    async def request(self, client: httpx.AsyncClient, scenario: str, method: str, url: str,
+                      timed: bool = True, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        if timed and self.recording:
+            self.samples.append((scenario, time.perf_counter() - started, status))
+        return response
+
+    def persona(self) -> Optional[str]:
+        return self.rng.choice(self.persona_ids) if self.persona_ids else None
+
+
+def _persona_payload(rng: random.Random) -> Dict:
+    return {
+        "name": f"Benchmark Persona {rng.randint(1, 10**6)}",
+        "relationship_type": rng.choice(["mother", "father", "friend", "sister"]),
+        "hometown": "Dayton, OH",
+        "personality_traits": rng.sample(["kind", "funny", "patient", "loyal", "curious"], 3),
+        "memorable_quotes": ["Always leave the campsite better than you found it."],
+        "hobbies_interests": ["gardening", "chess"],
+        "family_members": [{"name": "Ann Smith", "relationship": "daughter"}],
+        "venue_preferences": {"indoor": True, "capacity": 100},
+        "music_preferences": ["Amazing Grace"],
+    }
+
+
+async def list_personas(client: httpx.AsyncClient, vu: VirtualUser):
+    await vu.request(client, "list", "GET", f"{API}/")
+
+
+async def persona_detail(client: httpx.AsyncClient, vu: VirtualUser):
+    persona_id = vu.persona()
+    if persona_id:
+        await vu.request(client, "detail", "GET", f"{API}/{persona_id}")
+
+
+async def create_persona(client: httpx.AsyncClient, vu: VirtualUser):
+    response = await vu.request(client, "create", "POST", f"{API}/", json=_persona_payload(vu.rng))
+    if response is not None and response.status_code == 200:
+        created = response.json()["data"]["id"]
+        await vu.request(client, "create", "DELETE", f"{API}/{created}", timed=False)
+
+
+async def update_persona(client: httpx.AsyncClient, vu: VirtualUser):
+    persona_id = vu.persona()
+    if persona_id:
+        await vu.request(client, "update", "PUT", f"{API}/{persona_id}", json={
+            "occupation": vu.rng.choice(["teacher", "nurse", "engineer"]),
+            "hobbies_interests": vu.rng.sample(["gardening", "chess", "baking", "fishing"], 2),
+        })
+
+
+async def change_access(client: httpx.AsyncClient, vu: VirtualUser):
+    persona_id = vu.persona()
+    if persona_id:
+        await vu.request(client, "access", "PATCH", f"{API}/{persona_id}/access",
+                         json={"access_status": "locked", "locked_reason": "benchmark"})
+        await vu.request(client, "access", "PATCH", f"{API}/{persona_id}/access",
+                         json={"access_status": "active"})
+
+
+async def mixed(client: httpx.AsyncClient, vu: VirtualUser):
+    """Read-heavy blend, roughly what production traffic looks like"""
+    step = vu.rng.choices(
+        [list_personas, persona_detail, update_persona, create_persona, change_access],
+        weights=[45, 40, 10, 3, 2]
+    )[0]
+    if step is create_persona and not vu.can_create:
+        step = list_personas
+    await step(client, vu)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, VirtualUser], Awaitable[None]]] = {
+    "list": list_personas,
+    "detail": persona_detail,
+    "create": create_persona,
+    "update": update_persona,
+    "access": change_access,
+    "mixed": mixed,
+}
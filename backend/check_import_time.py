@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Startup budget check for the AfterLight backend.
+
+Imports app.main in fresh interpreters under `python -X importtime`, takes the
+best of several runs, and fails if it exceeds the budget or if any module that
+is supposed to load lazily (numpy, Pillow, the Postgres driver, jose's key
+backends) was imported at startup. Run it in CI or before deploying:
+
+    python check_import_time.py --budget-ms 900
+    python check_import_time.py --serve    # also time process start -> first 200 from /health
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Modules that must only be imported on first use, never while the app starts
+DEFERRED_MODULES = ("numpy", "PIL", "psycopg2", "jose.jwt", "jose.jwk", "openai", "magic")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env.setdefault("ENVIRONMENT", "production")
+    env["PYTHONPATH"] = str(BACKEND_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    # Cached bytecode is what a deployed container runs with
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure_imports(module: str = "app.main"):
+    """Import a module in a fresh interpreter; returns cumulative microseconds per imported module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def deferred_imports(modules) -> list:
+    return sorted(
+        name for name in modules
+        if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)
+    )
+
+
+def top_offenders(cumulative: dict, limit: int) -> list:
+    """Heaviest first-party and third-party top-level imports"""
+    roots = {}
+    for name, micros in cumulative.items():
+        if name.startswith("app."):
+            roots[name] = micros
+        elif "." not in name:
+            roots[name] = micros
+    roots.pop("app.main", None)
+    return sorted(roots.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 30.0) -> float:
+    """Seconds from spawning the server process to the first 200 from /health"""
+    port = _free_port()
+    env = _environment()
+    # Production settings only trust the public hostnames
+    env["ALLOWED_HOSTS"] = "127.0.0.1"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode} before answering")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from /health within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1000")),
+                        help="Maximum import time for app.main (default: IMPORT_BUDGET_MS or 1000)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="How many of the heaviest imports to list")
+    parser.add_argument("--serve", action="store_true", help="Also measure time to the first 200 from /health")
+    parser.add_argument("--serve-budget-ms", type=float, default=float(os.getenv("FIRST_RESPONSE_BUDGET_MS", "0")),
+                        help="Fail if the first response takes longer than this (0 disables)")
+    args = parser.parse_args(argv)
+
+    # Warm-up run so bytecode compilation isn't counted
+    measure_imports()
+    runs = [measure_imports() for _ in range(max(args.runs, 1))]
+    best = min(runs, key=lambda cumulative: cumulative.get("app.main", 0))
+    total_ms = best["app.main"] / 1000
+
+    failures = []
+    print(f"app.main import: {total_ms:.0f}ms (best of {len(runs)}, budget {args.budget_ms:.0f}ms)")
+    if total_ms > args.budget_ms:
+        failures.append(f"app.main took {total_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+
+    print("Heaviest imports:")
+    for name, micros in top_offenders(best, args.top):
+        print(f"  {micros / 1000:8.1f}ms  {name}")
+
+    eager = deferred_imports(best)
+    if eager:
+        failures.append("Imported at startup but should load on first use: " + ", ".join(eager))
+
+    if args.serve:
+        first_response_ms = measure_first_response() * 1000
+        print(f"Process start to first 200 from /health: {first_response_ms:.0f}ms")
+        if args.serve_budget_ms and first_response_ms > args.serve_budget_ms:
+            failures.append(f"First response took {first_response_ms:.0f}ms, over the {args.serve_budget_ms:.0f}ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
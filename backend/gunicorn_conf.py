@@ -0,0 +1,92 @@
+"""
+Gunicorn configuration for the production launcher (railway_start.py).
+
+Worker count follows the CPU quota the container actually gets. Under cgroups
+os.cpu_count() reports the host's cores, so the cgroup v2 cpu.max (or v1
+cfs_quota_us / cfs_period_us) limit and the scheduler affinity mask are
+checked first. All tuning comes from Settings.
+"""
+
+import math
+import os
+import shutil
+
+from app.config import settings
+
+
+def cgroup_cpu_limit():
+    """CPU limit from the cgroup quota, or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpus() -> int:
+    """Cores this process may use: affinity mask capped by the cgroup quota"""
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        count = min(count, math.ceil(limit))
+    return max(count, 1)
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    workers = max(math.ceil(available_cpus() * settings.SERVER_WORKERS_PER_CORE), 1)
+    if settings.SERVER_MAX_WORKERS:
+        workers = min(workers, settings.SERVER_MAX_WORKERS)
+    return workers
+
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = worker_count()
+worker_class = "app.workers.UvicornWorker"
+
+# Recycle workers periodically, staggered so they never all restart at once
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+
+loglevel = settings.LOG_LEVEL.lower()
+accesslog = None
+errorlog = "-"
+
+# Metrics from every worker are aggregated through files in a shared directory
+metrics_dir = settings.PROMETHEUS_MULTIPROC_DIR or "/tmp/afterlight-metrics"
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+
+def on_starting(server):
+    # Values left over from a previous run would be summed into the new one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    server.log.info(f"Starting {workers} workers for {available_cpus()} available CPUs")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,66 @@
+"""
+Alembic environment.
+
+Each migration runs in its own transaction, so a migration that needs an
+autocommit block (concurrent index builds, batched backfills) only commits
+its own work. On PostgreSQL every migration statement runs with
+MIGRATION_LOCK_TIMEOUT_MS as its lock_timeout: DDL that can't get its lock
+quickly fails instead of queueing every query on the table behind it.
+"""
+
+import logging
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config import settings
+from app.database import Base
+import app.models  # noqa: F401  registers every table on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+logger = logging.getLogger("alembic.env")
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+
+
+def run_migrations_offline():
+    """Emit the migration SQL to stdout instead of running it"""
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(f"SET lock_timeout = '{settings.MIGRATION_LOCK_TIMEOUT_MS}ms'")
+            connection.exec_driver_sql("SET application_name = 'afterlight-migrations'")
+            connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
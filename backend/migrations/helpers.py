@@ -0,0 +1,204 @@
+"""
+Operations for migrating tables that are serving traffic.
+
+    create_index_concurrently("idx_personas_user_priority", "personas", ["user_id", "priority_order"])
+    batched_backfill("personas", "access_status = 'active'", where="t.access_status IS NULL")
+    execute_with_lock_retries("ALTER TABLE personas ADD COLUMN archived_at TIMESTAMPTZ")
+
+On PostgreSQL, statements that need a table lock give up after
+MIGRATION_LOCK_TIMEOUT_MS and are retried with backoff. Waiting for the lock
+is what causes downtime, because every query on the table queues behind the
+waiting DDL. Index builds and backfills run outside the migration
+transaction, so they never hold a lock for their full duration. Other
+databases (SQLite in development) get the plain operation.
+"""
+
+import hashlib
+import logging
+import time
+from typing import Callable, Optional, Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+
+logger = logging.getLogger("alembic.helpers")
+
+LOCK_NOT_AVAILABLE = "55P03"  # SQLSTATE raised when lock_timeout expires
+CHECKPOINT_TABLE = "migration_checkpoints"
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _lock_not_available(error: OperationalError) -> bool:
+    return getattr(error.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+def _retry_on_lock_timeout(description: str, attempt_once: Callable[[], None], attempts: Optional[int] = None,
+                           backoff_ms: int = 500):
+    attempts = attempts or settings.MIGRATION_LOCK_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            return attempt_once()
+        except OperationalError as e:
+            if not _lock_not_available(e) or attempt == attempts:
+                raise
+            wait = backoff_ms * 2 ** (attempt - 1) / 1000
+            logger.warning(f"{description}: lock not available (attempt {attempt}/{attempts}), retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+
+def execute_with_lock_retries(statement: str, timeout_ms: Optional[int] = None, attempts: Optional[int] = None):
+    """Run DDL under a short lock_timeout, retrying from a savepoint when the lock isn't free
+
+    Put lock-taking statements first in their migration: locks already held by
+    earlier statements stay held across the retries.
+    """
+    if not _is_postgres():
+        op.execute(statement)
+        return
+
+    bind = op.get_bind()
+    timeout = f"{timeout_ms or settings.MIGRATION_LOCK_TIMEOUT_MS}ms"
+
+    def attempt_once():
+        savepoint = bind.begin_nested()
+        try:
+            # SET LOCAL: undone with the savepoint, or at the end of this migration
+            bind.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": timeout})
+            bind.execute(text(statement))
+        except Exception:
+            savepoint.rollback()
+            raise
+        savepoint.commit()
+
+    _retry_on_lock_timeout(statement.split("\n")[0][:80], attempt_once, attempts)
+
+
+def _invalid_index(name: str) -> bool:
+    return bool(op.get_bind().execute(text("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND pg_table_is_visible(c.oid)
+    """), {"name": name}).scalar())
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[Union[str, object]],
+                              unique: bool = False, where: Optional[str] = None):
+    """CREATE INDEX CONCURRENTLY, replacing an invalid leftover from an interrupted build"""
+    condition = text(where) if where else None
+    if not _is_postgres():
+        op.create_index(index_name, table_name, columns, unique=unique, if_not_exists=True, sqlite_where=condition)
+        return
+
+    def attempt_once():
+        if _invalid_index(index_name):
+            logger.warning(f"Dropping invalid index {index_name} left by an earlier build")
+            op.drop_index(index_name, postgresql_concurrently=True, if_exists=True)
+        op.create_index(index_name, table_name, columns, unique=unique, if_not_exists=True,
+                        postgresql_concurrently=True, postgresql_where=condition)
+
+    with op.get_context().autocommit_block():
+        _retry_on_lock_timeout(f"CREATE INDEX {index_name}", attempt_once)
+
+
+def drop_index_concurrently(index_name: str, table_name: Optional[str] = None):
+    if not _is_postgres():
+        op.drop_index(index_name, table_name, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        _retry_on_lock_timeout(
+            f"DROP INDEX {index_name}",
+            lambda: op.drop_index(index_name, table_name, postgresql_concurrently=True, if_exists=True)
+        )
+
+
+def _backfill_statement(table: str, assignments: str, where: Optional[str], key: str, resume: bool) -> str:
+    after = f"WHERE {key} > :last_key" if resume else ""
+    condition = f"AND ({where})" if where else ""
+    return f"""
+        WITH batch AS (
+            SELECT {key} FROM {table} {after} ORDER BY {key} LIMIT :batch_size
+        ),
+        updated AS (
+            UPDATE {table} AS t SET {assignments}
+            FROM batch WHERE t.{key} = batch.{key} {condition}
+            RETURNING 1
+        ),
+        checkpoint AS (
+            INSERT INTO {CHECKPOINT_TABLE} (name, last_key, rows_done, updated_at)
+            SELECT :name, (SELECT {key} FROM batch ORDER BY {key} DESC LIMIT 1)::text,
+                   (SELECT count(*) FROM updated), NOW()
+            WHERE EXISTS (SELECT 1 FROM batch)
+            ON CONFLICT (name) DO UPDATE SET
+                last_key = EXCLUDED.last_key,
+                rows_done = {CHECKPOINT_TABLE}.rows_done + EXCLUDED.rows_done,
+                updated_at = EXCLUDED.updated_at
+            RETURNING last_key
+        )
+        SELECT last_key, (SELECT count(*) FROM updated) FROM checkpoint
+    """
+
+
+def batched_backfill(table: str, assignments: str, where: Optional[str] = None, key: str = "id",
+                     batch_size: Optional[int] = None, pause_ms: Optional[int] = None,
+                     checkpoint: Optional[str] = None):
+    """UPDATE a table in keyset-ordered batches, each committed with its resume checkpoint
+
+    `assignments` and `where` may refer to the table as `t`. Batches walk the
+    whole table by `key`, and `where` only filters which rows of a batch
+    change, so each batch costs the same however sparse the matches are. An
+    interrupted backfill resumes after the last committed batch when the
+    migration is run again.
+    """
+    if not _is_postgres():
+        op.execute(f"UPDATE {table} AS t SET {assignments}" + (f" WHERE {where}" if where else ""))
+        return
+
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    pause = (settings.MIGRATION_BACKFILL_PAUSE_MS if pause_ms is None else pause_ms) / 1000
+    name = checkpoint or f"{table}:{hashlib.sha1(f'{assignments}|{where}'.encode()).hexdigest()[:12]}"
+    bind = op.get_bind()
+
+    with op.get_context().autocommit_block():
+        bind.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                name VARCHAR(255) PRIMARY KEY,
+                last_key TEXT NOT NULL,
+                rows_done BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+            )
+        """))
+        saved = bind.execute(
+            text(f"SELECT last_key, rows_done FROM {CHECKPOINT_TABLE} WHERE name = :name"), {"name": name}
+        ).first()
+        last_key, done = saved if saved else (None, 0)
+        if saved:
+            logger.info(f"Backfill {name}: resuming after {table}.{key} = {last_key} ({done:,} rows already done)")
+
+        started = reported = time.monotonic()
+        while True:
+            params = {"name": name, "batch_size": batch_size, "last_key": last_key}
+            statement = text(_backfill_statement(table, assignments, where, key, resume=last_key is not None))
+            row = _retry_on_lock_timeout(
+                f"Backfill {name}", lambda: bind.execute(statement, params).first()
+            )
+            if row is None:
+                break
+            last_key, updated = row
+            done += updated
+
+            now = time.monotonic()
+            if now - reported >= 10:
+                reported = now
+                logger.info(f"Backfill {name}: {done:,} rows updated, at {table}.{key} = {last_key}")
+            if pause:
+                time.sleep(pause)
+
+        bind.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE name = :name"), {"name": name})
+        logger.info(f"Backfill {name}: {done:,} rows updated in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,22 @@
+"""Baseline: the schema as created by database/schema.sql or init_db()
+
+Existing databases are marked with `alembic stamp 0001`; later migrations
+apply on top of it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+"""
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,35 @@
+"""Composite and partial indexes for the hot persona, memory and media queries
+
+Found by benchmarks/query_plans.py: the persona list sorted every user's
+personas after an index lookup on user_id alone, and memory/media listings
+sorted by created_at per persona.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+"""
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_concurrently("idx_personas_user_priority", "personas", ["user_id", "priority_order", "id"])
+    # The app stores enum names, so active personas are 'ACTIVE'
+    create_index_concurrently(
+        "idx_personas_user_active_priority", "personas", ["user_id", "priority_order", "id"],
+        where="access_status = 'ACTIVE'"
+    )
+    create_index_concurrently("idx_memories_persona_created", "memories", ["persona_id", "created_at"])
+    create_index_concurrently("idx_media_persona_created", "media", ["persona_id", "created_at"])
+
+
+def downgrade():
+    drop_index_concurrently("idx_media_persona_created", "media")
+    drop_index_concurrently("idx_memories_persona_created", "memories")
+    drop_index_concurrently("idx_personas_user_active_priority", "personas")
+    drop_index_concurrently("idx_personas_user_priority", "personas")
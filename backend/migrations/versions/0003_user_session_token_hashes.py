@@ -0,0 +1,98 @@
+"""Store refresh tokens by hash, with rotation and revocation columns on user_sessions
+
+user_sessions kept whole tokens in `token`. Existing rows get their SHA-256
+in token_hash and the plaintext column is dropped. The partial index on
+revoked_at serves the per-worker revocation sync. Each step checks the live
+table first, so a table that already has the new shape is left as it is.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import (
+    batched_backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    execute_with_lock_retries,
+)
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _create_indexes():
+    create_index_concurrently("idx_user_sessions_token_hash", "user_sessions", ["token_hash"], unique=True)
+    create_index_concurrently("idx_user_sessions_previous_token_hash", "user_sessions", ["previous_token_hash"])
+    create_index_concurrently(
+        "idx_user_sessions_revoked_at", "user_sessions", ["revoked_at"], where="revoked_at IS NOT NULL"
+    )
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("user_sessions"):
+        # Databases made by init_db() before sessions had a model
+        op.create_table(
+            "user_sessions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("token_hash", sa.String(64), nullable=False),
+            sa.Column("previous_token_hash", sa.String(64), nullable=True),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_user_sessions_id", "user_sessions", ["id"])
+        op.create_index("ix_user_sessions_user_id", "user_sessions", ["user_id"])
+        _create_indexes()
+        return
+
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("user_sessions")}
+    # One statement per column: SQLite can't add several in one ALTER TABLE
+    for name, column_type in (
+        ("token_hash", "VARCHAR(64)"),
+        ("previous_token_hash", "VARCHAR(64)"),
+        ("revoked_at", "TIMESTAMP WITH TIME ZONE"),
+    ):
+        if name not in columns:
+            execute_with_lock_retries(f"ALTER TABLE user_sessions ADD COLUMN {name} {column_type}")
+
+    if "token" in columns:
+        # The table from an older database/schema.sql (PostgreSQL) kept whole tokens
+        batched_backfill(
+            "user_sessions", "token_hash = encode(sha256(convert_to(t.token, 'UTF8')), 'hex')",
+            where="t.token_hash IS NULL"
+        )
+    _create_indexes()
+
+    if "token" in columns:
+        # NOT NULL via a validated check, so the full-table scan doesn't hold an exclusive lock
+        execute_with_lock_retries("""
+            ALTER TABLE user_sessions ADD CONSTRAINT user_sessions_token_hash_not_null
+                CHECK (token_hash IS NOT NULL) NOT VALID
+        """)
+        execute_with_lock_retries("ALTER TABLE user_sessions VALIDATE CONSTRAINT user_sessions_token_hash_not_null")
+        execute_with_lock_retries("ALTER TABLE user_sessions ALTER COLUMN token_hash SET NOT NULL")
+        execute_with_lock_retries("ALTER TABLE user_sessions DROP CONSTRAINT user_sessions_token_hash_not_null")
+
+        drop_index_concurrently("idx_user_sessions_token", "user_sessions")
+        execute_with_lock_retries("ALTER TABLE user_sessions DROP COLUMN token")
+
+
+def downgrade():
+    # Tokens can't be recovered from their hashes: every session is signed out
+    drop_index_concurrently("idx_user_sessions_revoked_at", "user_sessions")
+    drop_index_concurrently("idx_user_sessions_previous_token_hash", "user_sessions")
+    drop_index_concurrently("idx_user_sessions_token_hash", "user_sessions")
+    op.execute("DELETE FROM user_sessions")
+    op.drop_column("user_sessions", "revoked_at")
+    op.drop_column("user_sessions", "previous_token_hash")
+    op.drop_column("user_sessions", "token_hash")
+    op.add_column("user_sessions", sa.Column("token", sa.String(500), nullable=False))
+    op.create_index("idx_user_sessions_token", "user_sessions", ["token"])
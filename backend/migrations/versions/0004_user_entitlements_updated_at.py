@@ -0,0 +1,32 @@
+"""Add users.entitlements_updated_at for access-token entitlement claims
+
+Access tokens issued before a user's role or subscription last changed are
+refused until refreshed. Workers poll recent changes through the index.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently, execute_with_lock_retries
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "entitlements_updated_at" not in columns:
+        # Nullable with no default: a catalog-only change, no table rewrite
+        execute_with_lock_retries("ALTER TABLE users ADD COLUMN entitlements_updated_at TIMESTAMP WITH TIME ZONE")
+    create_index_concurrently("ix_users_entitlements_updated_at", "users", ["entitlements_updated_at"])
+
+
+def downgrade():
+    drop_index_concurrently("ix_users_entitlements_updated_at", "users")
+    op.drop_column("users", "entitlements_updated_at")
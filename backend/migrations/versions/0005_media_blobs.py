@@ -0,0 +1,74 @@
+"""Add media_blobs and media.content_hash for content-addressed media storage
+
+Media rows reference a ref-counted blob per distinct file instead of owning a
+copy. Databases that ran database/media_blob_migration.sql already have the
+schema; this revision leaves it as it is.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently, execute_with_lock_retries
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("media_blobs"):
+        # A new table takes no lock anyone else is waiting on
+        op.create_table(
+            "media_blobs",
+            sa.Column("sha256", sa.CHAR(64), primary_key=True),
+            sa.Column("size_bytes", sa.BigInteger, nullable=False),
+            sa.Column("mime_type", sa.String(100), nullable=False),
+            sa.Column("storage_path", sa.String(500), nullable=False),
+            sa.Column("ref_count", sa.Integer, server_default="0", nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("released_at", sa.DateTime(timezone=True), nullable=True),
+            sa.CheckConstraint("ref_count >= 0", name="media_blobs_ref_count_check"),
+        )
+
+    columns = {column["name"] for column in inspector.get_columns("media")}
+    if "content_hash" not in columns:
+        if _is_postgres():
+            # Nullable with no default: a catalog-only change, no table rewrite
+            execute_with_lock_retries("ALTER TABLE media ADD COLUMN content_hash CHAR(64)")
+        else:
+            op.execute("ALTER TABLE media ADD COLUMN content_hash CHAR(64) REFERENCES media_blobs(sha256)")
+
+    if _is_postgres():
+        foreign_keys = {key["name"] for key in inspector.get_foreign_keys("media")}
+        if "media_content_hash_fkey" not in foreign_keys:
+            # NOT VALID skips the scan under the exclusive lock; VALIDATE scans without blocking writes
+            execute_with_lock_retries("""
+                ALTER TABLE media ADD CONSTRAINT media_content_hash_fkey
+                    FOREIGN KEY (content_hash) REFERENCES media_blobs(sha256) NOT VALID
+            """)
+            execute_with_lock_retries("ALTER TABLE media VALIDATE CONSTRAINT media_content_hash_fkey")
+
+    create_index_concurrently("idx_media_content_hash", "media", ["content_hash"])
+    # init_db() used to name it after the column
+    drop_index_concurrently("ix_media_content_hash", "media")
+    # The garbage collector scans only unreferenced blobs
+    create_index_concurrently(
+        "idx_media_blobs_unreferenced", "media_blobs", ["released_at"], where="ref_count = 0"
+    )
+
+
+def downgrade():
+    drop_index_concurrently("idx_media_blobs_unreferenced", "media_blobs")
+    drop_index_concurrently("idx_media_content_hash", "media")
+    op.drop_column("media", "content_hash")
+    op.drop_table("media_blobs")
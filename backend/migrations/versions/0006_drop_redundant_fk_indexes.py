@@ -0,0 +1,34 @@
+"""Drop the single-column foreign key indexes covered by the 0002 composite indexes
+
+personas.user_id, memories.persona_id and media.persona_id each lead a
+composite index since 0002, so their own indexes only cost writes. Databases
+created by init_db() named them ix_*, older copies of database/schema.sql idx_*.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+"""
+
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+REDUNDANT_INDEXES = [
+    ("personas", "user_id"),
+    ("memories", "persona_id"),
+    ("media", "persona_id"),
+]
+
+
+def upgrade():
+    for table, column in REDUNDANT_INDEXES:
+        drop_index_concurrently(f"ix_{table}_{column}", table)
+        drop_index_concurrently(f"idx_{table}_{column}", table)
+
+
+def downgrade():
+    for table, column in REDUNDANT_INDEXES:
+        create_index_concurrently(f"ix_{table}_{column}", table, [column])
@@ -4,11 +4,14 @@ Railway-specific startup script for AfterLight FastAPI backend.
 This script handles Railway environment variables and ensures proper startup.
 """
 
+import logging
 import os
 import sys
 import uvicorn
 from pathlib import Path
 
+logger = logging.getLogger("railway_start")
+
 def setup_railway_environment():
     """Setup Railway-specific environment variables"""
     
@@ -40,10 +43,7 @@ def setup_railway_environment():
         if value:
             os.environ[key] = value
     
-    print(f"🚂 Railway Environment: {railway_vars['RAILWAY_ENVIRONMENT']}")
-    print(f"🔌 Port: {railway_vars['PORT']}")
-    print(f"📊 Project ID: {railway_vars['RAILWAY_PROJECT_ID']}")
-    print(f"🔧 Service ID: {railway_vars['RAILWAY_SERVICE_ID']}")
+    return railway_vars
 
 def check_railway_requirements():
     """Check if required Railway environment variables are set"""
@@ -59,8 +59,8 @@ def check_railway_requirements():
             missing_vars.append(var)
     
     if missing_vars:
-        print(f"❌ Missing required environment variables: {', '.join(missing_vars)}")
-        print("Please set these in your Railway dashboard")
+        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error("Please set these in your Railway dashboard")
         return False
     
     return True
@@ -68,15 +68,8 @@ def check_railway_requirements():
 def main():
     """Main startup function"""
     
-    print("🚀 Starting AfterLight Backend on Railway...")
-    
-    # Setup Railway environment
-    setup_railway_environment()
-    
-    # Check requirements
-    if not check_railway_requirements():
-        print("❌ Startup failed due to missing environment variables")
-        sys.exit(1)
+    # Setup Railway environment before settings are first imported
+    railway_vars = setup_railway_environment()
     
     # Get port from Railway (handle both $PORT and actual port)
     port_str = os.getenv('PORT', '8000')
@@ -88,21 +81,55 @@ def main():
     try:
         port = int(port_str)
     except ValueError:
-        print(f"⚠️ Invalid PORT value: {port_str}, using default 8000")
         port = 8000
+    os.environ['PORT'] = str(port)
     
-    print(f"✅ Environment setup complete")
-    print(f"🌐 Starting server on port {port}")
-    print(f"📚 API docs will be available at http://0.0.0.0:{port}/docs")
-    print(f"❤️ Health check at http://0.0.0.0:{port}/health")
+    from app.config import settings
+    from app.logging_config import configure_logging, stop_logging
+    configure_logging()
+    
+    logger.info("Starting AfterLight Backend on Railway...")
+    logger.info(f"Railway Environment: {railway_vars['RAILWAY_ENVIRONMENT']}")
+    logger.info(f"Port: {railway_vars['PORT']}")
+    logger.info(f"Project ID: {railway_vars['RAILWAY_PROJECT_ID']}")
+    logger.info(f"Service ID: {railway_vars['RAILWAY_SERVICE_ID']}")
+    if str(port) != port_str:
+        logger.warning(f"Invalid PORT value: {port_str}, using default 8000")
+    
+    # Check requirements
+    if not check_railway_requirements():
+        logger.error("Startup failed due to missing environment variables")
+        sys.exit(1)
     
-    # Start the FastAPI application
+    launcher = settings.SERVER_LAUNCHER
+    if launcher == "auto":
+        launcher = "uvicorn" if settings.ENVIRONMENT == "development" else "gunicorn"
+    
+    logger.info("Environment setup complete")
+    logger.info(f"Starting server on port {port} with {launcher}")
+    logger.info(f"API docs will be available at http://0.0.0.0:{port}/docs")
+    logger.info(f"Health check at http://0.0.0.0:{port}/health")
+    
+    if launcher == "gunicorn":
+        # Multi-worker mode: gunicorn sizes the worker pool from the CPU quota
+        backend_dir = Path(__file__).resolve().parent
+        stop_logging()
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "gunicorn",
+            "--chdir", str(backend_dir),
+            "--config", str(backend_dir / "gunicorn_conf.py"),
+            "app.main:app"
+        ])
+    
+    # Single process, for development
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=port,
         reload=False,  # Disable reload in production
-        log_level=os.getenv('LOG_LEVEL', 'INFO').lower()
+        log_level=os.getenv('LOG_LEVEL', 'INFO').lower(),
+        log_config=None,  # keep the queue-based logging set up above
+        access_log=False  # access lines come from RequestContextMiddleware
     )
 
 if __name__ == "__main__":
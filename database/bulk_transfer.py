@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+AfterLight Bulk Transfer Script
+Export and import personas, memories, media metadata and relationships with COPY
+
+Export writes one file per table plus manifest.json, streamed straight out of
+COPY ... TO STDOUT as NDJSON or CSV. Import streams each file into a temporary
+staging table with COPY ... FROM STDIN, gives every row a fresh id, rewrites
+foreign keys and the persona ids in media URLs with set-wise joins against the
+id maps and inserts everything in one transaction, so a 100k-row archive loads
+in seconds. Media keep their content hash only where this database already
+stores the blob.
+
+    python bulk_transfer.py export --user director@funeralhome.com --format ndjson --out ./archive
+    python bulk_transfer.py import --dir ./archive --to-user director@newhome.com
+
+Requires PostgreSQL 13+ (gen_random_uuid).
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import psycopg2
+
+# Exported in this order; each table's persona references, and whether a row
+# without its referenced persona is dropped (required) or kept with NULL
+TABLES = [
+    ("personas", {}),
+    ("memories", {"persona_id": True}),
+    ("media", {"persona_id": True}),
+    ("relationships", {"persona_id": True, "related_persona_id": False}),
+    ("external_relationships", {"persona_id": True}),
+]
+
+# Columns pointing at users; imported rows belong to the --to-user account
+OWNER_COLUMNS = ("user_id", "created_by", "updated_by")
+
+# Media URLs embed the persona id (/api/v1/media/<persona_id>/<kind>/<name>);
+# the column holding it for each table's URL column
+URL_COLUMNS = {
+    "personas": {"avatar_url": "id"},
+    "media": {"file_url": "persona_id"},
+}
+
+# NDJSON travels through COPY's CSV mode with control characters as quote and
+# delimiter: JSON escapes both, so each document passes through verbatim
+NDJSON_COPY_OPTIONS = "FORMAT csv, DELIMITER E'\\x02', QUOTE E'\\x01'"
+
+FORMATS = ("ndjson", "csv")
+
+
+def get_database_url():
+    """Get database URL from environment variables"""
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable not set")
+    return database_url
+
+
+def quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class Progress:
+    """File wrapper that counts rows through a COPY stream and reports them periodically"""
+
+    def __init__(self, label: str, stream, interval: float = 1.0):
+        self.label = label
+        self.stream = stream
+        self.interval = interval
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+
+    def _advance(self, data: bytes):
+        self.bytes += len(data)
+        self.rows += data.count(b"\n")
+        now = time.monotonic()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            print(f"   ... {self.label}: {self.rows:,} rows, {self.bytes / 1e6:.1f} MB", file=sys.stderr)
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self._advance(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.stream.readline(size)
+        self._advance(data)
+        return data
+
+    def write(self, data):
+        self._advance(data)
+        return self.stream.write(data)
+
+    def finish(self, rows: int, verb: str):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        print(f"✅ {self.label}: {rows:,} rows {verb} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+def table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def table_columns(cursor, table: str) -> list:
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def resolve_users(cursor, identifiers: list) -> list:
+    """Users matching the given emails or ids, failing on any that don't exist"""
+    cursor.execute("""
+        SELECT id::text, email FROM users WHERE email = ANY(%s) OR id::text = ANY(%s)
+    """, (identifiers, identifiers))
+    users = cursor.fetchall()
+    found = {value for user in users for value in user}
+    missing = [identifier for identifier in identifiers if identifier not in found]
+    if missing:
+        raise ValueError(f"Users not found: {', '.join(missing)}")
+    return users
+
+
+def export_data(conn, identifiers: list, out_dir: str, fmt: str):
+    """Export the users' personas and everything attached to them"""
+    # One snapshot for every table, so the files are consistent with each other
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cursor = conn.cursor()
+    users = resolve_users(cursor, identifiers)
+    user_ids = [user[0] for user in users]
+    os.makedirs(out_dir, exist_ok=True)
+
+    personas = cursor.mogrify("""
+        SELECT id FROM personas WHERE user_id IN (SELECT id FROM users WHERE id::text = ANY(%s))
+    """, (user_ids,)).decode()
+    manifest = {
+        "format": fmt,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source_users": [user[1] for user in users],
+        "tables": {},
+    }
+
+    print(f"📦 Exporting {len(users)} user(s) to {out_dir} as {fmt}")
+    for table, _ in TABLES:
+        if not table_exists(cursor, table):
+            print(f"⏭️  {table}: table not present, skipped")
+            continue
+
+        if table == "personas":
+            query = f"SELECT * FROM personas WHERE id IN ({personas})"
+        else:
+            query = f"SELECT * FROM {quote(table)} WHERE persona_id IN ({personas})"
+        if fmt == "ndjson":
+            copy = f"COPY (SELECT to_jsonb(t) FROM ({query}) t) TO STDOUT WITH ({NDJSON_COPY_OPTIONS})"
+        else:
+            copy = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+
+        file_name = f"{table}.{fmt}"
+        with open(os.path.join(out_dir, file_name), "wb") as f:
+            progress = Progress(table, f)
+            cursor.copy_expert(copy, progress)
+        rows = cursor.rowcount if cursor.rowcount >= 0 else progress.rows
+        progress.finish(rows, "exported")
+        manifest["tables"][table] = {"file": file_name, "rows": rows, "columns": table_columns(cursor, table)}
+
+    conn.rollback()
+    cursor.close()
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    total = sum(entry["rows"] for entry in manifest["tables"].values())
+    print(f"✅ Export complete: {total:,} rows")
+
+
+def stage_file(cursor, table: str, path: str, fmt: str, target_columns: list) -> list:
+    """COPY an export file into stage_<table>; returns the target columns it supplied"""
+    stage = f"stage_{table}"
+    cursor.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT * FROM {quote(table)} WITH NO DATA")
+
+    with open(path, "rb") as f:
+        progress = Progress(table, f)
+        if fmt == "ndjson":
+            raw = f"raw_{table}"
+            cursor.execute(f"CREATE TEMP TABLE {raw} (doc jsonb) ON COMMIT DROP")
+            cursor.copy_expert(f"COPY {raw} (doc) FROM STDIN WITH ({NDJSON_COPY_OPTIONS})", progress)
+            cursor.execute(f"SELECT DISTINCT jsonb_object_keys(doc) FROM {raw} WHERE doc IS NOT NULL")
+            supplied = {row[0] for row in cursor.fetchall()}
+            cursor.execute(f"""
+                INSERT INTO {stage}
+                SELECT r.* FROM {raw}, jsonb_populate_record(NULL::{stage}, {raw}.doc) AS r
+                WHERE {raw}.doc IS NOT NULL
+            """)
+        else:
+            header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+            f.seek(0)
+            supplied = set(header)
+            # Columns the target doesn't have are loaded as text and ignored
+            for column in supplied.difference(target_columns):
+                cursor.execute(f"ALTER TABLE {stage} ADD COLUMN {quote(column)} text")
+            columns = ", ".join(quote(column) for column in header)
+            cursor.copy_expert(f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER)", progress)
+
+    unknown = sorted(supplied.difference(target_columns))
+    if unknown:
+        print(f"⚠️  {table}: ignoring columns not in this database: {', '.join(unknown)}")
+    return [column for column in target_columns if column in supplied]
+
+
+def import_table(cursor, table: str, references: dict, supplied: list, target_columns: list,
+                 blobs_available: bool) -> tuple:
+    """Insert staged rows under new ids; returns (inserted, skipped)"""
+    stage = f"stage_{table}"
+    if "id" not in supplied:
+        raise ValueError(f"{table}: export has no id column")
+    missing = [column for column, required in references.items() if required and column not in supplied]
+    if missing:
+        raise ValueError(f"{table}: export is missing {', '.join(missing)}")
+
+    cursor.execute(f"ANALYZE {stage}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE map_{table} ON COMMIT DROP AS
+        SELECT DISTINCT id AS old_id, id AS new_id FROM {stage} WHERE id IS NOT NULL
+    """)
+    cursor.execute(f"UPDATE map_{table} SET new_id = gen_random_uuid()")
+    cursor.execute(f"CREATE UNIQUE INDEX ON map_{table} (old_id)")
+    cursor.execute(f"ANALYZE map_{table}")
+
+    # The id map each persona reference is rewritten through
+    joins = [f"JOIN map_{table} m ON m.old_id = s.id"]
+    id_maps = {"id": "m"} if table == "personas" else {}
+    for column, required in references.items():
+        if column in supplied:
+            alias = f"ref_{len(joins)}"
+            join = "JOIN" if required else "LEFT JOIN"
+            joins.append(f"{join} map_personas {alias} ON {alias}.old_id = s.{quote(column)}")
+            id_maps[column] = alias
+    url_columns = URL_COLUMNS.get(table, {})
+
+    columns, values = [], []
+    for column in target_columns:
+        if column == "id":
+            values.append("m.new_id")
+        elif column in references:
+            if column not in supplied:
+                continue
+            values.append(f"{id_maps[column]}.new_id")
+        elif column in url_columns and column in supplied and url_columns[column] in id_maps:
+            # Point the URL at the new persona id
+            alias, source = id_maps[url_columns[column]], quote(url_columns[column])
+            values.append(
+                f"replace(s.{quote(column)}, '/' || s.{source}::text || '/', '/' || {alias}.new_id::text || '/')"
+            )
+        elif column in OWNER_COLUMNS:
+            values.append("o.id")
+        elif table == "media" and column == "content_hash":
+            # Only keep references to content this database already stores; without
+            # media_blobs or a supplied hash the column is left NULL
+            if not blobs_available or column not in supplied:
+                continue
+            joins.append("LEFT JOIN media_blobs b ON b.sha256 = s.content_hash")
+            values.append("b.sha256")
+        elif column in supplied:
+            values.append(f"s.{quote(column)}")
+        else:
+            continue
+        columns.append(quote(column))
+
+    cursor.execute(f"SELECT count(*) FROM {stage}")
+    staged = cursor.fetchone()[0]
+    cursor.execute(f"""
+        INSERT INTO {quote(table)} ({", ".join(columns)})
+        SELECT DISTINCT ON (s.id) {", ".join(values)}
+        FROM {stage} s
+        {" ".join(joins)}
+        CROSS JOIN import_owner o
+        ORDER BY s.id
+    """)
+    inserted = cursor.rowcount
+    return inserted, staged - inserted
+
+
+def import_data(conn, in_dir: str, owner: str, dry_run: bool):
+    """Import an export directory for the given owner, all or nothing"""
+    with open(os.path.join(in_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    fmt = manifest["format"]
+    cursor = conn.cursor()
+    owner_id, owner_email = resolve_users(cursor, [owner])[0]
+    cursor.execute("""
+        CREATE TEMP TABLE import_owner ON COMMIT DROP AS SELECT id FROM users WHERE id::text = %s
+    """, (owner_id,))
+
+    blobs_available = table_exists(cursor, "media_blobs")
+    print(f"📥 Importing {in_dir} ({fmt}, exported {manifest['exported_at']}) for {owner_email}")
+    started = time.monotonic()
+    imported = {}
+    for table, references in TABLES:
+        entry = manifest["tables"].get(table)
+        if entry is None:
+            continue
+        if not table_exists(cursor, table):
+            print(f"⏭️  {table}: table not present in this database, skipped")
+            continue
+        if "personas" not in imported and references:
+            raise ValueError(f"{table}: personas must be imported first")
+
+        target_columns = table_columns(cursor, table)
+        supplied = stage_file(cursor, table, os.path.join(in_dir, entry["file"]), fmt, target_columns)
+        inserted, skipped = import_table(cursor, table, references, supplied, target_columns, blobs_available)
+        imported[table] = inserted
+        note = f", {skipped:,} skipped (duplicate id or persona not in the export)" if skipped else ""
+        print(f"✅ {table}: {inserted:,} rows inserted{note}")
+
+    if "media" in imported and blobs_available and "content_hash" in table_columns(cursor, "media"):
+        # Shared content gains a reference for every imported media row
+        cursor.execute("""
+            UPDATE media_blobs b
+            SET ref_count = b.ref_count + c.refs, released_at = NULL
+            FROM (
+                SELECT content_hash, count(*) AS refs
+                FROM media
+                WHERE id IN (SELECT new_id FROM map_media) AND content_hash IS NOT NULL
+                GROUP BY content_hash
+            ) c
+            WHERE b.sha256 = c.content_hash
+        """)
+
+    if "personas" in imported and "storage_used_mb" in table_columns(cursor, "personas") \
+            and "current_storage_mb" in table_columns(cursor, "users"):
+        cursor.execute("""
+            UPDATE users
+            SET current_storage_mb = current_storage_mb + (
+                SELECT COALESCE(SUM(storage_used_mb), 0) FROM personas
+                WHERE id IN (SELECT new_id FROM map_personas)
+            )
+            WHERE id IN (SELECT id FROM import_owner)
+        """)
+
+    total = sum(imported.values())
+    elapsed = time.monotonic() - started
+    if dry_run:
+        conn.rollback()
+        print(f"🔍 Dry run: {total:,} rows would be imported ({elapsed:.1f}s), nothing written")
+    else:
+        conn.commit()
+        print(f"✅ Import complete: {total:,} rows in {elapsed:.1f}s")
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk export and import AfterLight persona data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export users\' personas and related data')
+    export_parser.add_argument('--user', action='append', required=True,
+                               help='Email or id of a user to export; repeat for every account of an organization')
+    export_parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    export_parser.add_argument('--out', required=True, help='Directory to write the export to')
+
+    import_parser = subparsers.add_parser('import', help='Import an export directory')
+    import_parser.add_argument('--dir', required=True, help='Directory written by export')
+    import_parser.add_argument('--to-user', required=True, help='Email or id of the user who will own the personas')
+    import_parser.add_argument('--dry-run', action='store_true', help='Run the import and roll it back')
+
+    args = parser.parse_args()
+
+    try:
+        conn = psycopg2.connect(get_database_url())
+        conn.set_client_encoding('UTF8')
+        try:
+            if args.command == 'export':
+                export_data(conn, args.user, args.out, args.format)
+            else:
+                import_data(conn, args.dir, args.to_user, args.dry_run)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -94,11 +94,16 @@ def create_new_super_admin(conn, email: str, first_name: str, last_name: str, pa
     return True
 
 def delete_super_admin(conn, email: str):
-    """Delete a super admin user"""
+    """Deactivate a super admin user and revoke their sessions
+
+    The row is kept: running workers learn of the change from its
+    entitlements_updated_at, so the account's access tokens stop working
+    within ENTITLEMENT_SYNC_SECONDS instead of lasting until they expire.
+    """
     cursor = conn.cursor()
     
     # Check if this is the only super admin
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'SUPER_ADMIN'")
+    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'SUPER_ADMIN' AND is_active")
     count = cursor.fetchone()[0]
     
     if count <= 1:
@@ -106,14 +111,25 @@ def delete_super_admin(conn, email: str):
         cursor.close()
         return False
     
-    cursor.execute("DELETE FROM users WHERE email = %s AND role = 'SUPER_ADMIN'", (email,))
+    cursor.execute("""
+        UPDATE users
+        SET is_active = false, entitlements_updated_at = NOW(), updated_at = NOW()
+        WHERE email = %s AND role = 'SUPER_ADMIN' AND is_active
+        RETURNING id
+    """, (email,))
+    row = cursor.fetchone()
     
-    if cursor.rowcount > 0:
+    if row:
+        cursor.execute(
+            "UPDATE user_sessions SET revoked_at = NOW() WHERE user_id = %s AND revoked_at IS NULL",
+            (row[0],)
+        )
         conn.commit()
-        print(f"✅ Super admin deleted: {email}")
+        print(f"✅ Super admin deactivated: {email}")
         cursor.close()
         return True
     else:
+        conn.rollback()
         print(f"❌ Super admin not found: {email}")
         cursor.close()
         return False
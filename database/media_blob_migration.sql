@@ -0,0 +1,25 @@
+-- Media Blob Migration
+-- Content-addressed, deduplicated storage behind the media table
+-- schema.sql and Alembic revision 0005 include this; it is only for databases created before them
+
+-- One row per distinct file, keyed by its SHA-256
+CREATE TABLE IF NOT EXISTS media_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size_bytes BIGINT NOT NULL,
+    mime_type VARCHAR(100) NOT NULL,
+    storage_path VARCHAR(500) NOT NULL, -- relative to UPLOAD_DIR
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    released_at TIMESTAMP WITH TIME ZONE -- when ref_count last dropped to zero
+);
+
+-- Media rows reference shared content; size is still charged per persona
+ALTER TABLE media ADD COLUMN IF NOT EXISTS content_hash CHAR(64) REFERENCES media_blobs(sha256);
+
+CREATE INDEX IF NOT EXISTS idx_media_content_hash ON media(content_hash);
+
+-- Garbage collector scans only unreferenced blobs
+CREATE INDEX IF NOT EXISTS idx_media_blobs_unreferenced ON media_blobs(released_at) WHERE ref_count = 0;
+
+COMMENT ON TABLE media_blobs IS 'Content-addressed media files shared by every media row with the same bytes';
+COMMENT ON COLUMN media.content_hash IS 'SHA-256 of the file content, references media_blobs';
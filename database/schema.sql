@@ -25,6 +25,7 @@ CREATE TABLE users (
     role user_role NOT NULL DEFAULT 'USER',
     subscription_tier subscription_tier NOT NULL DEFAULT 'free',
     subscription_expires_at TIMESTAMP WITH TIME ZONE,
+    entitlements_updated_at TIMESTAMP WITH TIME ZONE, -- access tokens issued before this are refused
     is_active BOOLEAN DEFAULT true,
     email_verified BOOLEAN DEFAULT false,
     cultural_preferences JSONB,
@@ -93,6 +94,17 @@ CREATE TABLE memories (
 );
 
 -- Media table - photos, voice recordings, documents
+-- Content-addressed media files, one row per distinct file keyed by its SHA-256
+CREATE TABLE media_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size_bytes BIGINT NOT NULL,
+    mime_type VARCHAR(100) NOT NULL,
+    storage_path VARCHAR(500) NOT NULL, -- relative to UPLOAD_DIR
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    released_at TIMESTAMP WITH TIME ZONE -- when ref_count last dropped to zero
+);
+
 CREATE TABLE media (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     persona_id UUID NOT NULL REFERENCES personas(id) ON DELETE CASCADE,
@@ -101,6 +113,7 @@ CREATE TABLE media (
     file_name VARCHAR(255),
     file_size_bytes BIGINT,
     mime_type VARCHAR(100),
+    content_hash CHAR(64) REFERENCES media_blobs(sha256), -- shared content; size is still charged per persona
     description TEXT,
     ai_generated_description TEXT, -- OpenAI vision API description
     embedding_vector JSONB, -- Vector embedding of description
@@ -169,10 +182,12 @@ CREATE TABLE ai_content_cache (
 CREATE TABLE user_sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    token VARCHAR(500) NOT NULL,
+    token_hash VARCHAR(64) NOT NULL, -- SHA-256 of the refresh token, rotated on every refresh
+    previous_token_hash VARCHAR(64), -- the token it replaced; reusing it revokes the session
     expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    revoked_at TIMESTAMP WITH TIME ZONE
 );
 
 -- Role permissions table
@@ -268,25 +283,36 @@ CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_users_subscription_tier ON users(subscription_tier);
 CREATE INDEX idx_users_created_by ON users(created_by);
+CREATE INDEX ix_users_entitlements_updated_at ON users(entitlements_updated_at);
 CREATE INDEX idx_user_sessions_user_id ON user_sessions(user_id);
-CREATE INDEX idx_user_sessions_token ON user_sessions(token);
+CREATE UNIQUE INDEX idx_user_sessions_token_hash ON user_sessions(token_hash);
+CREATE INDEX idx_user_sessions_previous_token_hash ON user_sessions(previous_token_hash);
+CREATE INDEX idx_user_sessions_revoked_at ON user_sessions(revoked_at) WHERE revoked_at IS NOT NULL;
 
 -- Personas indexes
-CREATE INDEX idx_personas_user_id ON personas(user_id);
+-- A user's personas in priority order (also serves lookups by user_id alone)
+CREATE INDEX idx_personas_user_priority ON personas(user_id, priority_order, id);
+-- The app stores enum names, so active personas are 'ACTIVE'
+CREATE INDEX idx_personas_user_active_priority ON personas(user_id, priority_order, id) WHERE access_status = 'ACTIVE';
 CREATE INDEX idx_personas_name ON personas(name);
 CREATE INDEX idx_personas_cultural_background ON personas(cultural_background);
 CREATE INDEX idx_personas_created_at ON personas(created_at);
 
 -- Memories indexes
-CREATE INDEX idx_memories_persona_id ON memories(persona_id);
+CREATE INDEX idx_memories_persona_created ON memories(persona_id, created_at);
 CREATE INDEX idx_memories_memory_type ON memories(memory_type);
 CREATE INDEX idx_memories_emotional_tone ON memories(emotional_tone);
 CREATE INDEX idx_memories_created_at ON memories(created_at);
 
 -- Media indexes
-CREATE INDEX idx_media_persona_id ON media(persona_id);
+CREATE INDEX idx_media_persona_created ON media(persona_id, created_at);
 CREATE INDEX idx_media_media_type ON media(media_type);
 CREATE INDEX idx_media_created_at ON media(created_at);
+CREATE INDEX idx_media_content_hash ON media(content_hash);
+
+-- Media blobs indexes
+-- Garbage collector scans only unreferenced blobs
+CREATE INDEX idx_media_blobs_unreferenced ON media_blobs(released_at) WHERE ref_count = 0;
 
 -- Relationships indexes
 CREATE INDEX idx_relationships_persona_id ON relationships(persona_id);